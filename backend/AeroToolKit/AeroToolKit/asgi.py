@@ -3,6 +3,11 @@ ASGI config for AeroToolKit project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Поток событий завершения обработки (SSE) обслуживается напрямую
+асинхронным приложением api.streams.instrument_events: тысячи
+простаивающих подключений не занимают потоки, как в gthread воркерах
+gunicorn. Остальные запросы передаются Django.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
 """
@@ -13,4 +18,17 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'AeroToolKit.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Импорт после настройки Django: модуль использует settings и модели
+from api.streams import instrument_events  # noqa: E402
+
+EVENTS_PATH = '/api/v1/instruments/events/'
+
+
+async def application(scope, receive, send):
+    """Направляет запросы потока событий в instrument_events."""
+    if scope['type'] == 'http' and scope['path'] == EVENTS_PATH:
+        await instrument_events(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import task_postrun, worker_process_init, worker_ready
 
 # Установка переменной окружения для настроек Django по умолчанию
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'AeroToolKit.settings')
@@ -82,3 +83,68 @@ Note:
     from .celery import app as celery_app
     __all__ = ('celery_app',)
 """
+
+
+def _warmup_yolo():
+    """
+    Прогревает модель YOLO в текущем процессе воркера.
+
+    Импорт стека инференса выполняется внутри функции, поэтому веб-процессы,
+    импортирующие этот модуль, не загружают onnxruntime и модель.
+    """
+    from django.conf import settings
+
+    if not settings.YOLO_WARMUP_ON_START:
+        return
+    try:
+        from api.yolo_utils import warmup_inference_engine
+
+        warmup_inference_engine()
+    except Exception as e:
+        # Ошибка прогрева не должна мешать старту воркера:
+        # модель будет загружена при первой задаче
+        print(f" [BACKEND CELERY] YOLO warmup failed: {e}", flush=True)
+
+
+@worker_process_init.connect
+def warmup_yolo_in_child(**kwargs):
+    """
+    Прогрев модели в дочернем процессе prefork пула.
+
+    Срабатывает при каждом старте дочернего процесса, в том числе после
+    перезапуска по --max-tasks-per-child.
+    """
+    _warmup_yolo()
+
+
+@worker_ready.connect
+def warmup_yolo_in_worker(sender=None, **kwargs):
+    """
+    Прогрев модели в главном процессе воркера для пулов без fork.
+
+    В prefork пуле задачи выполняются в дочерних процессах, поэтому
+    главный процесс модель не загружает.
+    """
+    pool = getattr(sender, 'pool', None)
+    if pool is not None and 'prefork' in type(pool).__module__:
+        return
+    _warmup_yolo()
+
+
+@task_postrun.connect
+def record_yolo_task_completion(sender=None, task=None, **kwargs):
+    """
+    Учитывает выполненную задачу api.tasks для контроля допуска загрузок.
+
+    Скорость выполнения задач каждой очереди используется API для оценки
+    времени ожидания (см. api.admission.check_admission).
+    """
+    if task is None or not task.name.startswith('api.tasks.'):
+        return
+    delivery_info = getattr(task.request, 'delivery_info', None) or {}
+    queue = delivery_info.get('routing_key')
+    if not queue:
+        return
+    from api.admission import record_completion
+
+    record_completion(queue)
@@ -229,6 +229,44 @@ YOLO_CLASSES = [
     '10_klyuch_rozhkovyy_nakidnoy_3/4',
     '11_bokorezy',
 ]
+# Микробатчинг инференса: максимальный размер батча и бюджет задержки (мс),
+# в течение которого изображения параллельных задач собираются в один батч
+YOLO_BATCH_MAX_SIZE = int(os.getenv('YOLO_BATCH_MAX_SIZE', 8))
+YOLO_BATCH_MAX_WAIT_MS = float(os.getenv('YOLO_BATCH_MAX_WAIT_MS', 15))
+# Вариант модели: fp32 (исходная), int8_dynamic, int8_static или fp16.
+# Квантованные варианты создаются командой manage.py yolo_quantize
+YOLO_MODEL_VARIANT = os.getenv('YOLO_MODEL_VARIANT', 'fp32')
+# Параметры ONNX Runtime: уровень оптимизации графа (disable/basic/extended/all),
+# количество потоков (0 - по умолчанию рантайма), режим (sequential/parallel)
+YOLO_ORT_GRAPH_OPTIMIZATION = os.getenv('YOLO_ORT_GRAPH_OPTIMIZATION', 'all')
+YOLO_ORT_INTRA_OP_THREADS = int(os.getenv('YOLO_ORT_INTRA_OP_THREADS', 0))
+YOLO_ORT_INTER_OP_THREADS = int(os.getenv('YOLO_ORT_INTER_OP_THREADS', 0))
+YOLO_ORT_EXECUTION_MODE = os.getenv('YOLO_ORT_EXECUTION_MODE', 'sequential')
+# Каталог кэша оптимизированных моделей (ключ - хэш модели)
+YOLO_MODEL_CACHE_DIR = os.getenv(
+    'YOLO_MODEL_CACHE_DIR',
+    os.path.join(BASE_DIR, 'api', 'yolo_models', 'cache'),
+)
+# Прогревать модель при старте процесса Celery воркера
+YOLO_WARMUP_ON_START = (
+    os.getenv('YOLO_WARMUP_ON_START', 'True').lower() == 'true'
+)
+# Декодирование для инференса: 'pil' (JPEG draft), 'cv2' (IMREAD_REDUCED_*)
+# или 'full' (полное разрешение, как раньше)
+YOLO_DECODER = os.getenv('YOLO_DECODER', 'pil')
+# Тайловый инференс по умолчанию: количество тайлов по стороне (1 - выключен)
+# и доля перекрытия. Переопределяются параметрами tile_grid и tile_overlap
+# запроса, максимум сетки ограничен YOLO_TILE_GRID_MAX
+YOLO_TILE_GRID = int(os.getenv('YOLO_TILE_GRID', 1))
+YOLO_TILE_OVERLAP = float(os.getenv('YOLO_TILE_OVERLAP', 0.2))
+YOLO_TILE_GRID_MAX = int(os.getenv('YOLO_TILE_GRID_MAX', 4))
+# Аннотированное изображение: кодировщик JPEG ('cv2' или 'pil') и качество
+YOLO_RENDER_ENCODER = os.getenv('YOLO_RENDER_ENCODER', 'cv2')
+YOLO_RENDER_JPEG_QUALITY = int(os.getenv('YOLO_RENDER_JPEG_QUALITY', 75))
+# Результат обработки: 'overlay' - сохраняются только координаты детекций,
+# разметка рисуется поверх исходного изображения; 'burn' - дополнительно
+# сохраняется JPEG с нарисованными рамками (поле annotated_image)
+YOLO_RESULT_MODE = os.getenv('YOLO_RESULT_MODE', 'overlay')
 # Заглушка, заменяется переменной при отправке с фото сервера. Ожидаемое количество предметов на фотографии
 EXPECTED_OBJECTS = 11
 # Заглушка, заменяется переменной при отправке с фото сервера. Уверенность, что инструмент распознан правильно
@@ -248,18 +286,63 @@ CELERY_RESULT_BACKEND = 'redis://redis:6379/0'
 # Разные очереди для разных сервисов
 CELERY_TASK_DEFAULT_QUEUE = 'backend_tasks'
 CELERY_TASK_ROUTES = {
+    # Этапы конвейера YOLO: декодирование и сохранение нагружают CPU
+    # и не должны конкурировать с инференсом за воркеры одной очереди
+    'api.tasks.decode_instrument_image': {'queue': 'yolo_decode'},
+    'api.tasks.infer_instrument_image': {'queue': 'yolo_infer'},
+    'api.tasks.persist_instrument_results': {'queue': 'yolo_persist'},
     'api.tasks.*': {'queue': 'backend_tasks'},
 }
 
+# Очереди обрабатываются в порядке, указанном в -Q воркера, а не по кругу:
+# воркер, слушающий несколько очередей, берет задачи из первой непустой
+CELERY_BROKER_TRANSPORT_OPTIONS = {'queue_order_strategy': 'priority'}
+
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Europe/Moscow'
 CELERY_ENABLE_UTC = False
 
-# чтобы джанга не лагала при загрузке файлов
-DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
+# Файлы загрузок пишутся на диск по частям (api.uploads), в памяти
+# запроса держится только текущая часть и обычные поля формы
+FILE_UPLOAD_HANDLERS = ['api.uploads.StreamingUploadHandler']
+DATA_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB, только поля без файлов
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB
+
+# Временные файлы загрузок: на том же томе, что и MEDIA_ROOT, чтобы
+# сохранение в ImageField было переименованием файла
+FILE_UPLOAD_TEMP_DIR = os.getenv(
+    'FILE_UPLOAD_TEMP_DIR', os.path.join(MEDIA_ROOT, 'upload_tmp')
+)
+
+# Размер части, записываемой на диск за раз, байты
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 256 * 1024))
+
+# Максимальный размер одного файла и всех файлов запроса, байты
+UPLOAD_MAX_FILE_SIZE = int(
+    os.getenv('UPLOAD_MAX_FILE_SIZE', 50 * 1024 * 1024)
+)
+UPLOAD_MAX_REQUEST_SIZE = int(
+    os.getenv('UPLOAD_MAX_REQUEST_SIZE', 512 * 1024 * 1024)
+)
+
+# Возобновляемая загрузка (api/v1/uploads/): файл собирается по частям в
+# UPLOAD_SESSION_DIR на томе MEDIA_ROOT. Часть не больше
+# UPLOAD_SESSION_MAX_CHUNK байт, незавершенная сессия хранится
+# UPLOAD_SESSION_TTL секунд (удаляется командой reclaim_media).
+# Завершение, не закончившееся за UPLOAD_SESSION_COMPLETE_TIMEOUT секунд
+# (процесс упал), считается прерванным и может быть повторено
+UPLOAD_SESSION_DIR = os.getenv(
+    'UPLOAD_SESSION_DIR', os.path.join(MEDIA_ROOT, 'upload_sessions')
+)
+UPLOAD_SESSION_MAX_CHUNK = int(
+    os.getenv('UPLOAD_SESSION_MAX_CHUNK', 8 * 1024 * 1024)
+)
+UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', 24 * 3600))
+UPLOAD_SESSION_COMPLETE_TIMEOUT = int(
+    os.getenv('UPLOAD_SESSION_COMPLETE_TIMEOUT', 600)
+)
 
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
 CELERY_BROKER_CONNECTION_RETRY = True
@@ -268,3 +351,74 @@ CELERY_BROKER_CONNECTION_MAX_RETRIES = 10
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_TASK_ACKS_LATE = True
 CELERY_WORKER_CONCURRENCY = 4
+
+# TTL блокировки обработки инструмента в Redis, секунды. Должен превышать
+# максимальное время задачи: повторная доставка (acks_late) во время
+# обработки пропускается, а после падения воркера блокировка истекает
+YOLO_TASK_LOCK_TTL = int(os.getenv('YOLO_TASK_LOCK_TTL', 900))
+
+# Передача изображения в задачу YOLO: 'reference' - в сообщении только путь
+# к файлу в общем хранилище media, 'inline' - байты изображения в сообщении
+YOLO_TASK_PAYLOAD = os.getenv('YOLO_TASK_PAYLOAD', 'reference')
+# Максимальный размер изображения, передаваемого в сообщении (режим inline)
+YOLO_TASK_INLINE_MAX_BYTES = int(
+    os.getenv('YOLO_TASK_INLINE_MAX_BYTES', 2 * 1024 * 1024)
+)
+# Конвейер YOLO обработки: 'staged' - цепочка задач decode -> infer ->
+# persist в очередях yolo_decode, yolo_infer и yolo_persist; 'single' - одна
+# задача process_instrument_with_yolo в очереди backend_tasks
+YOLO_PIPELINE = os.getenv('YOLO_PIPELINE', 'staged')
+# Общий каталог для промежуточных данных между этапами конвейера
+YOLO_PIPELINE_DIR = os.getenv(
+    'YOLO_PIPELINE_DIR', os.path.join(MEDIA_ROOT, 'pipeline')
+)
+# Классы приоритета YOLO обработки и их очереди: interactive - одиночные
+# фотографии (ждет инспектор), bulk - крупные пакетные загрузки,
+# maintenance - повторная обработка (manage.py yolo_reprocess)
+YOLO_PRIORITY_QUEUES = {
+    'interactive': 'backend_tasks',
+    'bulk': 'yolo_bulk',
+    'maintenance': 'yolo_maintenance',
+}
+# Пакет из большего количества изображений обрабатывается как bulk
+YOLO_INTERACTIVE_MAX_BATCH = int(os.getenv('YOLO_INTERACTIVE_MAX_BATCH', 4))
+# Максимальное количество изображений в одном запросе пакетной загрузки
+YOLO_BATCH_UPLOAD_MAX_IMAGES = int(
+    os.getenv('YOLO_BATCH_UPLOAD_MAX_IMAGES', 32)
+)
+# Пакет загрузки делится на задачи по столько изображений, которые
+# отправляются одной группой и выполняются параллельно разными воркерами
+YOLO_BATCH_TASK_MAX_IMAGES = int(
+    os.getenv('YOLO_BATCH_TASK_MAX_IMAGES', YOLO_BATCH_MAX_SIZE)
+)
+# Размер страницы списка инструментов API по умолчанию и максимальный
+# размер, который клиент может запросить параметром page_size
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 20))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 100))
+# Максимальное количество ID в одном запросе статусов обработки
+STATUS_POLL_MAX_IDS = int(os.getenv('STATUS_POLL_MAX_IDS', 200))
+
+# Уведомления о завершении обработки (SSE, AeroToolKit/asgi.py): задачи
+# публикуют смену статуса в канал Redis, ASGI процессы рассылают ее
+# подписчикам
+YOLO_EVENTS_REDIS_URL = os.getenv('YOLO_EVENTS_REDIS_URL', CELERY_BROKER_URL)
+YOLO_EVENTS_CHANNEL = os.getenv('YOLO_EVENTS_CHANNEL', 'instrument_status')
+# Интервал комментариев keep-alive в потоке SSE, секунды
+YOLO_EVENTS_HEARTBEAT = int(os.getenv('YOLO_EVENTS_HEARTBEAT', 15))
+# Максимальная длительность одного подключения, секунды. После нее поток
+# закрывается, и EventSource переподключается автоматически
+YOLO_EVENTS_MAX_DURATION = int(os.getenv('YOLO_EVENTS_MAX_DURATION', 300))
+
+# Контроль допуска загрузок: при ожидаемом времени в очереди больше
+# YOLO_ADMISSION_MAX_WAIT секунд (глубина очереди / скорость обработки
+# за последние YOLO_ADMISSION_RATE_WINDOW секунд) API отвечает 429
+# с заголовком Retry-After
+YOLO_ADMISSION_ENABLED = (
+    os.getenv('YOLO_ADMISSION_ENABLED', 'True').lower() == 'true'
+)
+YOLO_ADMISSION_MAX_WAIT = int(os.getenv('YOLO_ADMISSION_MAX_WAIT', 120))
+YOLO_ADMISSION_RATE_WINDOW = int(os.getenv('YOLO_ADMISSION_RATE_WINDOW', 60))
+# Предельная глубина очереди, в том числе пока скорость неизвестна
+YOLO_ADMISSION_MAX_DEPTH = int(os.getenv('YOLO_ADMISSION_MAX_DEPTH', 500))
+# Retry-After, если скорость обработки еще не измерена, секунды
+YOLO_ADMISSION_RETRY_AFTER = int(os.getenv('YOLO_ADMISSION_RETRY_AFTER', 30))
@@ -0,0 +1,150 @@
+import math
+import time
+
+import redis
+from django.conf import settings
+
+from .dispatch import priority_queue
+from .events import get_redis
+
+# Ключи счетчиков выполненных задач очереди по интервалам RATE_BUCKET секунд
+RATE_KEY_PREFIX = 'yolo:completed:'
+RATE_BUCKET = 10
+
+
+class Overloaded(Exception):
+    """Очередь обработки переполнена, запрос нужно повторить позже."""
+
+    def __init__(self, retry_after, depth):
+        super().__init__(f'Очередь обработки переполнена ({depth} задач).')
+        self.retry_after = retry_after
+        self.depth = depth
+
+
+def record_completion(queue):
+    """
+    Учитывает выполненную задачу очереди для оценки скорости обработки.
+
+    Счетчик текущего интервала хранится в Redis и истекает после окна
+    YOLO_ADMISSION_RATE_WINDOW, поэтому учитываются все воркеры.
+    Вызывается по сигналу task_postrun (см. AeroToolKit/celery.py).
+
+    Args:
+        queue (str): Очередь, из которой получена задача
+    """
+    bucket = int(time.time()) // RATE_BUCKET
+    key = f'{RATE_KEY_PREFIX}{queue}:{bucket}'
+    try:
+        pipe = get_redis().pipeline()
+        pipe.incr(key)
+        pipe.expire(key, settings.YOLO_ADMISSION_RATE_WINDOW + RATE_BUCKET)
+        pipe.execute()
+    except redis.RedisError as e:
+        print(
+            f" [BACKEND CELERY] Failed to record task completion: {e}",
+            flush=True,
+        )
+
+
+def admission_queues(priority, batch=False):
+    """
+    Возвращает очереди, в которых будет ждать обработка запроса.
+
+    Одиночные интерактивные загрузки в режиме staged выполняются цепочкой
+    decode -> infer -> persist и не попадают в очередь класса приоритета,
+    поэтому учитываются очереди этапов. Пакетные загрузки и остальные
+    классы приоритета обрабатываются задачами в очереди своего класса.
+
+    Args:
+        priority (str): Класс приоритета
+        batch (bool): Загрузка обрабатывается пакетными задачами
+
+    Returns:
+        list: Имена очередей Celery
+    """
+    if (
+        settings.YOLO_PIPELINE == 'staged'
+        and priority == 'interactive'
+        and not batch
+    ):
+        return ['yolo_decode', 'yolo_infer', 'yolo_persist']
+    return [priority_queue(priority)]
+
+
+def queue_state(queues):
+    """
+    Читает глубину очередей и скорость их обработки за последнее окно.
+
+    Args:
+        queues (list): Имена очередей Celery (списки Redis)
+
+    Returns:
+        list: Кортежи (очередь, задач в очереди, задач в секунду)
+    """
+    window = settings.YOLO_ADMISSION_RATE_WINDOW
+    now_bucket = int(time.time()) // RATE_BUCKET
+    buckets = range(now_bucket - window // RATE_BUCKET, now_bucket + 1)
+
+    pipe = get_redis().pipeline()
+    for queue in queues:
+        pipe.llen(queue)
+        pipe.mget([f'{RATE_KEY_PREFIX}{queue}:{bucket}' for bucket in buckets])
+    replies = pipe.execute()
+
+    state = []
+    for queue, depth, counts in zip(queues, replies[::2], replies[1::2]):
+        completed = sum(int(count) for count in counts if count)
+        state.append((queue, depth, completed / window))
+    return state
+
+
+def check_admission(priority, batch=False):
+    """
+    Решает, принять ли загрузку, по ожидаемому времени в очереди.
+
+    Время ожидания в каждой очереди оценивается как ее глубина (с учетом
+    новой задачи), деленная на скорость выполнения ее задач за последнее
+    окно. Пока скорость неизвестна (например, после простоя),
+    ограничивается только глубина YOLO_ADMISSION_MAX_DEPTH. При
+    недоступности Redis загрузки принимаются.
+
+    Args:
+        priority (str): Класс приоритета загрузки
+        batch (bool): Загрузка обрабатывается пакетными задачами
+
+    Raises:
+        Overloaded: Если ожидание превысит YOLO_ADMISSION_MAX_WAIT секунд
+                    или глубина очереди превысит YOLO_ADMISSION_MAX_DEPTH
+    """
+    if not settings.YOLO_ADMISSION_ENABLED:
+        return
+    try:
+        state = queue_state(admission_queues(priority, batch))
+    except redis.RedisError as e:
+        print(f" [BACKEND] Admission check skipped: {e}", flush=True)
+        return
+
+    max_wait = settings.YOLO_ADMISSION_MAX_WAIT
+    max_depth = settings.YOLO_ADMISSION_MAX_DEPTH
+    retry_after = 0
+    overloaded_depth = 0
+    for queue, depth, rate in state:
+        depth += 1
+        if rate:
+            # Допустимая глубина - то, что выполнится за max_wait секунд
+            allowed = min(max_wait * rate, max_depth)
+        else:
+            allowed = max_depth
+        if depth <= allowed:
+            continue
+
+        # Повтор имеет смысл, когда очередь сократится до допустимой
+        if rate:
+            wait = math.ceil((depth - allowed) / rate)
+        else:
+            wait = settings.YOLO_ADMISSION_RETRY_AFTER
+        retry_after = max(retry_after, wait)
+        overloaded_depth = max(overloaded_depth, depth)
+
+    if overloaded_depth:
+        raise Overloaded(max(1, min(retry_after, max_wait)), overloaded_depth)
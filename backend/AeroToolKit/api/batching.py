@@ -0,0 +1,346 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from queue import Empty, Queue
+
+import numpy as np
+
+
+class BatchStats:
+    """
+    Счетчики заполненности батчей движка микробатчинга.
+
+    Позволяют оценить, насколько эффективно задачи объединяются в батчи:
+    средний размер батча, коэффициент заполнения относительно максимума,
+    распределение размеров и причины сброса (по размеру или по таймауту).
+
+    Attributes:
+        batches (int): Количество выполненных батчей
+        images (int): Количество обработанных изображений
+        flushed_by_size (int): Сколько батчей отправлено по достижении максимума
+        flushed_by_deadline (int): Сколько батчей отправлено по истечении ожидания
+        size_histogram (dict): Распределение батчей по размеру
+        queue_wait_total (float): Суммарное время ожидания изображений в очереди
+        inference_time_total (float): Суммарное время вызовов ort_session.run
+    """
+
+    def __init__(self, max_batch_size):
+        self.max_batch_size = max_batch_size
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Обнуляет все счетчики."""
+        with self._lock:
+            self.batches = 0
+            self.images = 0
+            self.flushed_by_size = 0
+            self.flushed_by_deadline = 0
+            self.size_histogram = {}
+            self.queue_wait_total = 0.0
+            self.inference_time_total = 0.0
+
+    def record(self, batch_size, by_size, queue_wait, inference_time):
+        """
+        Регистрирует выполненный батч.
+
+        Args:
+            batch_size (int): Количество изображений в батче
+            by_size (bool): True если батч сброшен по достижении максимума
+            queue_wait (float): Суммарное ожидание изображений батча в очереди
+            inference_time (float): Время выполнения инференса батча
+        """
+        with self._lock:
+            self.batches += 1
+            self.images += batch_size
+            if by_size:
+                self.flushed_by_size += 1
+            else:
+                self.flushed_by_deadline += 1
+            self.size_histogram[batch_size] = (
+                self.size_histogram.get(batch_size, 0) + 1
+            )
+            self.queue_wait_total += queue_wait
+            self.inference_time_total += inference_time
+
+    def as_dict(self):
+        """
+        Возвращает снимок счетчиков.
+
+        Returns:
+            dict: Счетчики и производные метрики (средний размер батча,
+                  заполненность, среднее ожидание в очереди в мс)
+        """
+        with self._lock:
+            avg_batch = self.images / self.batches if self.batches else 0.0
+            return {
+                'batches': self.batches,
+                'images': self.images,
+                'max_batch_size': self.max_batch_size,
+                'avg_batch_size': round(avg_batch, 2),
+                'fill_ratio': (
+                    round(avg_batch / self.max_batch_size, 3)
+                    if self.max_batch_size
+                    else 0.0
+                ),
+                'flushed_by_size': self.flushed_by_size,
+                'flushed_by_deadline': self.flushed_by_deadline,
+                'size_histogram': dict(sorted(self.size_histogram.items())),
+                'avg_queue_wait_ms': (
+                    round(self.queue_wait_total / self.images * 1000, 2)
+                    if self.images
+                    else 0.0
+                ),
+                'avg_inference_ms_per_image': (
+                    round(self.inference_time_total / self.images * 1000, 2)
+                    if self.images
+                    else 0.0
+                ),
+            }
+
+
+class MicroBatchInferenceEngine:
+    """
+    Движок динамического микробатчинга для ONNX инференса YOLO.
+
+    Собирает изображения от параллельно выполняющихся задач
+    process_instrument_with_yolo в один батч и выполняет единственный вызов
+    ort_session.run. Батч отправляется, как только набирается max_batch_size
+    изображений или истекает бюджет задержки max_wait_ms с момента прихода
+    первого изображения. Выходы модели разрезаются обратно по изображениям.
+
+    Объединение происходит только внутри одного процесса, поэтому движок
+    полезен при запуске Celery воркера с пулом потоков (-P threads).
+    В prefork пуле каждый процесс обрабатывает одну задачу за раз,
+    и движок вырождается в батч из одного изображения.
+
+    Если вход модели экспортирован со статическим размером батча,
+    максимальный размер батча ограничивается этим значением.
+
+    Attributes:
+        session (onnxruntime.InferenceSession): ONNX сессия модели
+        max_batch_size (int): Максимальное количество изображений в батче
+        max_wait (float): Бюджет задержки в секундах
+        stats (BatchStats): Счетчики заполненности батчей
+    """
+
+    # Как часто (в батчах) печатать сводку по заполненности
+    LOG_EVERY_BATCHES = 100
+
+    def __init__(self, session, max_batch_size=8, max_wait_ms=15.0):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+        self.output_names = [
+            output.name for output in session.get_outputs()
+        ]
+        self._local = threading.local()
+
+        static_batch = session.get_inputs()[0].shape[0]
+        if isinstance(static_batch, int) and static_batch > 0:
+            max_batch_size = min(max_batch_size, static_batch)
+
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.stats = BatchStats(self.max_batch_size)
+
+        self._queue = Queue()
+        self._worker = None
+        self._worker_pid = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def batching_enabled(self):
+        """bool: Имеет ли смысл собирать изображения в батчи."""
+        return self.max_batch_size > 1 and self.max_wait > 0
+
+    def _ensure_worker(self):
+        """
+        Запускает фоновый поток сборки батчей.
+
+        Поток запускается лениво при первом обращении и перезапускается
+        после fork (например, в дочерних процессах Celery), так как потоки
+        родительского процесса в дочерний не наследуются.
+        """
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid:
+            return
+        with self._start_lock:
+            if self._worker is not None and self._worker_pid == pid:
+                return
+            self._queue = Queue()
+            self._worker = threading.Thread(
+                target=self._loop, name='yolo-microbatch', daemon=True
+            )
+            self._worker_pid = pid
+            self._worker.start()
+
+    def submit(self, img_input):
+        """
+        Ставит изображение в очередь на батчевый инференс.
+
+        Args:
+            img_input (numpy.ndarray): Тензор изображения формы (1, C, H, W)
+
+        Returns:
+            Future: Будущий результат - список выходов модели для этого
+                    изображения, каждый с ведущей размерностью батча 1
+        """
+        future = Future()
+        if not self.batching_enabled:
+            future.set_result(self.run_batch([img_input])[0])
+            return future
+
+        self._ensure_worker()
+        self._queue.put((img_input, future, time.monotonic()))
+        return future
+
+    def infer(self, img_input, timeout=None):
+        """
+        Синхронная обертка над submit.
+
+        Args:
+            img_input (numpy.ndarray): Тензор изображения формы (1, C, H, W)
+            timeout (float): Максимальное время ожидания результата в секундах
+
+        Returns:
+            list: Выходы модели для изображения (как у ort_session.run)
+        """
+        return self.submit(img_input).result(timeout=timeout)
+
+    def run_batch(self, inputs):
+        """
+        Выполняет инференс над готовым набором изображений.
+
+        Используется как фоновым потоком, так и вызывающим кодом, у которого
+        уже есть несколько изображений. Набор разбивается на куски
+        не больше max_batch_size.
+
+        Args:
+            inputs (list): Список тензоров формы (1, C, H, W) одинакового размера
+
+        Returns:
+            list: Для каждого изображения - список выходов модели
+        """
+        results = []
+        for start in range(0, len(inputs), self.max_batch_size):
+            chunk = inputs[start : start + self.max_batch_size]
+            run_start = time.monotonic()
+            results.extend(self._run(chunk))
+            self.stats.record(
+                len(chunk),
+                by_size=len(chunk) == self.max_batch_size,
+                queue_wait=0.0,
+                inference_time=time.monotonic() - run_start,
+            )
+        return results
+
+    def _gather(self, inputs):
+        """
+        Собирает изображения в один входной тензор батча.
+
+        Вместо np.concatenate изображения копируются в заранее выделенный
+        буфер потока, который переиспользуется между батчами.
+
+        Args:
+            inputs (list): Список тензоров формы (1, C, H, W)
+
+        Returns:
+            numpy.ndarray: Тензор формы (N, C, H, W)
+        """
+        if len(inputs) == 1:
+            return inputs[0]
+
+        shape = (self.max_batch_size,) + inputs[0].shape[1:]
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        buffer = buffers.get(shape)
+        if buffer is None:
+            buffer = buffers[shape] = np.empty(shape, dtype=np.float32)
+
+        for i, img_input in enumerate(inputs):
+            buffer[i] = img_input[0]
+        return buffer[: len(inputs)]
+
+    def _run(self, inputs):
+        """
+        Один вызов инференса для списка изображений.
+
+        Вход передается через IO binding: ONNX Runtime работает напрямую
+        с памятью numpy буфера без дополнительного копирования.
+
+        Args:
+            inputs (list): Список тензоров формы (1, C, H, W)
+
+        Returns:
+            list: Для каждого изображения - список выходов модели
+        """
+        batch = self._gather(inputs)
+        binding = self.session.io_binding()
+        binding.bind_cpu_input(self.input_name, batch)
+        for name in self.output_names:
+            binding.bind_output(name)
+        self.session.run_with_iobinding(binding)
+        outputs = binding.copy_outputs_to_cpu()
+        return [
+            [output[i : i + 1] for output in outputs]
+            for i in range(len(inputs))
+        ]
+
+    def _loop(self):
+        """Цикл фонового потока: собирает батчи и выполняет инференс."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except Empty:
+                    break
+
+            self._execute(batch)
+
+    def _execute(self, batch):
+        """
+        Выполняет собранный батч и раздает результаты ожидающим задачам.
+
+        Изображения разного размера (например, при разном imgsz)
+        выполняются отдельными группами.
+
+        Args:
+            batch (list): Элементы очереди (тензор, future, время постановки)
+        """
+        started = time.monotonic()
+        groups = {}
+        for item in batch:
+            groups.setdefault(item[0].shape, []).append(item)
+
+        for items in groups.values():
+            run_start = time.monotonic()
+            try:
+                results = self._run([item[0] for item in items])
+            except Exception as e:
+                for _, future, _ in items:
+                    future.set_exception(e)
+                continue
+
+            inference_time = time.monotonic() - run_start
+            self.stats.record(
+                len(items),
+                by_size=len(batch) == self.max_batch_size,
+                queue_wait=sum(started - item[2] for item in items),
+                inference_time=inference_time,
+            )
+            for (_, future, _), result in zip(items, results):
+                future.set_result(result)
+
+        if self.stats.batches % self.LOG_EVERY_BATCHES == 0:
+            print(
+                f" [BACKEND YOLO] Micro-batching stats: {self.stats.as_dict()}",
+                flush=True,
+            )
@@ -0,0 +1,122 @@
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Коэффициенты уменьшения, которые OpenCV умеет выполнять при декодировании
+# JPEG через масштабирование DCT
+CV2_REDUCED_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+
+
+class DecodedImage:
+    """
+    Изображение, декодированное для инференса.
+
+    Attributes:
+        array (numpy.ndarray): Пиксели в формате HWC, RGB, uint8
+        orig_size (tuple): Размер исходного изображения (ширина, высота)
+        scale_x (float): Отношение ширины декодированного изображения
+                         к исходной (1.0 - полное разрешение)
+        scale_y (float): То же для высоты
+    """
+
+    def __init__(self, array, orig_size):
+        self.array = array
+        self.orig_size = orig_size
+        self.scale_x = array.shape[1] / orig_size[0]
+        self.scale_y = array.shape[0] / orig_size[1]
+
+
+def decode_full(image_data):
+    """
+    Декодирует изображение в полном разрешении.
+
+    Args:
+        image_data (bytes): Байтовые данные изображения
+
+    Returns:
+        DecodedImage: Изображение в исходном разрешении
+    """
+    image = Image.open(io.BytesIO(image_data)).convert("RGB")
+    return DecodedImage(np.array(image), image.size)
+
+
+def decode_pil_draft(image_data, target_size):
+    """
+    Декодирует JPEG с уменьшением через PIL draft().
+
+    draft() настраивает JPEG декодер на масштабирование DCT (1/2, 1/4, 1/8)
+    так, чтобы результат был не меньше target_size по обеим сторонам.
+    Для других форматов draft() ничего не делает и изображение
+    декодируется полностью.
+
+    Args:
+        image_data (bytes): Байтовые данные изображения
+        target_size (int): Минимальный размер стороны после декодирования
+
+    Returns:
+        DecodedImage: Уменьшенное изображение
+    """
+    image = Image.open(io.BytesIO(image_data))
+    orig_size = image.size
+    image.draft("RGB", (target_size, target_size))
+    image = image.convert("RGB")
+    return DecodedImage(np.array(image), orig_size)
+
+
+def decode_cv2_reduced(image_data, target_size):
+    """
+    Декодирует JPEG с уменьшением через OpenCV IMREAD_REDUCED_COLOR_*.
+
+    Коэффициент выбирается максимальным из 8, 4, 2, при котором меньшая
+    сторона остается не меньше target_size. Размер исходного изображения
+    читается из заголовка без декодирования пикселей.
+
+    Args:
+        image_data (bytes): Байтовые данные изображения
+        target_size (int): Минимальный размер стороны после декодирования
+
+    Returns:
+        DecodedImage: Уменьшенное изображение
+    """
+    orig_size = Image.open(io.BytesIO(image_data)).size
+    flags = cv2.IMREAD_COLOR
+    for factor, reduced_flag in CV2_REDUCED_FLAGS.items():
+        if min(orig_size) / factor >= target_size:
+            flags = reduced_flag
+            break
+
+    # PIL не применяет EXIF ориентацию, отключаем ее и в OpenCV,
+    # чтобы координаты совпадали с исходным файлом
+    buf = np.frombuffer(image_data, dtype=np.uint8)
+    bgr = cv2.imdecode(buf, flags | cv2.IMREAD_IGNORE_ORIENTATION)
+    if bgr is None:
+        return decode_full(image_data)
+    return DecodedImage(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB), orig_size)
+
+
+DECODERS = {
+    'full': lambda image_data, target_size: decode_full(image_data),
+    'pil': decode_pil_draft,
+    'cv2': decode_cv2_reduced,
+}
+
+
+def decode_for_inference(image_data, target_size, decoder='pil'):
+    """
+    Декодирует изображение в разрешении, близком к входу модели.
+
+    Args:
+        image_data (bytes): Байтовые данные изображения
+        target_size (int): Размер входа модели (imgsz)
+        decoder (str): 'pil' (draft), 'cv2' (IMREAD_REDUCED) или 'full'
+
+    Returns:
+        DecodedImage: Декодированное изображение
+    """
+    return DECODERS[decoder](image_data, target_size)
@@ -0,0 +1,232 @@
+from celery import chain, group
+from django.conf import settings
+
+from AeroToolKit.celery import app
+
+# Имя задачи YOLO обработки. Веб-воркеры отправляют задачу по имени и не
+# импортируют api.tasks, поэтому onnxruntime, OpenCV и модель загружаются
+# только в Celery воркерах.
+PROCESS_INSTRUMENT_TASK = 'api.tasks.process_instrument_with_yolo'
+PROCESS_INSTRUMENT_BATCH_TASK = 'api.tasks.process_instrument_batch'
+
+# Этапы конвейера (settings.YOLO_PIPELINE = 'staged'), очереди этапов
+# задаются в CELERY_TASK_ROUTES
+DECODE_STAGE_TASK = 'api.tasks.decode_instrument_image'
+INFER_STAGE_TASK = 'api.tasks.infer_instrument_image'
+PERSIST_STAGE_TASK = 'api.tasks.persist_instrument_results'
+
+
+# Классы приоритета обработки, очереди задаются в YOLO_PRIORITY_QUEUES
+PRIORITIES = ('interactive', 'bulk', 'maintenance')
+
+
+class PayloadTooLarge(Exception):
+    """Изображение слишком велико для передачи в сообщении Celery."""
+
+
+def inline_payload_enabled():
+    """bool: Передаются ли байты изображения в сообщении задачи."""
+    return settings.YOLO_TASK_PAYLOAD == 'inline'
+
+
+def choose_priority(batch_size=1, requested=None):
+    """
+    Определяет класс приоритета обработки.
+
+    Явно запрошенный приоритет (например, от фото сервера или команды
+    повторной обработки) используется как есть. Иначе пакеты больше
+    YOLO_INTERACTIVE_MAX_BATCH изображений считаются bulk, чтобы не
+    задерживать одиночные проверки на посту.
+
+    Args:
+        batch_size (int): Количество изображений в запросе
+        requested (str): Запрошенный приоритет или None
+
+    Returns:
+        str: Один из PRIORITIES
+    """
+    if requested:
+        if requested not in PRIORITIES:
+            raise ValueError(
+                f"Unknown priority '{requested}', expected one of {PRIORITIES}"
+            )
+        return requested
+    if batch_size > settings.YOLO_INTERACTIVE_MAX_BATCH:
+        return 'bulk'
+    return 'interactive'
+
+
+def priority_queue(priority):
+    """str: Очередь Celery для класса приоритета."""
+    return settings.YOLO_PRIORITY_QUEUES[priority]
+
+
+def check_payload_size(size):
+    """
+    Проверяет, можно ли передать изображение в сообщении задачи.
+
+    В режиме 'reference' в сообщении передается только путь к файлу,
+    и размер изображения не ограничивается.
+
+    Args:
+        size (int): Размер изображения в байтах
+
+    Raises:
+        PayloadTooLarge: Если в режиме 'inline' размер превышает
+                         settings.YOLO_TASK_INLINE_MAX_BYTES
+    """
+    limit = settings.YOLO_TASK_INLINE_MAX_BYTES
+    if inline_payload_enabled() and size > limit:
+        raise PayloadTooLarge(
+            f'Изображение {size} байт превышает лимит {limit} байт '
+            f'для передачи в задачу'
+        )
+
+
+def enqueue_instrument_processing(
+    instrument,
+    expected_objects,
+    expected_confidence,
+    image_data=None,
+    tile_grid=None,
+    tile_overlap=None,
+    priority=None,
+):
+    """
+    Ставит YOLO обработку инструмента в очередь Celery.
+
+    Задача отправляется через send_task по имени, маршрутизация в очередь
+    выполняется по CELERY_TASK_ROUTES так же, как при вызове delay().
+
+    По умолчанию (YOLO_TASK_PAYLOAD = 'reference') в сообщении передается
+    путь к уже сохраненному изображению instrument.image, и воркер читает
+    файл из общего хранилища. Это избавляет Redis от base64 копий
+    многомегабайтных фотографий. В режиме 'inline' передаются байты
+    image_data, размер которых ограничен YOLO_TASK_INLINE_MAX_BYTES.
+
+    При YOLO_PIPELINE = 'staged' вместо одной задачи запускается цепочка
+    decode -> infer -> persist, этапы которой выполняются в отдельных
+    очередях со своими пулами воркеров. Обработка с приоритетом bulk
+    или maintenance всегда выполняется одной задачей в очереди своего
+    класса и не занимает очереди этапов интерактивного конвейера.
+
+    Args:
+        instrument (Instrument): Сохраненный инструмент с изображением
+        expected_objects (int): Ожидаемое количество объектов на изображении
+        expected_confidence (float): Порог уверенности для детекции (0.0-1.0)
+        image_data (bytes): Бинарные данные изображения (только для 'inline')
+        tile_grid (int): Количество тайлов по стороне (None - по настройкам)
+        tile_overlap (float): Доля перекрытия тайлов (None - по настройкам)
+        priority (str): Класс приоритета (None - interactive)
+
+    Returns:
+        AsyncResult: Результат отправки задачи (для цепочки - последнего
+                     этапа) с ее ID
+
+    Raises:
+        PayloadTooLarge: Если изображение слишком велико для режима 'inline'
+    """
+    image_name = instrument.image.name
+    if inline_payload_enabled():
+        if image_data is None:
+            with instrument.image.open('rb') as f:
+                image_data = f.read()
+        check_payload_size(len(image_data))
+        image_name = None
+    else:
+        image_data = None
+
+    priority = choose_priority(requested=priority)
+    if settings.YOLO_PIPELINE == 'staged' and priority == 'interactive':
+        return chain(
+            app.signature(
+                DECODE_STAGE_TASK,
+                args=[
+                    instrument.id,
+                    image_name,
+                    expected_objects,
+                    expected_confidence,
+                ],
+                kwargs={
+                    'image_data': image_data,
+                    'tile_grid': tile_grid,
+                    'tile_overlap': tile_overlap,
+                },
+            ),
+            app.signature(INFER_STAGE_TASK),
+            app.signature(PERSIST_STAGE_TASK),
+        ).apply_async()
+
+    return app.send_task(
+        PROCESS_INSTRUMENT_TASK,
+        args=[
+            instrument.id,
+            image_data,
+            expected_objects,
+            expected_confidence,
+        ],
+        kwargs={
+            'tile_grid': tile_grid,
+            'tile_overlap': tile_overlap,
+            'image_name': image_name,
+        },
+        queue=priority_queue(priority),
+    )
+
+
+def enqueue_instrument_batch(
+    instruments,
+    expected_objects,
+    expected_confidence,
+    tile_grid=None,
+    tile_overlap=None,
+    priority=None,
+    chunk_size=None,
+):
+    """
+    Ставит YOLO обработку нескольких инструментов в очередь группой задач.
+
+    Изображения всегда передаются ссылками на файлы в хранилище media:
+    байты нескольких фотографий в одном сообщении перегрузили бы Redis.
+
+    Пакет делится на задачи process_instrument_batch по chunk_size
+    изображений, которые отправляются одной группой Celery и
+    выполняются параллельно разными воркерами: крупная загрузка не
+    обрабатывается целиком одним воркером.
+
+    Очередь выбирается по классу приоритета всего пакета: небольшие
+    пакеты идут в интерактивную очередь, крупные - в очередь bulk
+    (см. choose_priority).
+
+    Args:
+        instruments (list): Сохраненные инструменты с изображениями
+        expected_objects (int): Ожидаемое количество объектов на изображении
+        expected_confidence (float): Порог уверенности для детекции (0.0-1.0)
+        tile_grid (int): Количество тайлов по стороне (None - по настройкам)
+        tile_overlap (float): Доля перекрытия тайлов (None - по настройкам)
+        priority (str): Класс приоритета (None - по размеру пакета)
+        chunk_size (int): Изображений в одной задаче (None -
+                          YOLO_BATCH_TASK_MAX_IMAGES)
+
+    Returns:
+        GroupResult: Результат отправки группы с ID задач
+    """
+    priority = choose_priority(len(instruments), priority)
+    chunk_size = chunk_size or settings.YOLO_BATCH_TASK_MAX_IMAGES
+    items = [
+        {'instrument_id': instrument.id, 'image_name': instrument.image.name}
+        for instrument in instruments
+    ]
+    return group(
+        app.signature(
+            PROCESS_INSTRUMENT_BATCH_TASK,
+            args=[
+                items[start : start + chunk_size],
+                expected_objects,
+                expected_confidence,
+            ],
+            kwargs={'tile_grid': tile_grid, 'tile_overlap': tile_overlap},
+            queue=priority_queue(priority),
+        )
+        for start in range(0, len(items), chunk_size)
+    ).apply_async()
@@ -0,0 +1,45 @@
+import functools
+import json
+
+import redis
+from django.conf import settings
+
+# Статусы, после которых обработка инструмента не продолжается
+TERMINAL_STATUSES = ('done', 'failed')
+
+
+@functools.lru_cache(maxsize=None)
+def get_redis():
+    """
+    Возвращает клиент Redis для публикации событий (один на процесс).
+
+    Returns:
+        redis.Redis: Клиент с пулом соединений
+    """
+    return redis.Redis.from_url(settings.YOLO_EVENTS_REDIS_URL)
+
+
+def publish_status(instrument_ids, processing_status):
+    """
+    Публикует смену статуса обработки инструментов в канал Redis.
+
+    Одно сообщение содержит все ID, например для пакетной задачи.
+    Ошибки Redis не прерывают обработку: подписчики получат актуальный
+    статус при переподключении.
+
+    Args:
+        instrument_ids (list): ID инструментов
+        processing_status (str): Новый статус обработки
+    """
+    if not instrument_ids:
+        return
+    message = json.dumps(
+        {'ids': list(instrument_ids), 'processing_status': processing_status}
+    )
+    try:
+        get_redis().publish(settings.YOLO_EVENTS_CHANNEL, message)
+    except redis.RedisError as e:
+        print(
+            f" [BACKEND CELERY] Failed to publish status event: {e}",
+            flush=True,
+        )
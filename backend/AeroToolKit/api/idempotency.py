@@ -0,0 +1,75 @@
+import contextlib
+
+import redis
+from django.conf import settings
+
+from .events import get_redis
+
+LOCK_KEY_PREFIX = 'yolo:lock:'
+
+
+@contextlib.contextmanager
+def instrument_lock(instrument_id, stage='process'):
+    """
+    Блокировка обработки инструмента на время выполнения задачи.
+
+    При CELERY_TASK_ACKS_LATE задача может быть доставлена повторно, пока
+    первая доставка еще выполняется (например, по visibility timeout
+    Redis). Блокировка - ключ Redis, установленный через SET NX с TTL
+    YOLO_TASK_LOCK_TTL и токеном владельца: повторная доставка ее не
+    получает и завершается без инференса. Если воркер упал, ключ
+    истекает сам.
+
+    При недоступности Redis обработка выполняется без блокировки.
+
+    Args:
+        instrument_id (int): ID инструмента
+        stage (str): Этап обработки, у каждого этапа своя блокировка
+
+    Yields:
+        bool: Получена ли блокировка (False - инструмент уже
+              обрабатывается другой доставкой задачи)
+    """
+    lock = get_redis().lock(
+        f'{LOCK_KEY_PREFIX}{stage}:{instrument_id}',
+        timeout=settings.YOLO_TASK_LOCK_TTL,
+    )
+    try:
+        acquired = lock.acquire(blocking=False)
+    except redis.RedisError as e:
+        print(
+            f" [BACKEND CELERY] Lock for instrument {instrument_id} unavailable: {e}",
+            flush=True,
+        )
+        yield True
+        return
+
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except redis.RedisError:
+                # Блокировка истекла по TTL или Redis недоступен
+                pass
+
+
+@contextlib.contextmanager
+def instrument_locks(instrument_ids, stage='process'):
+    """
+    Блокировки нескольких инструментов (для пакетной задачи).
+
+    Args:
+        instrument_ids (list): ID инструментов
+        stage (str): Этап обработки
+
+    Yields:
+        list: ID инструментов, блокировки которых получены
+    """
+    with contextlib.ExitStack() as stack:
+        yield [
+            instrument_id
+            for instrument_id in instrument_ids
+            if stack.enter_context(instrument_lock(instrument_id, stage))
+        ]
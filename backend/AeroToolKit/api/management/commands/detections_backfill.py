@@ -0,0 +1,148 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Количество объектов в разделе YOLO анализа текста записи
+DETECTED_COUNT_PATTERN = re.compile(r'обнаружено\s+(\d+)\s+объект')
+
+
+class Command(BaseCommand):
+    """
+    Заполняет detected_count и count_matches записей, обработанных до
+    появления этих полей, и создает для них детекции Detection.
+
+    Количество берется из сохраненных детекций, а если их нет (режим
+    burn или старые записи) - из раздела YOLO анализа в тексте записи.
+    Записи без раздела YOLO анализа пропускаются.
+
+    Детекции Detection создаются по полю detections для записей, у
+    которых их еще нет. У записей без detections (режим burn, записи до
+    сохранения координат) координат нет: для них детекции появятся
+    только после повторной обработки командой yolo_reprocess.
+
+    Example:
+        python manage.py detections_backfill --dry-run
+    """
+
+    help = 'Заполняет detected_count и count_matches по прежним записям'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать количество записей',
+        )
+        parser.add_argument(
+            '--chunk',
+            type=int,
+            default=2000,
+            help='Размер порции при чтении и обновлении записей',
+        )
+
+    def handle(self, *args, **options):
+        from api.tasks import YOLO_SECTION_PREFIX
+        from instruments.models import Instrument
+
+        if options['chunk'] < 1:
+            raise CommandError('--chunk должен быть положительным')
+        self.section_prefix = YOLO_SECTION_PREFIX
+
+        queryset = Instrument.objects.filter(
+            detected_count__isnull=True, text__contains=YOLO_SECTION_PREFIX
+        ).only('id', 'text', 'detections', 'expected_objects')
+
+        updated = skipped = 0
+        batch = []
+        for instrument in queryset.iterator(chunk_size=options['chunk']):
+            detected_count = self.detected_count(instrument)
+            if detected_count is None:
+                skipped += 1
+                continue
+            instrument.detected_count = detected_count
+            instrument.update_count_matches()
+            batch.append(instrument)
+            if len(batch) >= options['chunk']:
+                updated += self.flush(batch, options['dry_run'])
+        updated += self.flush(batch, options['dry_run'])
+
+        action = 'Будет обновлено' if options['dry_run'] else 'Обновлено'
+        self.stdout.write(f'{action}: {updated} записей, пропущено {skipped}')
+
+        created = self.create_detections(options['chunk'], options['dry_run'])
+        action = 'Будет создано' if options['dry_run'] else 'Создано'
+        self.stdout.write(f'{action}: {created} детекций')
+
+    def create_detections(self, chunk, dry_run):
+        """
+        Создает детекции Detection по полю detections записей без них.
+
+        Args:
+            chunk (int): Размер порции записей
+            dry_run (bool): Не сохранять, только посчитать
+
+        Returns:
+            int: Количество детекций
+        """
+        from instruments.models import Detection, Instrument
+
+        # ID выбираются заранее: созданные детекции меняют результат
+        # условия boxes__isnull
+        ids = list(
+            Instrument.objects.exclude(detections=[])
+            .filter(boxes__isnull=True)
+            .values_list('id', flat=True)
+        )
+        created = 0
+        for start in range(0, len(ids), chunk):
+            batch = [
+                Detection.from_result(instrument, detection)
+                for instrument in Instrument.objects.filter(
+                    id__in=ids[start : start + chunk]
+                ).only('id', 'detections')
+                for detection in instrument.detections
+            ]
+            created += len(batch)
+            if not dry_run:
+                Detection.objects.bulk_create(batch)
+        return created
+
+    def detected_count(self, instrument):
+        """
+        Определяет количество обнаруженных объектов записи.
+
+        Args:
+            instrument (Instrument): Запись
+
+        Returns:
+            int: Количество объектов или None, если его не определить
+        """
+        if instrument.detections:
+            return len(instrument.detections)
+        section = instrument.text.split(self.section_prefix, 1)[-1]
+        match = DETECTED_COUNT_PATTERN.search(section)
+        if match:
+            return int(match.group(1))
+        if 'не обнаружены' in section:
+            return 0
+        return None
+
+    def flush(self, batch, dry_run):
+        """
+        Сохраняет порцию записей одним запросом bulk_update.
+
+        Args:
+            batch (list): Записи с заполненными полями, очищается
+            dry_run (bool): Не сохранять, только посчитать
+
+        Returns:
+            int: Количество записей в порции
+        """
+        from instruments.models import Instrument
+
+        count = len(batch)
+        if batch and not dry_run:
+            Instrument.objects.bulk_update(
+                batch, ['detected_count', 'count_matches']
+            )
+        batch.clear()
+        return count
@@ -0,0 +1,78 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    """
+    Отмечает обработанными записи, созданные до появления статуса
+    обработки.
+
+    Поле processing_status добавлено со значением по умолчанию queued,
+    поэтому уже обработанные ранее записи после развертывания
+    выглядят ожидающими: эндпоинт статусов возвращает для них queued,
+    а поток событий не присылает complete. Записи с результатами YOLO
+    (раздел анализа в тексте, размеры изображения или изображение с
+    разметкой) переводятся в done.
+
+    Учитываются только записи, созданные раньше --before. По умолчанию
+    это время создания первой записи, которую обработал новый код
+    (заполнено processing_started_at). Команду нужно выполнить один раз
+    после развертывания и до запуска yolo_reprocess: переобработка
+    сбрасывает статус в queued, не очищая прежние результаты.
+
+    Example:
+        python manage.py processing_status_backfill --dry-run
+        python manage.py processing_status_backfill --before 2025-06-01T00:00
+    """
+
+    help = 'Отмечает done записи с результатами YOLO, созданные до статусов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            help='Граница времени создания записей (ISO 8601)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать количество записей',
+        )
+
+    def handle(self, *args, **options):
+        from api.tasks import YOLO_SECTION_PREFIX
+        from instruments.models import Instrument, ProcessingStatus
+
+        if options['before']:
+            try:
+                before = datetime.fromisoformat(options['before'])
+            except ValueError:
+                raise CommandError('--before: ожидается дата в ISO 8601')
+            if timezone.is_naive(before):
+                before = timezone.make_aware(before)
+        else:
+            first = (
+                Instrument.objects.filter(processing_started_at__isnull=False)
+                .order_by('pub_date')
+                .values_list('pub_date', flat=True)
+                .first()
+            )
+            before = first or timezone.now()
+        self.stdout.write(f'Записи, созданные до {before.isoformat()}')
+
+        queryset = Instrument.objects.filter(
+            Q(text__contains=YOLO_SECTION_PREFIX)
+            | Q(image_width__isnull=False)
+            | ~Q(annotated_image=''),
+            processing_status=ProcessingStatus.QUEUED,
+            processing_started_at__isnull=True,
+            pub_date__lt=before,
+        )
+        if options['dry_run']:
+            self.stdout.write(f'Будет обновлено: {queryset.count()} записей')
+            return
+
+        updated = queryset.update(processing_status=ProcessingStatus.DONE)
+        self.stdout.write(f'Обновлено: {updated} записей')
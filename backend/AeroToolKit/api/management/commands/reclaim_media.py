@@ -0,0 +1,191 @@
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    """
+    Удаляет из media файлы, на которые не ссылается ни один инструмент.
+
+    Просматривается каталог instruments/ (исходные фотографии, изображения
+    с разметкой и файлы прежней схемы temp_*.jpg / instrument_*.jpg),
+    каталог промежуточных файлов конвейера YOLO_PIPELINE_DIR и каталог
+    временных файлов загрузок FILE_UPLOAD_TEMP_DIR. Ссылки
+    загружаются из БД одним проходом по полям image и annotated_image.
+
+    Сессии возобновляемой загрузки, не обновлявшиеся дольше
+    UPLOAD_SESSION_TTL, удаляются вместе с принятыми частями в
+    UPLOAD_SESSION_DIR.
+
+    Файлы моложе --min-age секунд не удаляются: загрузка записывает
+    файл до сохранения записи в БД. Промежуточный файл конвейера
+    удаляется, только если обработка его инструмента завершена (done
+    или failed) или инструмента больше нет: файл ждущей в очереди
+    обработки может быть старше --min-age.
+
+    Example:
+        python manage.py reclaim_media --dry-run
+        python manage.py reclaim_media --min-age 86400
+    """
+
+    help = 'Удаляет неиспользуемые файлы изображений из media'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=3600,
+            help='Минимальный возраст удаляемого файла, секунды',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что будет удалено',
+        )
+        parser.add_argument(
+            '--chunk',
+            type=int,
+            default=2000,
+            help='Размер порции при чтении ссылок из БД',
+        )
+
+    def handle(self, *args, **options):
+        from instruments.models import Instrument, UploadSession
+
+        if options['min_age'] < 0:
+            raise CommandError('--min-age не может быть отрицательным')
+
+        referenced = set()
+        for image, annotated in Instrument.objects.values_list(
+            'image', 'annotated_image'
+        ).iterator(chunk_size=options['chunk']):
+            referenced.add(image)
+            referenced.add(annotated)
+        self.stdout.write(f'Файлов в БД: {len(referenced - {""})}')
+
+        cutoff = time.time() - options['min_age']
+        media_root = settings.MEDIA_ROOT
+        candidates = []
+        for path, stat in self.walk(os.path.join(media_root, 'instruments')):
+            name = os.path.relpath(path, media_root).replace(os.sep, '/')
+            if name not in referenced and stat.st_mtime < cutoff:
+                candidates.append((path, stat.st_size))
+        # Промежуточные файлы конвейера остаются после падения воркера
+        # или ошибки сохранения результатов
+        candidates.extend(
+            self.finished_pipeline_files(cutoff, options['chunk'])
+        )
+        # Временные файлы загрузок остаются после падения gunicorn
+        for path, stat in self.walk(settings.FILE_UPLOAD_TEMP_DIR):
+            if stat.st_mtime < cutoff:
+                candidates.append((path, stat.st_size))
+
+        expired = UploadSession.objects.filter(
+            updated_at__lt=timezone.now()
+            - timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+        )
+        live_parts = {
+            f'{pk}.part'
+            for pk in UploadSession.objects.filter(
+                instrument__isnull=True
+            ).exclude(pk__in=expired).values_list('pk', flat=True)
+        }
+        for path, stat in self.walk(settings.UPLOAD_SESSION_DIR):
+            name = os.path.basename(path)
+            if name not in live_parts and stat.st_mtime < cutoff:
+                candidates.append((path, stat.st_size))
+
+        total = sum(size for _, size in candidates)
+        if options['dry_run']:
+            for path, _ in candidates:
+                self.stdout.write(path)
+            self.stdout.write(
+                f'Будет удалено: {len(candidates)} файлов, '
+                f'{total / 2**20:.1f} МБ, '
+                f'сессий загрузки: {expired.count()}'
+            )
+            return
+
+        sessions, _ = expired.delete()
+
+        removed = freed = 0
+        for path, size in candidates:
+            try:
+                os.remove(path)
+            except OSError as e:
+                self.stderr.write(f'Не удалось удалить {path}: {e}')
+                continue
+            removed += 1
+            freed += size
+        self.stdout.write(
+            f'Удалено: {removed} файлов, освобождено {freed / 2**20:.1f} МБ, '
+            f'сессий загрузки: {sessions}'
+        )
+
+    def finished_pipeline_files(self, cutoff, chunk):
+        """
+        Находит промежуточные файлы конвейера завершенных обработок.
+
+        Имя файла начинается с ID инструмента (см.
+        decode_instrument_image). Файлы инструментов в статусе queued
+        или running пропускаются, файлы без ID в имени (прежняя схема)
+        удаляются только по возрасту.
+
+        Args:
+            cutoff (float): Удаляются файлы, измененные раньше этого времени
+            chunk (int): Размер порции ID при запросе статусов
+
+        Returns:
+            list: Кортежи (путь к файлу, размер)
+        """
+        from instruments.models import Instrument, ProcessingStatus
+
+        files = []
+        for path, stat in self.walk(settings.YOLO_PIPELINE_DIR):
+            if stat.st_mtime >= cutoff:
+                continue
+            prefix = os.path.basename(path).split('-', 1)[0]
+            instrument_id = int(prefix) if prefix.isdigit() else None
+            files.append((path, stat.st_size, instrument_id))
+
+        ids = sorted({id for _, _, id in files if id is not None})
+        pending = set()
+        for start in range(0, len(ids), chunk):
+            pending.update(
+                Instrument.objects.filter(
+                    id__in=ids[start : start + chunk],
+                    processing_status__in=(
+                        ProcessingStatus.QUEUED,
+                        ProcessingStatus.RUNNING,
+                    ),
+                ).values_list('id', flat=True)
+            )
+        return [
+            (path, size)
+            for path, size, instrument_id in files
+            if instrument_id not in pending
+        ]
+
+    def walk(self, root):
+        """
+        Рекурсивно перечисляет файлы каталога.
+
+        Args:
+            root (str): Каталог
+
+        Yields:
+            tuple: (путь к файлу, os.stat_result)
+        """
+        try:
+            entries = list(os.scandir(root))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from self.walk(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry.path, entry.stat()
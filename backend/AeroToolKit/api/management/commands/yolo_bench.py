@@ -0,0 +1,305 @@
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+MODES = ['nms', 'coldstart', 'decode', 'preprocess', 'render']
+
+
+class Command(BaseCommand):
+    """
+    Проверки и замеры производительности конвейера YOLO.
+
+    Режимы:
+        nms - сравнивает векторизованный batched_nms с эталонной
+              реализацией nms() на случайных наборах box'ов и выводит
+              количество расхождений и время обеих реализаций
+        coldstart - время создания ONNX сессии и первого инференса:
+              сессия по умолчанию, настроенная сессия без кэша
+              оптимизированной модели и с ним
+        decode - время декодирования изображения для инференса
+              каждым декодером (full, pil, cv2) и полученный размер
+        preprocess - задержка и объем выделяемой памяти на изображение
+              для прежней предобработки (letterbox + transpose/astype)
+              и для Preprocessor с переиспользуемыми буферами
+        render - время отрисовки детекций и кодирования JPEG: прежняя
+              отрисовка через ImageDraw и api.renderer с каждым
+              кодировщиком
+
+    Example:
+        python manage.py yolo_bench nms --sets 200 --boxes 2000
+        python manage.py yolo_bench coldstart
+        python manage.py yolo_bench decode --image DSCN4946.JPG
+        python manage.py yolo_bench render --image DSCN4946.JPG
+    """
+
+    help = 'Проверки и замеры производительности конвейера YOLO'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'mode', choices=MODES, help='Режим замера'
+        )
+        parser.add_argument(
+            '--sets', type=int, default=100, help='Количество наборов'
+        )
+        parser.add_argument(
+            '--boxes', type=int, default=1000, help="Box'ов в наборе"
+        )
+        parser.add_argument(
+            '--iou', type=float, default=0.45, help='Порог IoU для NMS'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0, help='Seed генератора'
+        )
+        parser.add_argument(
+            '--image', help='Путь к изображению для замеров на реальных данных'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=10, help='Количество повторов'
+        )
+        parser.add_argument(
+            '--imgsz', type=int, default=640, help='Размер входа модели'
+        )
+
+    def handle(self, *args, **options):
+        handler = getattr(self, f"handle_{options['mode']}")
+        handler(**options)
+
+    def handle_nms(self, sets, boxes, iou, seed, **options):
+        """
+        Сравнивает batched_nms с поклассовым циклом по nms().
+
+        Уверенности генерируются без повторов, чтобы порядок обхода
+        обеих реализаций был однозначным.
+        """
+        from api.yolo_utils import batched_nms, nms
+
+        rng = np.random.default_rng(seed)
+        num_classes = 11
+        mismatches = 0
+        reference_time = 0.0
+        vectorized_time = 0.0
+
+        for _ in range(sets):
+            xy = rng.uniform(0, 600, size=(boxes, 2))
+            wh = rng.uniform(5, 120, size=(boxes, 2))
+            b = np.concatenate([xy, xy + wh], axis=1).astype(np.float32)
+            s = rng.permutation(boxes).astype(np.float32) / boxes
+            c = rng.integers(0, num_classes, size=boxes)
+
+            start = time.perf_counter()
+            expected = set()
+            for cls in np.unique(c):
+                idxs = np.where(c == cls)[0]
+                keep = nms(b[idxs], s[idxs], iou_thres=iou)
+                expected.update(int(idxs[k]) for k in keep)
+            reference_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            actual = set(batched_nms(b, s, c, iou_thres=iou).tolist())
+            vectorized_time += time.perf_counter() - start
+
+            if actual != expected:
+                mismatches += 1
+
+        self.stdout.write(
+            f'Наборов: {sets}, box\'ов в наборе: {boxes}, '
+            f'расхождений: {mismatches}'
+        )
+        self.stdout.write(
+            f'nms (эталон): {reference_time / sets * 1000:.2f} мс/набор, '
+            f'batched_nms: {vectorized_time / sets * 1000:.2f} мс/набор'
+        )
+        if mismatches:
+            raise CommandError(
+                f'batched_nms расходится с nms в {mismatches} наборах'
+            )
+
+    def handle_coldstart(self, **options):
+        """
+        Сравнивает холодный старт сессии по умолчанию и через менеджер.
+
+        Кэш оптимизированной модели создается во временном каталоге,
+        поэтому замер не зависит от состояния рабочего кэша.
+        """
+        import onnxruntime as ort
+
+        from api.onnx_session import (
+            OnnxSessionManager,
+            manager_from_settings,
+        )
+        from api.yolo_utils import YOLO_MODEL_PATH
+
+        start = time.perf_counter()
+        session = ort.InferenceSession(
+            YOLO_MODEL_PATH, providers=['CPUExecutionProvider']
+        )
+        startup = time.perf_counter() - start
+        baseline = OnnxSessionManager(YOLO_MODEL_PATH)
+        first = baseline.warmup(session)
+        self.stdout.write(
+            f'По умолчанию: создание {startup:.3f}с, первый инференс {first:.3f}с'
+        )
+
+        configured = manager_from_settings(YOLO_MODEL_PATH)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            configured.cache_dir = cache_dir
+            for label in ('Без кэша', 'Из кэша'):
+                session = configured.create_session()
+                configured.warmup(session)
+                metrics = configured.metrics
+                self.stdout.write(
+                    f"{label}: создание {metrics['session_startup_s']:.3f}с, "
+                    f"первый инференс {metrics['first_inference_s']:.3f}с, "
+                    f"кэш: {metrics['optimized_cache_hit']}"
+                )
+
+    def read_image(self, image):
+        """Читает изображение из --image или создает синтетический JPEG."""
+        if image:
+            with open(image, 'rb') as f:
+                return f.read()
+
+        import io
+
+        from PIL import Image
+
+        rng = np.random.default_rng(0)
+        pixels = rng.integers(0, 255, size=(3000, 4000, 3), dtype=np.uint8)
+        buf = io.BytesIO()
+        Image.fromarray(pixels).save(buf, format='JPEG', quality=90)
+        return buf.getvalue()
+
+    def handle_decode(self, image, repeat, imgsz, **options):
+        """Сравнивает время декодирования разными декодерами."""
+        from api.decoding import DECODERS
+
+        image_data = self.read_image(image)
+        for name, decoder in DECODERS.items():
+            start = time.perf_counter()
+            for _ in range(repeat):
+                decoded = decoder(image_data, imgsz)
+            elapsed = (time.perf_counter() - start) / repeat
+            height, width = decoded.array.shape[:2]
+            self.stdout.write(
+                f'{name}: {elapsed * 1000:.1f} мс, '
+                f'{decoded.orig_size[0]}x{decoded.orig_size[1]} -> '
+                f'{width}x{height}'
+            )
+
+    def handle_preprocess(self, repeat, imgsz, **options):
+        """
+        Сравнивает прежнюю и совмещенную предобработку.
+
+        Память считается через tracemalloc: numpy регистрирует в нем свои
+        буферы, поэтому учитываются все промежуточные массивы. Аллокации
+        внутри OpenCV в tracemalloc не видны.
+        """
+        from api.preprocessing import Preprocessor
+        from api.yolo_utils import letterbox
+
+        def legacy(im):
+            img_pad, ratio, pad = letterbox(im, new_shape=(imgsz, imgsz))
+            img_input = img_pad[:, :, ::-1].transpose(2, 0, 1)
+            return np.expand_dims(img_input, axis=0).astype(np.float32) / 255.0
+
+        fused = Preprocessor(imgsz)
+        rng = np.random.default_rng(0)
+        im = rng.integers(0, 255, size=(750, 1000, 3), dtype=np.uint8)
+
+        if not np.array_equal(legacy(im), fused(im)[0]):
+            raise CommandError('Preprocessor расходится с letterbox')
+
+        for label, func in (('letterbox', legacy), ('Preprocessor', fused)):
+            func(im)  # прогрев и выделение переиспользуемых буферов
+
+            tracemalloc.start()
+            allocated = 0
+            for _ in range(repeat):
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                func(im)
+                allocated += tracemalloc.get_traced_memory()[1] - before
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            for _ in range(repeat):
+                func(im)
+            elapsed = (time.perf_counter() - start) / repeat
+
+            self.stdout.write(
+                f'{label}: {elapsed * 1000:.2f} мс/изображение, '
+                f'пиковое выделение памяти {allocated / repeat / 1024:.0f} КБ'
+            )
+
+    def handle_render(self, image, repeat, seed, **options):
+        """
+        Сравнивает прежнюю отрисовку через ImageDraw с api.renderer.
+
+        Рисуется по одному box'у каждого класса в случайных позициях.
+        Время включает декодирование, отрисовку и кодирование JPEG.
+        """
+        import io
+
+        from django.conf import settings
+        from PIL import Image, ImageDraw, ImageFont
+
+        from api.renderer import ENCODERS, render_annotated
+
+        image_data = self.read_image(image)
+        width, height = Image.open(io.BytesIO(image_data)).size
+        rng = np.random.default_rng(seed)
+        boxes = []
+        for cls_name in settings.YOLO_CLASSES:
+            x1 = int(rng.integers(0, width * 3 // 4))
+            y1 = int(rng.integers(0, height * 3 // 4))
+            x2 = int(rng.integers(x1 + 1, width))
+            y2 = int(rng.integers(y1 + 1, height))
+            boxes.append(([x1, y1, x2, y2], cls_name, rng.random()))
+
+        def legacy():
+            im = Image.open(io.BytesIO(image_data)).convert("RGB")
+            draw = ImageDraw.Draw(im)
+            try:
+                font = ImageFont.truetype("arial.ttf", 50)
+            except OSError:
+                try:
+                    font = ImageFont.truetype("DejaVuSans.ttf", 50)
+                except OSError:
+                    font = ImageFont.load_default()
+            for (x1, y1, x2, y2), cls_name, score in boxes:
+                draw.rectangle([x1, y1, x2, y2], outline="green", width=10)
+                draw.text(
+                    (x1, max(0, y1 - 50)),
+                    f"{cls_name} {score:.2f}",
+                    fill="green",
+                    font=font,
+                )
+            buf = io.BytesIO()
+            im.save(buf, format="JPEG")
+            return buf.getvalue()
+
+        candidates = [('ImageDraw', legacy)] + [
+            (
+                f'renderer {encoder}',
+                lambda encoder=encoder: render_annotated(
+                    image_data,
+                    boxes,
+                    encoder=encoder,
+                    quality=settings.YOLO_RENDER_JPEG_QUALITY,
+                ),
+            )
+            for encoder in ENCODERS
+        ]
+        for label, func in candidates:
+            func()  # прогрев кэшей шрифтов и подписей
+            start = time.perf_counter()
+            for _ in range(repeat):
+                encoded = func()
+            elapsed = (time.perf_counter() - start) / repeat
+            self.stdout.write(
+                f'{label}: {elapsed * 1000:.1f} мс, '
+                f'{len(encoded) / 1024:.0f} КБ'
+            )
@@ -0,0 +1,145 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Создает квантованные варианты модели YOLO и сравнивает их с FP32.
+
+    Варианты сохраняются рядом с исходной моделью (yolo_models/) под именами
+    yolo_model.<вариант>.onnx. Для выбора варианта в развертывании
+    используется настройка YOLO_MODEL_VARIANT.
+
+    Отчет для каждого варианта содержит размер файла, задержку (среднюю
+    и p95), пропускную способность на батчах, прирост RSS процесса
+    и согласие детекций с FP32: долю изображений с тем же количеством
+    детекций и средний IoU сопоставленных box'ов.
+
+    Example:
+        python manage.py yolo_quantize --images /data/calib \\
+            --variants int8_dynamic int8_static fp16 --report report.json
+    """
+
+    help = 'Создает INT8/FP16 варианты модели YOLO и отчет сравнения с FP32'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--images',
+            required=True,
+            help='Каталог с изображениями для калибровки и сравнения',
+        )
+        parser.add_argument(
+            '--variants',
+            nargs='+',
+            default=['int8_dynamic', 'int8_static', 'fp16'],
+            choices=['int8_dynamic', 'int8_static', 'fp16'],
+            help='Создаваемые варианты',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=100,
+            help='Максимальное количество изображений',
+        )
+        parser.add_argument(
+            '--conf',
+            type=float,
+            default=settings.EXPECTED_CONFIDENCE,
+            help='Порог уверенности при сравнении детекций',
+        )
+        parser.add_argument(
+            '--skip-build',
+            action='store_true',
+            help='Не создавать варианты, только сравнить существующие',
+        )
+        parser.add_argument('--report', help='Путь для JSON отчета')
+
+    def handle(self, *args, **options):
+        from api.onnx_session import manager_from_settings
+        from api.quantization import (
+            agreement_report,
+            benchmark_variant,
+            convert_fp16,
+            list_images,
+            load_inputs,
+            quantize_int8_dynamic,
+            quantize_int8_static,
+        )
+        from api.yolo_utils import YOLO_BASE_MODEL_PATH, model_variant_path
+
+        paths = list_images(options['images'], options['limit'])
+        if not paths:
+            raise CommandError(f"Нет изображений в {options['images']}")
+        inputs = load_inputs(paths)
+        self.stdout.write(f'Изображений: {len(inputs)}')
+
+        builders = {
+            'int8_dynamic': lambda out: quantize_int8_dynamic(
+                YOLO_BASE_MODEL_PATH, out
+            ),
+            'int8_static': lambda out: quantize_int8_static(
+                YOLO_BASE_MODEL_PATH, out, inputs
+            ),
+            'fp16': lambda out: convert_fp16(YOLO_BASE_MODEL_PATH, out),
+        }
+
+        if not options['skip_build']:
+            for variant in options['variants']:
+                output_path = model_variant_path(variant)
+                self.stdout.write(f'Создание {variant}: {output_path}')
+                try:
+                    builders[variant](output_path)
+                except ImportError as e:
+                    raise CommandError(
+                        f'Для варианта {variant} не хватает пакета: {e}'
+                    )
+
+        options_source = manager_from_settings(YOLO_BASE_MODEL_PATH)
+        report = {}
+
+        reference, reference_outputs = benchmark_variant(
+            YOLO_BASE_MODEL_PATH, inputs, options_source.build_options()
+        )
+        report['fp32'] = reference
+        self.print_row('fp32', reference)
+
+        for variant in options['variants']:
+            metrics, outputs = benchmark_variant(
+                model_variant_path(variant),
+                inputs,
+                options_source.build_options(),
+            )
+            metrics.update(
+                agreement_report(
+                    reference_outputs, outputs, conf_thres=options['conf']
+                )
+            )
+            metrics['speedup'] = round(
+                reference['latency_ms_mean'] / metrics['latency_ms_mean'], 2
+            )
+            report[variant] = metrics
+            self.print_row(variant, metrics)
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Отчет сохранен: {options['report']}")
+
+    def print_row(self, variant, metrics):
+        """Печатает строку отчета по варианту."""
+        row = (
+            f"{variant}: {metrics['model_size_mb']} МБ, "
+            f"задержка {metrics['latency_ms_mean']} мс "
+            f"(p95 {metrics['latency_ms_p95']} мс), "
+            f"{metrics['throughput_img_s']} изобр/с, "
+            f"RSS +{metrics['rss_delta_mb']} МБ"
+        )
+        if 'count_match_rate' in metrics:
+            row += (
+                f", совпадение количества {metrics['count_match_rate']}, "
+                f"IoU {metrics['mean_matched_iou']}, "
+                f"ускорение x{metrics['speedup']}"
+            )
+        self.stdout.write(row)
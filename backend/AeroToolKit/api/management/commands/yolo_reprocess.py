@@ -0,0 +1,95 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Повторно ставит YOLO обработку инструментов в очередь maintenance.
+
+    Используется для фоновой переобработки (например, после смены модели
+    или для записей без сохраненных детекций). Задачи отправляются
+    пакетами в очередь maintenance и выполняются только фоновыми
+    воркерами, когда в интерактивной и bulk очередях нет задач.
+
+    Инструменты группируются по ожидаемым параметрам распознавания,
+    потому что пакетная задача принимает их общими для всего пакета.
+
+    Example:
+        python manage.py yolo_reprocess --missing --limit 1000
+        python manage.py yolo_reprocess --ids 15 16 42
+    """
+
+    help = 'Ставит повторную YOLO обработку инструментов в фоновую очередь'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ids',
+            nargs='+',
+            type=int,
+            help='ID инструментов для повторной обработки',
+        )
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Только инструменты без сохраненных детекций',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Максимальное количество инструментов',
+        )
+        parser.add_argument(
+            '--chunk',
+            type=int,
+            default=16,
+            help='Количество изображений в одной задаче',
+        )
+
+    def handle(self, *args, **options):
+        from api.dispatch import enqueue_instrument_batch
+        from instruments.models import Instrument, ProcessingStatus
+
+        if not options['ids'] and not options['missing']:
+            raise CommandError('Укажите --ids или --missing')
+        if options['chunk'] < 1:
+            raise CommandError('--chunk должен быть положительным')
+
+        queryset = Instrument.objects.exclude(image='').order_by('id')
+        if options['ids']:
+            queryset = queryset.filter(id__in=options['ids'])
+        if options['missing']:
+            queryset = queryset.filter(image_width__isnull=True)
+        if options['limit']:
+            queryset = queryset[: options['limit']]
+
+        groups = {}
+        for instrument in queryset.only(
+            'id', 'image', 'expected_objects', 'expected_confidence'
+        ):
+            key = (instrument.expected_objects, instrument.expected_confidence)
+            groups.setdefault(key, []).append(instrument)
+
+        total = tasks = 0
+        chunk = options['chunk']
+        for (expected_objects, expected_confidence), items in groups.items():
+            for start in range(0, len(items), chunk):
+                batch = items[start : start + chunk]
+                Instrument.objects.filter(
+                    id__in=[instrument.id for instrument in batch]
+                ).update(
+                    processing_status=ProcessingStatus.QUEUED,
+                    processing_started_at=None,
+                    processing_finished_at=None,
+                )
+                enqueue_instrument_batch(
+                    batch,
+                    expected_objects,
+                    expected_confidence,
+                    priority='maintenance',
+                    chunk_size=chunk,
+                )
+                total += len(batch)
+                tasks += 1
+
+        self.stdout.write(
+            f'Поставлено в очередь: {total} инструментов, {tasks} задач'
+        )
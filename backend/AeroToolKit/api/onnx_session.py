@@ -0,0 +1,295 @@
+import hashlib
+import os
+import platform
+import threading
+import time
+
+import numpy as np
+import onnxruntime as ort
+from django.conf import settings
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    'disable': ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    'all': ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+EXECUTION_MODES = {
+    'sequential': ort.ExecutionMode.ORT_SEQUENTIAL,
+    'parallel': ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+class OnnxSessionManager:
+    """
+    Создает настроенную ONNX сессию модели YOLO.
+
+    Задает уровень оптимизации графа, количество потоков и режим выполнения
+    из настроек, сохраняет оптимизированный граф в кэш и при следующих
+    запусках загружает его без повторной оптимизации. Имя файла кэша
+    содержит хэш модели, версию onnxruntime, уровень оптимизации и
+    отпечаток оборудования, поэтому замена модели, обновление рантайма
+    или запуск на другом CPU автоматически приводит к созданию нового
+    кэша.
+
+    Attributes:
+        model_path (str): Путь к исходной ONNX модели
+        cache_dir (str): Каталог для оптимизированных моделей
+        metrics (dict): Метрики холодного старта:
+            - session_startup_s: время создания сессии
+            - optimized_cache_hit: загружена ли модель из кэша
+            - first_inference_s: время первого (прогревочного) инференса
+    """
+
+    def __init__(
+        self,
+        model_path,
+        cache_dir=None,
+        graph_optimization='all',
+        intra_op_threads=0,
+        inter_op_threads=0,
+        execution_mode='sequential',
+        providers=None,
+    ):
+        self.model_path = model_path
+        self.cache_dir = cache_dir
+        self.graph_optimization = graph_optimization
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.execution_mode = execution_mode
+        self.providers = providers or ['CPUExecutionProvider']
+        self.metrics = {
+            'model_path': model_path,
+            'session_startup_s': None,
+            'optimized_cache_hit': False,
+            'first_inference_s': None,
+        }
+
+    def model_hash(self):
+        """
+        Вычисляет SHA-256 файла модели.
+
+        Returns:
+            str: Первые 16 символов hex-дайджеста
+        """
+        digest = hashlib.sha256()
+        with open(self.model_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()[:16]
+
+    def hardware_fingerprint(self):
+        """
+        Вычисляет отпечаток оборудования, для которого оптимизируется граф.
+
+        На уровне 'all' onnxruntime выполняет аппаратно-зависимые
+        преобразования (раскладка данных и ядра под набор инструкций
+        CPU), поэтому граф, сохраненный на одном узле, нельзя
+        загружать на узле с другим CPU или другими провайдерами через
+        общий каталог кэша. В отпечаток входят архитектура, список
+        провайдеров и флаги CPU из /proc/cpuinfo (если доступен).
+
+        Returns:
+            str: Первые 12 символов hex-дайджеста
+        """
+        digest = hashlib.sha256()
+        digest.update(platform.machine().encode())
+        digest.update(','.join(self.providers).encode())
+        try:
+            with open('/proc/cpuinfo') as f:
+                flags = next(
+                    (line for line in f if line.startswith('flags')),
+                    '',
+                )
+        except OSError:
+            flags = platform.processor()
+        digest.update(' '.join(sorted(flags.split())).encode())
+        return digest.hexdigest()[:12]
+
+    def cached_model_path(self):
+        """
+        Путь к оптимизированной модели в кэше.
+
+        Returns:
+            str: Путь к файлу или None если кэш отключен
+        """
+        if not self.cache_dir:
+            return None
+        name = os.path.splitext(os.path.basename(self.model_path))[0]
+        return os.path.join(
+            self.cache_dir,
+            f"{name}.{self.model_hash()}.ort{ort.__version__}"
+            f".{self.graph_optimization}.{self.hardware_fingerprint()}.onnx",
+        )
+
+    def build_options(self, graph_optimization=None):
+        """
+        Формирует SessionOptions из настроек менеджера.
+
+        Args:
+            graph_optimization (str): Переопределение уровня оптимизации
+
+        Returns:
+            onnxruntime.SessionOptions: Настроенные опции сессии
+        """
+        options = ort.SessionOptions()
+        options.graph_optimization_level = GRAPH_OPTIMIZATION_LEVELS[
+            graph_optimization or self.graph_optimization
+        ]
+        options.execution_mode = EXECUTION_MODES[self.execution_mode]
+        if self.intra_op_threads:
+            options.intra_op_num_threads = self.intra_op_threads
+        if self.inter_op_threads:
+            options.inter_op_num_threads = self.inter_op_threads
+        return options
+
+    def create_session(self):
+        """
+        Создает сессию, используя оптимизированную модель из кэша если она есть.
+
+        При отсутствии кэша модель оптимизируется и сохраняется во временный
+        файл, который затем атомарно переименовывается - параллельно
+        стартующие процессы не увидят недописанный файл.
+
+        Returns:
+            onnxruntime.InferenceSession: Готовая к работе сессия
+        """
+        start = time.perf_counter()
+        cached_path = self.cached_model_path()
+
+        if cached_path and os.path.exists(cached_path):
+            # Граф уже оптимизирован, повторная оптимизация не нужна
+            session = ort.InferenceSession(
+                cached_path,
+                sess_options=self.build_options('disable'),
+                providers=self.providers,
+            )
+            self.metrics['optimized_cache_hit'] = True
+        else:
+            options = self.build_options()
+            tmp_path = None
+            if cached_path:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{cached_path}.tmp{os.getpid()}"
+                options.optimized_model_filepath = tmp_path
+            session = ort.InferenceSession(
+                self.model_path, sess_options=options, providers=self.providers
+            )
+            if tmp_path and os.path.exists(tmp_path):
+                os.replace(tmp_path, cached_path)
+            self.metrics['optimized_cache_hit'] = False
+
+        self.metrics['session_startup_s'] = round(
+            time.perf_counter() - start, 4
+        )
+        return session
+
+    def warmup(self, session, imgsz=640):
+        """
+        Выполняет прогревочный инференс на пустом изображении.
+
+        Первый вызов run выделяет буферы и инициализирует пулы потоков,
+        поэтому заметно медленнее последующих. Прогрев переносит эту
+        задержку на старт воркера.
+
+        Args:
+            session (onnxruntime.InferenceSession): Сессия для прогрева
+            imgsz (int): Размер стороны входного изображения
+
+        Returns:
+            float: Время первого инференса в секундах
+        """
+        model_input = session.get_inputs()[0]
+        shape = [
+            dim if isinstance(dim, int) and dim > 0 else default
+            for dim, default in zip(model_input.shape, (1, 3, imgsz, imgsz))
+        ]
+        dummy = np.zeros(shape, dtype=np.float32)
+
+        start = time.perf_counter()
+        session.run(None, {model_input.name: dummy})
+        elapsed = round(time.perf_counter() - start, 4)
+        self.metrics['first_inference_s'] = elapsed
+        return elapsed
+
+
+def manager_from_settings(model_path):
+    """
+    Создает менеджер сессии с параметрами из Django settings.
+
+    Args:
+        model_path (str): Путь к ONNX модели
+
+    Returns:
+        OnnxSessionManager: Менеджер сессии
+    """
+    return OnnxSessionManager(
+        model_path,
+        cache_dir=settings.YOLO_MODEL_CACHE_DIR,
+        graph_optimization=settings.YOLO_ORT_GRAPH_OPTIMIZATION,
+        intra_op_threads=settings.YOLO_ORT_INTRA_OP_THREADS,
+        inter_op_threads=settings.YOLO_ORT_INTER_OP_THREADS,
+        execution_mode=settings.YOLO_ORT_EXECUTION_MODE,
+    )
+
+
+_manager = None
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session(model_path):
+    """
+    Возвращает ONNX сессию процесса, создавая ее при первом вызове.
+
+    Args:
+        model_path (str): Путь к ONNX модели
+
+    Returns:
+        onnxruntime.InferenceSession: Сессия модели
+    """
+    global _manager, _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _manager = manager_from_settings(model_path)
+                _session = _manager.create_session()
+                print(
+                    f" [BACKEND YOLO] ONNX session created: {get_metrics()}",
+                    flush=True,
+                )
+    return _session
+
+
+def warmup_session(model_path, imgsz=640):
+    """
+    Создает сессию процесса (если еще не создана) и прогревает ее.
+
+    Args:
+        model_path (str): Путь к ONNX модели
+        imgsz (int): Размер стороны входного изображения
+
+    Returns:
+        dict: Метрики холодного старта
+    """
+    session = get_session(model_path)
+    if _manager.metrics['first_inference_s'] is None:
+        _manager.warmup(session, imgsz=imgsz)
+        print(
+            f" [BACKEND YOLO] ONNX session warmed up: {get_metrics()}",
+            flush=True,
+        )
+    return get_metrics()
+
+
+def get_metrics():
+    """
+    Возвращает метрики холодного старта сессии текущего процесса.
+
+    Returns:
+        dict: Метрики или пустой словарь, если сессия еще не создана
+    """
+    if _manager is None:
+        return {}
+    return {'pid': os.getpid(), **_manager.metrics}
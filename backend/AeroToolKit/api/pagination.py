@@ -0,0 +1,21 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class InstrumentCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация списка инструментов.
+
+    Страница выбирается условием по (pub_date, id) относительно курсора,
+    а не OFFSET, и без COUNT(*): время ответа не зависит от номера
+    страницы и размера таблицы. Запрос обслуживается составным индексом
+    Instrument по (-pub_date, -id).
+
+    Клиент задает размер страницы параметром page_size (не больше
+    API_MAX_PAGE_SIZE) и переходит по ссылкам next / previous.
+    """
+
+    ordering = ('-pub_date', '-id')
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
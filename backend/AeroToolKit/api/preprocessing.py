@@ -0,0 +1,117 @@
+import threading
+
+import cv2
+import numpy as np
+
+
+class Preprocessor:
+    """
+    Предобработка изображения для YOLO без промежуточных аллокаций.
+
+    Выполняет за один проход то же, что letterbox() и последующие
+    [:, :, ::-1].transpose(2, 0, 1), expand_dims, astype(np.float32) и / 255:
+    масштабирование с сохранением пропорций, паддинг, перестановку каналов
+    RGB->BGR, раскладку CHW и нормализацию. Результат записывается
+    в заранее выделенный float32 буфер формы (1, 3, imgsz, imgsz),
+    который переиспользуется между изображениями.
+
+    Экземпляр не потокобезопасен: используйте get_preprocessor(),
+    который хранит отдельный экземпляр для каждого потока.
+
+    Attributes:
+        imgsz (int): Размер стороны входа модели
+        color (int): Значение пикселей паддинга
+        canvas (numpy.ndarray): Буфер изображения с паддингом (HWC, uint8)
+        input (numpy.ndarray): Входной тензор модели (1, 3, imgsz, imgsz)
+    """
+
+    def __init__(self, imgsz=640, color=114):
+        self.imgsz = imgsz
+        self.color = color
+        self.canvas = np.empty((imgsz, imgsz, 3), dtype=np.uint8)
+        self.input = np.empty((1, 3, imgsz, imgsz), dtype=np.float32)
+        self._resized = None
+
+    def _resize_buffer(self, width, height):
+        """
+        Возвращает буфер для уменьшенного изображения нужного размера.
+
+        Буфер пересоздается только при смене размера, а фотографии с одной
+        станции обычно имеют одинаковое разрешение.
+        """
+        if self._resized is None or self._resized.shape[:2] != (height, width):
+            self._resized = np.empty((height, width, 3), dtype=np.uint8)
+        return self._resized
+
+    def __call__(self, im):
+        """
+        Подготавливает изображение и записывает его во входной буфер.
+
+        Args:
+            im (numpy.ndarray): Изображение в формате HWC, RGB, uint8
+
+        Returns:
+            tuple: (входной тензор (1, 3, imgsz, imgsz), коэффициент
+                    масштабирования, (паддинг_ширина, паддинг_высота)).
+                    Тензор - это внутренний буфер, он будет перезаписан
+                    следующим вызовом.
+        """
+        shape = im.shape[:2]  # высота, ширина
+        size = self.imgsz
+
+        r = min(size / shape[0], size / shape[1])
+        new_w, new_h = int(round(shape[1] * r)), int(round(shape[0] * r))
+        top = int(round((size - new_h) / 2))
+        left = int(round((size - new_w) / 2))
+        bottom = size - new_h - top
+        right = size - new_w - left
+
+        resized = self._resize_buffer(new_w, new_h)
+        cv2.resize(
+            im, (new_w, new_h), dst=resized, interpolation=cv2.INTER_LINEAR
+        )
+        cv2.copyMakeBorder(
+            resized,
+            top,
+            bottom,
+            left,
+            right,
+            cv2.BORDER_CONSTANT,
+            dst=self.canvas,
+            value=(self.color, self.color, self.color),
+        )
+
+        # RGB->BGR, HWC->CHW и нормализация прямо в входной буфер
+        for channel in range(3):
+            np.divide(
+                self.canvas[:, :, 2 - channel],
+                np.float32(255.0),
+                out=self.input[0, channel],
+                dtype=np.float32,
+            )
+
+        return self.input, r, (left, top)
+
+
+_local = threading.local()
+
+
+def get_preprocessor(imgsz=640):
+    """
+    Возвращает препроцессор текущего потока для заданного размера входа.
+
+    Каждый поток Celery воркера получает свои буферы, поэтому параллельные
+    задачи не перезаписывают входные данные друг друга.
+
+    Args:
+        imgsz (int): Размер стороны входа модели
+
+    Returns:
+        Preprocessor: Препроцессор с переиспользуемыми буферами
+    """
+    preprocessors = getattr(_local, 'preprocessors', None)
+    if preprocessors is None:
+        preprocessors = _local.preprocessors = {}
+    if imgsz not in preprocessors:
+        preprocessors[imgsz] = Preprocessor(imgsz)
+    return preprocessors[imgsz]
@@ -0,0 +1,285 @@
+import os
+import time
+
+import numpy as np
+import onnxruntime as ort
+import psutil
+
+from .decoding import decode_for_inference
+from .preprocessing import Preprocessor
+from .yolo_utils import box_iou_matrix, process_yolo_output
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def list_images(folder, limit=None):
+    """
+    Возвращает отсортированный список изображений в каталоге.
+
+    Args:
+        folder (str): Каталог с изображениями
+        limit (int): Максимальное количество файлов
+
+    Returns:
+        list: Пути к файлам изображений
+    """
+    paths = sorted(
+        os.path.join(folder, name)
+        for name in os.listdir(folder)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    return paths[:limit] if limit else paths
+
+
+def load_inputs(paths, imgsz=640):
+    """
+    Подготавливает входные тензоры модели для списка изображений.
+
+    Используется тот же конвейер декодирования и предобработки,
+    что и при инференсе в задачах Celery.
+
+    Args:
+        paths (list): Пути к изображениям
+        imgsz (int): Размер входа модели
+
+    Returns:
+        list: Тензоры формы (1, 3, imgsz, imgsz)
+    """
+    preprocessor = Preprocessor(imgsz)
+    inputs = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            decoded = decode_for_inference(f.read(), imgsz)
+        # Буфер препроцессора переиспользуется, поэтому копируем результат
+        inputs.append(preprocessor(decoded.array)[0].copy())
+    return inputs
+
+
+class ImageFolderCalibrationReader:
+    """
+    Источник калибровочных данных для статической INT8 квантизации.
+
+    Реализует интерфейс CalibrationDataReader из onnxruntime.quantization:
+    get_next() возвращает словарь {имя_входа: тензор} или None по окончании.
+    """
+
+    def __init__(self, input_name, inputs):
+        self.input_name = input_name
+        self._inputs = iter(inputs)
+
+    def get_next(self):
+        img_input = next(self._inputs, None)
+        if img_input is None:
+            return None
+        return {self.input_name: img_input}
+
+
+def quantize_int8_dynamic(model_path, output_path):
+    """
+    Создает вариант с динамической INT8 квантизацией весов.
+
+    Масштабы активаций вычисляются во время инференса, калибровка не нужна.
+
+    Args:
+        model_path (str): Путь к исходной FP32 модели
+        output_path (str): Путь для сохранения варианта
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QUInt8)
+
+
+def quantize_int8_static(model_path, output_path, calibration_inputs):
+    """
+    Создает вариант со статической INT8 квантизацией (формат QDQ).
+
+    Масштабы активаций подбираются на калибровочных изображениях, поэтому
+    набор должен быть похож на реальные фотографии со станций.
+
+    Args:
+        model_path (str): Путь к исходной FP32 модели
+        output_path (str): Путь для сохранения варианта
+        calibration_inputs (list): Тензоры калибровочных изображений
+    """
+    from onnxruntime.quantization import (
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+
+    input_name = ort.InferenceSession(
+        model_path, providers=['CPUExecutionProvider']
+    ).get_inputs()[0].name
+    quantize_static(
+        model_path,
+        output_path,
+        ImageFolderCalibrationReader(input_name, calibration_inputs),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+
+
+def convert_fp16(model_path, output_path):
+    """
+    Создает FP16 вариант модели.
+
+    Входы и выходы остаются float32, поэтому предобработка не меняется.
+    Требует пакет onnxconverter-common.
+
+    Args:
+        model_path (str): Путь к исходной FP32 модели
+        output_path (str): Путь для сохранения варианта
+    """
+    import onnx
+    from onnxconverter_common import float16
+
+    model = onnx.load(model_path)
+    model_fp16 = float16.convert_float_to_float16(model, keep_io_types=True)
+    onnx.save(model_fp16, output_path)
+
+
+def match_detections(reference, candidate, iou_thres=0.5):
+    """
+    Жадно сопоставляет детекции варианта с детекциями FP32 модели.
+
+    Сопоставляются только детекции одного класса, пары перебираются
+    по убыванию IoU.
+
+    Args:
+        reference (list): Детекции FP32 модели (из process_yolo_output)
+        candidate (list): Детекции варианта
+        iou_thres (float): Минимальный IoU для совпадения
+
+    Returns:
+        list: IoU сопоставленных пар
+    """
+    if not reference or not candidate:
+        return []
+
+    ref_boxes = np.array([d['bbox'] for d in reference], dtype=np.float64)
+    cand_boxes = np.array([d['bbox'] for d in candidate], dtype=np.float64)
+    ious = box_iou_matrix(ref_boxes, cand_boxes)
+
+    ref_classes = np.array([d['class_id'] for d in reference])
+    cand_classes = np.array([d['class_id'] for d in candidate])
+    ious[ref_classes[:, None] != cand_classes[None, :]] = 0.0
+
+    matched = []
+    used_ref, used_cand = set(), set()
+    for flat in np.argsort(ious, axis=None)[::-1]:
+        i, j = np.unravel_index(flat, ious.shape)
+        if ious[i, j] < iou_thres:
+            break
+        if i in used_ref or j in used_cand:
+            continue
+        used_ref.add(i)
+        used_cand.add(j)
+        matched.append(float(ious[i, j]))
+    return matched
+
+
+def benchmark_variant(
+    model_path, inputs, session_options, batch_size=8, repeat=3
+):
+    """
+    Измеряет задержку, пропускную способность и память варианта модели.
+
+    Args:
+        model_path (str): Путь к ONNX файлу варианта
+        inputs (list): Тензоры изображений формы (1, 3, H, W)
+        session_options (onnxruntime.SessionOptions): Опции сессии
+        batch_size (int): Размер батча для замера пропускной способности
+        repeat (int): Количество проходов по изображениям
+
+    Returns:
+        tuple: (метрики, выходы модели для каждого изображения)
+    """
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+
+    session = ort.InferenceSession(
+        model_path,
+        sess_options=session_options,
+        providers=['CPUExecutionProvider'],
+    )
+    input_name = session.get_inputs()[0].name
+    outputs = [session.run(None, {input_name: x})[0] for x in inputs]
+
+    latencies = []
+    for _ in range(repeat):
+        for img_input in inputs:
+            start = time.perf_counter()
+            session.run(None, {input_name: img_input})
+            latencies.append(time.perf_counter() - start)
+
+    # Пропускная способность на батчах, если модель их поддерживает
+    static_batch = session.get_inputs()[0].shape[0]
+    if isinstance(static_batch, int) and static_batch > 0:
+        batch_size = static_batch
+    batch = np.concatenate(inputs[:batch_size])
+    start = time.perf_counter()
+    for _ in range(repeat):
+        session.run(None, {input_name: batch})
+    throughput = len(batch) * repeat / (time.perf_counter() - start)
+
+    metrics = {
+        'model_path': model_path,
+        'model_size_mb': round(os.path.getsize(model_path) / 2**20, 2),
+        'latency_ms_mean': round(np.mean(latencies) * 1000, 2),
+        'latency_ms_p95': round(np.percentile(latencies, 95) * 1000, 2),
+        'throughput_img_s': round(throughput, 2),
+        'rss_delta_mb': round(
+            (process.memory_info().rss - rss_before) / 2**20, 1
+        ),
+    }
+    del session
+    return metrics, outputs
+
+
+def agreement_report(
+    reference_outputs, outputs, imgsz=640, conf_thres=0.5, iou_thres=0.7
+):
+    """
+    Сравнивает детекции варианта с детекциями FP32 модели.
+
+    Args:
+        reference_outputs (list): Выходы FP32 модели по изображениям
+        outputs (list): Выходы варианта по изображениям
+        imgsz (int): Размер входа модели
+        conf_thres (float): Порог уверенности
+        iou_thres (float): Порог IoU для NMS
+
+    Returns:
+        dict: Доля изображений с совпавшим количеством детекций,
+              средний IoU сопоставленных box'ов и доля сопоставленных
+              детекций FP32 модели
+    """
+    count_matches = 0
+    matched_ious = []
+    reference_total = 0
+
+    for ref_out, out in zip(reference_outputs, outputs):
+        reference = process_yolo_output(
+            ref_out, img_shape=imgsz, conf_thres=conf_thres, iou_thres=iou_thres
+        )
+        candidate = process_yolo_output(
+            out, img_shape=imgsz, conf_thres=conf_thres, iou_thres=iou_thres
+        )
+        count_matches += len(reference) == len(candidate)
+        reference_total += len(reference)
+        matched_ious.extend(match_detections(reference, candidate))
+
+    images = len(reference_outputs)
+    return {
+        'count_match_rate': round(count_matches / images, 3) if images else 0,
+        'mean_matched_iou': (
+            round(float(np.mean(matched_ious)), 3) if matched_ious else None
+        ),
+        'matched_ratio': (
+            round(len(matched_ious) / reference_total, 3)
+            if reference_total
+            else None
+        ),
+    }
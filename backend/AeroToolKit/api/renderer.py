@@ -0,0 +1,198 @@
+import functools
+import io
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from .decoding import decode_full
+
+# Шрифты подписей в порядке предпочтения, при отсутствии - шрифт PIL
+FONT_CANDIDATES = ('arial.ttf', 'DejaVuSans.ttf')
+
+# Оформление разметки: цвет (RGB, как "green" в PIL), толщина рамки
+# и размер шрифта подписи в пикселях
+BOX_COLOR = (0, 128, 0)
+BOX_WIDTH = 10
+LABEL_FONT_SIZE = 50
+
+ENCODERS = ('cv2', 'pil')
+
+
+@functools.lru_cache(maxsize=None)
+def get_font(size=LABEL_FONT_SIZE):
+    """
+    Загружает шрифт подписей один раз на процесс.
+
+    Args:
+        size (int): Размер шрифта в пикселях
+
+    Returns:
+        ImageFont: Первый доступный шрифт из FONT_CANDIDATES
+                   или шрифт PIL по умолчанию
+    """
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+@functools.lru_cache(maxsize=1024)
+def glyph_mask(text, size=LABEL_FONT_SIZE):
+    """
+    Возвращает предварительно отрисованную маску текста.
+
+    Маски кэшируются: названий классов немного, а уверенность
+    выводится с двумя знаками, поэтому набор подписей ограничен.
+
+    Args:
+        text (str): Текст подписи
+        size (int): Размер шрифта в пикселях
+
+    Returns:
+        numpy.ndarray: Булева маска (высота, ширина), только для чтения
+    """
+    font = get_font(size)
+    _, _, width, height = font.getbbox(text)
+    canvas = Image.new('L', (max(1, width), max(1, height)), 0)
+    ImageDraw.Draw(canvas).text((0, 0), text, fill=255, font=font)
+    mask = np.asarray(canvas) >= 128
+    mask.flags.writeable = False
+    return mask
+
+
+@functools.lru_cache(maxsize=None)
+def space_width(size=LABEL_FONT_SIZE):
+    """int: Ширина пробела между названием класса и уверенностью."""
+    return int(round(get_font(size).getlength(' ')))
+
+
+def draw_box(image, x1, y1, x2, y2, color, width=BOX_WIDTH):
+    """
+    Рисует рамку прямо в буфере изображения.
+
+    Как и ImageDraw.rectangle, рамка толщиной width рисуется внутрь
+    от границ [x1, y1, x2, y2] включительно.
+
+    Args:
+        image (numpy.ndarray): Изображение HWC, изменяется на месте
+        x1, y1, x2, y2 (int): Координаты рамки
+        color (tuple): Цвет в порядке каналов изображения
+        width (int): Толщина линии
+    """
+    x2, y2 = x2 + 1, y2 + 1
+    image[y1 : min(y1 + width, y2), x1:x2] = color
+    image[max(y2 - width, y1) : y2, x1:x2] = color
+    image[y1:y2, x1 : min(x1 + width, x2)] = color
+    image[y1:y2, max(x2 - width, x1) : x2] = color
+
+
+def blit_mask(image, mask, x, y, color):
+    """
+    Закрашивает пиксели маски цветом, обрезая ее по границам изображения.
+
+    Args:
+        image (numpy.ndarray): Изображение HWC, изменяется на месте
+        mask (numpy.ndarray): Булева маска текста
+        x, y (int): Левый верхний угол маски
+        color (tuple): Цвет в порядке каналов изображения
+    """
+    height, width = image.shape[:2]
+    mask = mask[: max(0, height - y), : max(0, width - x)]
+    region = image[y : y + mask.shape[0], x : x + mask.shape[1]]
+    region[mask] = color
+
+
+def draw_detections(image, boxes, color, font_size=LABEL_FONT_SIZE):
+    """
+    Рисует рамки и подписи детекций на изображении.
+
+    Args:
+        image (numpy.ndarray): Изображение HWC, изменяется на месте
+        boxes (list): Кортежи ([x1, y1, x2, y2], класс, уверенность)
+        color (tuple): Цвет в порядке каналов изображения
+        font_size (int): Размер шрифта подписи
+    """
+    for (x1, y1, x2, y2), cls_name, score in boxes:
+        draw_box(image, x1, y1, x2, y2, color)
+
+        text_y = max(0, y1 - font_size)
+        class_mask = glyph_mask(cls_name, font_size)
+        blit_mask(image, class_mask, x1, text_y, color)
+        score_x = x1 + class_mask.shape[1] + space_width(font_size)
+        score_mask = glyph_mask(f'{score:.2f}', font_size)
+        blit_mask(image, score_mask, score_x, text_y, color)
+
+
+def render_annotated(image_data, boxes, encoder='cv2', quality=75):
+    """
+    Декодирует изображение, рисует детекции и кодирует результат в JPEG.
+
+    Изображение обрабатывается как numpy буфер в порядке каналов
+    выбранной библиотеки: для 'cv2' это BGR, и преобразование цветов
+    не требуется ни при декодировании, ни при кодировании.
+
+    Args:
+        image_data (bytes): Байтовые данные исходного изображения
+        boxes (list): Кортежи ([x1, y1, x2, y2], класс, уверенность)
+                      в координатах исходного изображения
+        encoder (str): 'cv2' (OpenCV) или 'pil'
+        quality (int): Качество JPEG (1-100)
+
+    Returns:
+        bytes: Аннотированное изображение в формате JPEG
+    """
+    if encoder not in ENCODERS:
+        raise ValueError(
+            f"Unknown render encoder '{encoder}', expected one of {ENCODERS}"
+        )
+
+    if encoder == 'cv2':
+        # Ориентацию EXIF не применяем, как и PIL, чтобы координаты
+        # box'ов совпадали с исходным файлом
+        buf = np.frombuffer(image_data, dtype=np.uint8)
+        image = cv2.imdecode(
+            buf, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+        )
+        if image is not None:
+            draw_detections(image, boxes, BOX_COLOR[::-1])
+            ok, encoded = cv2.imencode(
+                '.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+            )
+            if ok:
+                return encoded.tobytes()
+
+    image = np.ascontiguousarray(decode_full(image_data).array)
+    draw_detections(image, boxes, BOX_COLOR)
+    buf = io.BytesIO()
+    Image.fromarray(image).save(buf, format='JPEG', quality=int(quality))
+    return buf.getvalue()
+
+
+def render_instrument(instrument, encoder='cv2', quality=75):
+    """
+    Создает изображение инструмента с "вшитой" разметкой для экспорта.
+
+    Рамки берутся из сохраненных результатов детекции instrument.detections
+    и рисуются на исходном изображении.
+
+    Args:
+        instrument (Instrument): Инструмент с исходным изображением
+        encoder (str): 'cv2' (OpenCV) или 'pil'
+        quality (int): Качество JPEG (1-100)
+
+    Returns:
+        bytes: Аннотированное изображение в формате JPEG
+    """
+    with instrument.image.open('rb') as f:
+        image_data = f.read()
+    boxes = [
+        (det['bbox'], det['class'], det['confidence'])
+        for det in instrument.detections
+        if det.get('bbox')
+    ]
+    return render_annotated(
+        image_data, boxes, encoder=encoder, quality=quality
+    )
@@ -1,9 +1,21 @@
-import uuid
 import time
 from rest_framework import serializers
+from django.conf import settings
 from django.core.files.base import ContentFile
-from instruments.models import Instrument
-from .tasks import process_instrument_with_yolo
+from django.db import transaction
+from instruments.models import Instrument, UploadSession
+from .dispatch import (
+    PayloadTooLarge,
+    check_payload_size,
+    enqueue_instrument_batch,
+    enqueue_instrument_processing,
+    inline_payload_enabled,
+)
+
+PRIORITY_HELP = (
+    "Класс приоритета обработки: interactive (одиночные проверки) или bulk "
+    "(массовая загрузка). По умолчанию определяется по размеру запроса"
+)
 
 
 class InstrumentSerializer(serializers.ModelSerializer):
@@ -16,6 +28,15 @@ class InstrumentSerializer(serializers.ModelSerializer):
     Attributes:
         employee_username (str): Имя пользователя, связанного с инструментом
         image_url (str): Полный URL изображения инструмента
+        annotated_image (str): URL изображения с "вшитой" разметкой
+                               (только в режиме YOLO_RESULT_MODE = 'burn')
+        detections (list): Детекции YOLO с bounding box'ами в координатах
+                           исходного изображения (image_width x image_height)
+                           для отрисовки разметки на клиенте
+        detected_count (int): Количество объектов, обнаруженных YOLO
+        count_matches (bool): Совпадает ли detected_count с expected_objects
+        processing_status (str): Статус YOLO обработки
+                                 (queued/running/done/failed)
     """
 
     employee_username = serializers.CharField(
@@ -37,11 +58,32 @@ class InstrumentSerializer(serializers.ModelSerializer):
             'employee_username',
             'image',
             'image_url',
+            'annotated_image',
             'expected_objects',
             'expected_confidence',
             'filename',
+            'detections',
+            'image_width',
+            'image_height',
+            'detected_count',
+            'count_matches',
+            'processing_status',
+            'processing_started_at',
+            'processing_finished_at',
+        ]
+        read_only_fields = [
+            'employee',
+            'pub_date',
+            'annotated_image',
+            'detections',
+            'image_width',
+            'image_height',
+            'detected_count',
+            'count_matches',
+            'processing_status',
+            'processing_started_at',
+            'processing_finished_at',
         ]
-        read_only_fields = ['employee', 'pub_date']
 
     def get_image_url(self, obj):
         """
@@ -80,6 +122,9 @@ class InstrumentCreateSerializer(serializers.ModelSerializer):
         filename (str): Исходное имя файла (опционально)
         expected_objects (int): Ожидаемое количество объектов (обязательный)
         expected_confidence (float): Ожидаемая уверенность распознавания (обязательный)
+        tile_grid (int): Количество тайлов по стороне для тайлового инференса (опционально)
+        tile_overlap (float): Доля перекрытия тайлов (опционально)
+        priority (str): Класс приоритета обработки (опционально)
     """
 
     image = serializers.ImageField(
@@ -102,6 +147,26 @@ class InstrumentCreateSerializer(serializers.ModelSerializer):
         required=True,
         help_text="Порог уверенности для детекции объектов (0.0 - 1.0)",
     )
+    tile_grid = serializers.IntegerField(
+        write_only=True,
+        required=False,
+        min_value=1,
+        max_value=settings.YOLO_TILE_GRID_MAX,
+        help_text="Количество тайлов по стороне для мелких объектов (1 - без тайлов)",
+    )
+    tile_overlap = serializers.FloatField(
+        write_only=True,
+        required=False,
+        min_value=0.0,
+        max_value=0.5,
+        help_text="Доля перекрытия соседних тайлов (0.0 - 0.5)",
+    )
+    priority = serializers.ChoiceField(
+        choices=['interactive', 'bulk'],
+        write_only=True,
+        required=False,
+        help_text=PRIORITY_HELP,
+    )
 
     class Meta:
         model = Instrument
@@ -114,6 +179,9 @@ class InstrumentCreateSerializer(serializers.ModelSerializer):
             'filename',
             'expected_objects',
             'expected_confidence',
+            'tile_grid',
+            'tile_overlap',
+            'priority',
         ]
         read_only_fields = ['employee', 'pub_date']
 
@@ -157,6 +225,13 @@ class InstrumentCreateSerializer(serializers.ModelSerializer):
             image, 'content_type'
         ) or not image.content_type.startswith('image/'):
             errors['image'] = 'Файл должен быть изображением'
+        else:
+            # Изображение, которое не поместится в сообщение задачи,
+            # отклоняется до сохранения записи
+            try:
+                check_payload_size(image.size)
+            except PayloadTooLarge as e:
+                errors['image'] = str(e)
 
         # Проверка expected_objects
         expected_objects = attrs.get('expected_objects')
@@ -203,8 +278,8 @@ class InstrumentCreateSerializer(serializers.ModelSerializer):
         1. Извлекает и валидирует данные из запроса
         2. Создает объект инструмента с базовой информацией
         3. Сохраняет оригинальное изображение в базу данных
-        4. Перематывает файл для повторного чтения
-        5. Запускает асинхронную YOLO обработку через Celery
+        4. Запускает асинхронную YOLO обработку через Celery, передавая
+           путь к сохраненному изображению (или байты в режиме inline)
 
         Args:
             validated_data (dict): Валидированные данные для создания инструмента
@@ -227,6 +302,9 @@ class InstrumentCreateSerializer(serializers.ModelSerializer):
             filename = validated_data.pop("filename", None)
             expected_objects = validated_data.pop("expected_objects", None)
             expected_confidence = validated_data.pop("expected_confidence")
+            tile_grid = validated_data.pop("tile_grid", None)
+            tile_overlap = validated_data.pop("tile_overlap", None)
+            priority = validated_data.pop("priority", None)
 
             # Устанавливаем пользователя из контекста запроса
             request = self.context.get("request")
@@ -238,23 +316,27 @@ class InstrumentCreateSerializer(serializers.ModelSerializer):
             instrument.filename = filename or image_file.name
             instrument.expected_objects = expected_objects or 11
 
-            # Сохраняем оригинальное изображение во временный файл
-            instrument.image.save(
-                f"temp_{uuid.uuid4().hex[:8]}.jpg", image_file
-            )
+            # Исходная фотография записывается один раз в каталог
+            # originals (см. original_upload_to), запись в БД - одна
+            instrument.image.save(image_file.name, image_file, save=False)
             instrument.save()
 
-            # КРИТИЧЕСКИ ВАЖНО: перематываем файл для повторного чтения
-            image_file.seek(0)
-
-            # ЗАПУСКАЕМ YOLO В ФОНОВОМ РЕЖИМЕ через Celery
-            image_data = image_file.read()
+            # ЗАПУСКАЕМ YOLO В ФОНОВОМ РЕЖИМЕ через Celery. По умолчанию
+            # задача получает путь к сохраненному файлу, а байты
+            # изображения перечитываются только для режима inline
+            image_data = None
+            if inline_payload_enabled():
+                image_file.seek(0)
+                image_data = image_file.read()
 
-            process_instrument_with_yolo.delay(
-                instrument.id,
-                image_data,
+            enqueue_instrument_processing(
+                instrument,
                 expected_objects or 11,
                 expected_confidence,
+                image_data=image_data,
+                tile_grid=tile_grid,
+                tile_overlap=tile_overlap,
+                priority=priority,
             )
 
             total_time = time.time() - start_time
@@ -311,3 +393,355 @@ class InstrumentCreateSerializer(serializers.ModelSerializer):
             result = yolo_section
 
         return result
+
+
+class InstrumentBatchCreateSerializer(serializers.Serializer):
+    """
+    Сериализатор пакетной загрузки нескольких изображений.
+
+    Создает по инструменту на каждое изображение одним запросом bulk_create
+    в одной транзакции и после ее фиксации ставит в очередь одну группу
+    задач process_instrument_batch (см. enqueue_instrument_batch) вместо
+    отдельной задачи на каждое изображение.
+
+    Attributes:
+        images (list): Бинарные файлы изображений (обязательный)
+        text (str): Описание, общее для всех записей (обязательный)
+        expected_objects (int): Ожидаемое количество объектов (обязательный)
+        expected_confidence (float): Ожидаемая уверенность распознавания (обязательный)
+        tile_grid (int): Количество тайлов по стороне для тайлового инференса (опционально)
+        tile_overlap (float): Доля перекрытия тайлов (опционально)
+        priority (str): Класс приоритета обработки (опционально)
+    """
+
+    images = serializers.ListField(
+        child=serializers.ImageField(),
+        allow_empty=False,
+        max_length=settings.YOLO_BATCH_UPLOAD_MAX_IMAGES,
+        write_only=True,
+        help_text="Бинарные файлы изображений для обработки",
+    )
+    text = serializers.CharField(
+        write_only=True,
+        help_text="Описание, общее для всех создаваемых записей",
+    )
+    expected_objects = serializers.IntegerField(
+        write_only=True,
+        min_value=1,
+        help_text="Ожидаемое количество объектов на изображении",
+    )
+    expected_confidence = serializers.FloatField(
+        write_only=True,
+        help_text="Порог уверенности для детекции объектов (0.0 - 1.0)",
+    )
+    tile_grid = serializers.IntegerField(
+        write_only=True,
+        required=False,
+        min_value=1,
+        max_value=settings.YOLO_TILE_GRID_MAX,
+        help_text="Количество тайлов по стороне для мелких объектов (1 - без тайлов)",
+    )
+    tile_overlap = serializers.FloatField(
+        write_only=True,
+        required=False,
+        min_value=0.0,
+        max_value=0.5,
+        help_text="Доля перекрытия соседних тайлов (0.0 - 0.5)",
+    )
+    priority = serializers.ChoiceField(
+        choices=['interactive', 'bulk'],
+        write_only=True,
+        required=False,
+        help_text=PRIORITY_HELP,
+    )
+
+    def validate_images(self, images):
+        """
+        Проверяет, что все файлы являются изображениями.
+
+        Args:
+            images (list): Загруженные файлы
+
+        Returns:
+            list: Проверенные файлы
+
+        Raises:
+            ValidationError: Если какой-либо файл не является изображением
+        """
+        for image in images:
+            content_type = getattr(image, 'content_type', '') or ''
+            if not content_type.startswith('image/'):
+                raise serializers.ValidationError(
+                    f'Файл {image.name} должен быть изображением'
+                )
+        return images
+
+    def validate_expected_confidence(self, value):
+        """Проверяет, что уверенность распознавания лежит в (0, 1]."""
+        if not (0 < value <= 1):
+            raise serializers.ValidationError(
+                'Уверенность распознавания должна быть между 0 и 1'
+            )
+        return value
+
+    def create(self, validated_data):
+        """
+        Создает инструменты и запускает их пакетную YOLO обработку.
+
+        Args:
+            validated_data (dict): Валидированные данные запроса
+
+        Returns:
+            list: Созданные объекты Instrument
+        """
+        start_time = time.time()
+        request = self.context.get("request")
+        employee = (
+            request.user
+            if request and request.user.is_authenticated
+            else None
+        )
+
+        with transaction.atomic():
+            instruments = []
+            for image_file in validated_data["images"]:
+                instrument = Instrument(
+                    text=validated_data["text"],
+                    employee=employee,
+                    filename=image_file.name,
+                    expected_objects=validated_data["expected_objects"],
+                    expected_confidence=validated_data["expected_confidence"],
+                )
+                instrument.image.save(image_file.name, image_file, save=False)
+                instruments.append(instrument)
+
+            # PostgreSQL возвращает первичные ключи из bulk_create
+            instruments = Instrument.objects.bulk_create(instruments)
+
+            # Задачи отправляются одной группой после фиксации транзакции:
+            # воркер не получит ID записи, которой еще нет в БД
+            transaction.on_commit(
+                lambda: enqueue_instrument_batch(
+                    instruments,
+                    validated_data["expected_objects"],
+                    validated_data["expected_confidence"],
+                    tile_grid=validated_data.get("tile_grid"),
+                    tile_overlap=validated_data.get("tile_overlap"),
+                    priority=validated_data.get("priority"),
+                )
+            )
+
+        print(
+            f" [BACKEND CREATE] Batch of {len(instruments)} instruments created: {time.time() - start_time:.3f}s",
+            flush=True,
+        )
+        return instruments
+
+
+class InstrumentStatusQuerySerializer(serializers.Serializer):
+    """
+    Сериализатор параметров запроса статусов обработки.
+
+    Attributes:
+        ids (str): ID инструментов через запятую (не более
+                   settings.STATUS_POLL_MAX_IDS)
+    """
+
+    ids = serializers.CharField(
+        help_text="ID инструментов через запятую, например 15,16,42"
+    )
+
+    def validate_ids(self, value):
+        """
+        Разбирает список ID.
+
+        Args:
+            value (str): ID через запятую
+
+        Returns:
+            list: Уникальные ID инструментов
+
+        Raises:
+            ValidationError: Если ID не являются целыми числами или их
+                             больше settings.STATUS_POLL_MAX_IDS
+        """
+        try:
+            ids = {int(part) for part in value.split(',') if part.strip()}
+        except ValueError:
+            raise serializers.ValidationError(
+                "ID должны быть целыми числами через запятую"
+            )
+        if not ids:
+            raise serializers.ValidationError("Не указан ни один ID")
+        if len(ids) > settings.STATUS_POLL_MAX_IDS:
+            raise serializers.ValidationError(
+                f"Не более {settings.STATUS_POLL_MAX_IDS} ID за запрос"
+            )
+        return sorted(ids)
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор состояния возобновляемой загрузки.
+
+    Attributes:
+        offset (int): Сколько байт файла уже принято - с этого смещения
+                      клиент продолжает загрузку
+        instrument (int): ID созданного инструмента (после завершения)
+    """
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id',
+            'filename',
+            'size',
+            'sha256',
+            'offset',
+            'instrument',
+            'created_at',
+            'updated_at',
+        ]
+        read_only_fields = fields
+
+
+class UploadSessionCreateSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор начала возобновляемой загрузки.
+
+    Помимо описания файла принимает поля создания инструмента
+    (как InstrumentCreateSerializer, без image). Они сохраняются в
+    UploadSession.params и передаются в InstrumentCreateSerializer при
+    завершении загрузки.
+
+    Attributes:
+        filename (str): Имя файла (обязательный)
+        size (int): Размер файла, байты (обязательный)
+        sha256 (str): SHA-256 файла, hex (обязательный)
+        text (str): Описание инструмента (обязательный)
+        expected_objects (int): Ожидаемое количество объектов (обязательный)
+        expected_confidence (float): Ожидаемая уверенность распознавания (обязательный)
+        tile_grid (int): Количество тайлов по стороне (опционально)
+        tile_overlap (float): Доля перекрытия тайлов (опционально)
+        priority (str): Класс приоритета обработки (опционально)
+    """
+
+    PARAM_FIELDS = (
+        'text',
+        'expected_objects',
+        'expected_confidence',
+        'tile_grid',
+        'tile_overlap',
+        'priority',
+    )
+
+    sha256 = serializers.RegexField(
+        r'^[0-9a-fA-F]{64}$',
+        help_text="SHA-256 файла в шестнадцатеричном виде",
+    )
+    text = serializers.CharField(
+        write_only=True,
+        help_text="Описание создаваемой записи",
+    )
+    expected_objects = serializers.IntegerField(
+        write_only=True,
+        min_value=1,
+        help_text="Ожидаемое количество объектов на изображении",
+    )
+    expected_confidence = serializers.FloatField(
+        write_only=True,
+        help_text="Порог уверенности для детекции объектов (0.0 - 1.0)",
+    )
+    tile_grid = serializers.IntegerField(
+        write_only=True,
+        required=False,
+        min_value=1,
+        max_value=settings.YOLO_TILE_GRID_MAX,
+        help_text="Количество тайлов по стороне для мелких объектов (1 - без тайлов)",
+    )
+    tile_overlap = serializers.FloatField(
+        write_only=True,
+        required=False,
+        min_value=0.0,
+        max_value=0.5,
+        help_text="Доля перекрытия соседних тайлов (0.0 - 0.5)",
+    )
+    priority = serializers.ChoiceField(
+        choices=['interactive', 'bulk'],
+        write_only=True,
+        required=False,
+        help_text=PRIORITY_HELP,
+    )
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id',
+            'filename',
+            'size',
+            'sha256',
+            'offset',
+            'text',
+            'expected_objects',
+            'expected_confidence',
+            'tile_grid',
+            'tile_overlap',
+            'priority',
+        ]
+        read_only_fields = ['id', 'offset']
+
+    def validate_size(self, value):
+        """
+        Проверяет объявленный размер файла до начала загрузки.
+
+        Args:
+            value (int): Размер файла, байты
+
+        Returns:
+            int: Проверенный размер
+
+        Raises:
+            ValidationError: Если файл пуст, больше UPLOAD_MAX_FILE_SIZE
+                             или не поместится в сообщение задачи
+        """
+        if value <= 0:
+            raise serializers.ValidationError('Файл не может быть пустым')
+        if value > settings.UPLOAD_MAX_FILE_SIZE:
+            raise serializers.ValidationError(
+                f'Файл больше {settings.UPLOAD_MAX_FILE_SIZE // 2**20} МБ'
+            )
+        try:
+            check_payload_size(value)
+        except PayloadTooLarge as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+    def validate_expected_confidence(self, value):
+        """Проверяет, что уверенность распознавания лежит в (0, 1]."""
+        if not (0 < value <= 1):
+            raise serializers.ValidationError(
+                'Уверенность распознавания должна быть между 0 и 1'
+            )
+        return value
+
+    def create(self, validated_data):
+        """
+        Создает сессию загрузки текущего пользователя.
+
+        Args:
+            validated_data (dict): Валидированные данные
+
+        Returns:
+            UploadSession: Новая сессия с offset = 0
+        """
+        params = {
+            name: validated_data.pop(name)
+            for name in self.PARAM_FIELDS
+            if name in validated_data
+        }
+        validated_data['sha256'] = validated_data['sha256'].lower()
+        return UploadSession.objects.create(
+            employee=self.context['request'].user,
+            params=params,
+            **validated_data,
+        )
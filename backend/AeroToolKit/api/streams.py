@@ -0,0 +1,322 @@
+import asyncio
+import json
+import time
+from urllib.parse import parse_qs
+
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .events import TERMINAL_STATUSES
+
+
+class StatusHub:
+    """
+    Рассылка событий статуса обработки подключенным клиентам.
+
+    На процесс открывается одна подписка на канал Redis, и сообщения
+    раскладываются по очередям asyncio подписчиков, ожидающих эти ID.
+    Поэтому тысячи простаивающих подключений не держат тысячи соединений
+    с Redis и не занимают потоки: каждое - это корутина и пустая очередь.
+    """
+
+    # Сколько ждать подписки на канал при первом подключении, секунды
+    SUBSCRIBE_TIMEOUT = 2
+
+    def __init__(self):
+        self._subscribers = {}
+        self._listener = None
+        self._ready = None
+
+    async def subscribe(self, instrument_ids):
+        """
+        Подписывает клиента на события инструментов.
+
+        При первом вызове в процессе запускает чтение канала Redis и ждет
+        подписки, чтобы события, опубликованные после возврата, не
+        терялись. Если Redis недоступен, клиент получит хотя бы текущие
+        статусы.
+
+        Args:
+            instrument_ids (list): ID инструментов
+
+        Returns:
+            asyncio.Queue: Очередь событий {'id', 'processing_status'}
+        """
+        if self._listener is None or self._listener.done():
+            self._ready = asyncio.Event()
+            self._listener = asyncio.get_running_loop().create_task(
+                self._listen()
+            )
+        queue = asyncio.Queue()
+        for instrument_id in instrument_ids:
+            self._subscribers.setdefault(instrument_id, set()).add(queue)
+        try:
+            await asyncio.wait_for(
+                self._ready.wait(), timeout=self.SUBSCRIBE_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            pass
+        return queue
+
+    def unsubscribe(self, instrument_ids, queue):
+        """
+        Отписывает очередь клиента от событий инструментов.
+
+        Args:
+            instrument_ids (list): ID, переданные в subscribe
+            queue (asyncio.Queue): Очередь клиента
+        """
+        for instrument_id in instrument_ids:
+            queues = self._subscribers.get(instrument_id)
+            if queues is None:
+                continue
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[instrument_id]
+
+    def dispatch(self, message):
+        """
+        Раскладывает сообщение канала по очередям подписчиков.
+
+        Args:
+            message (dict): {'ids': [...], 'processing_status': str}
+        """
+        for instrument_id in message['ids']:
+            event = {
+                'id': instrument_id,
+                'processing_status': message['processing_status'],
+            }
+            for queue in self._subscribers.get(instrument_id, ()):
+                queue.put_nowait(event)
+
+    async def _listen(self):
+        """Читает канал Redis, переподключаясь при ошибках."""
+        while True:
+            client = aioredis.from_url(settings.YOLO_EVENTS_REDIS_URL)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(settings.YOLO_EVENTS_CHANNEL)
+                    self._ready.set()
+                    async for message in pubsub.listen():
+                        if message['type'] != 'message':
+                            continue
+                        try:
+                            self.dispatch(json.loads(message['data']))
+                        except (ValueError, KeyError, TypeError):
+                            continue
+            except aioredis.RedisError as e:
+                print(
+                    f" [BACKEND EVENTS] Redis subscription lost: {e}",
+                    flush=True,
+                )
+                await asyncio.sleep(1)
+            finally:
+                await client.aclose()
+
+
+hub = StatusHub()
+
+
+def parse_ids(raw):
+    """
+    Разбирает список ID из параметра запроса.
+
+    Args:
+        raw (str): ID через запятую
+
+    Returns:
+        list: Уникальные ID или None, если список некорректен
+    """
+    try:
+        ids = sorted({int(part) for part in raw.split(',') if part.strip()})
+    except ValueError:
+        return None
+    if not ids or len(ids) > settings.STATUS_POLL_MAX_IDS:
+        return None
+    return ids
+
+
+def get_token_key(scope, query):
+    """
+    Извлекает ключ токена из заголовка Authorization или параметра token.
+
+    EventSource в браузере не умеет передавать заголовки, поэтому
+    токен допускается и в строке запроса.
+
+    Args:
+        scope (dict): ASGI scope запроса
+        query (dict): Разобранная строка запроса
+
+    Returns:
+        str: Ключ токена или None
+    """
+    for name, value in scope['headers']:
+        if name == b'authorization':
+            parts = value.decode('latin-1').split()
+            if len(parts) == 2 and parts[0].lower() == 'token':
+                return parts[1]
+    return query.get('token', [None])[0]
+
+
+@sync_to_async
+def authenticate_token(key):
+    """bool: Существует ли активный пользователь с токеном key."""
+    from rest_framework.authtoken.models import Token
+
+    close_old_connections()
+    try:
+        token = Token.objects.select_related('user').get(key=key)
+        return token.user.is_active
+    except Token.DoesNotExist:
+        return False
+    finally:
+        close_old_connections()
+
+
+@sync_to_async
+def load_statuses(instrument_ids):
+    """list: Текущие статусы инструментов (как в endpoint статусов)."""
+    from instruments.models import Instrument
+
+    close_old_connections()
+    try:
+        return list(
+            Instrument.objects.filter(id__in=instrument_ids)
+            .order_by('id')
+            .values('id', 'processing_status')
+        )
+    finally:
+        close_old_connections()
+
+
+def format_event(event, data):
+    """bytes: Событие в формате text/event-stream."""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'.encode()
+
+
+async def wait_disconnect(receive):
+    """Ждет отключения клиента, пропуская тело запроса."""
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def send_error(send, status, message):
+    """Отправляет JSON ответ с ошибкой и закрывает запрос."""
+    await send(
+        {
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json')],
+        }
+    )
+    await send(
+        {
+            'type': 'http.response.body',
+            'body': json.dumps({'error': message}).encode(),
+        }
+    )
+
+
+async def instrument_events(scope, receive, send):
+    """
+    ASGI приложение потока событий завершения обработки (SSE).
+
+    GET /api/v1/instruments/events/?ids=1,2,3 отправляет событие status
+    с текущим статусом каждого инструмента, затем событие status при
+    каждой смене статуса. Когда все инструменты обработаны (done или
+    failed), отправляется событие complete и поток закрывается.
+
+    Подписка оформляется до чтения текущих статусов, поэтому смена
+    статуса между запросом к БД и подпиской не теряется.
+
+    Args:
+        scope (dict): ASGI scope HTTP запроса
+        receive (callable): Получение сообщений ASGI
+        send (callable): Отправка сообщений ASGI
+    """
+    if scope['method'] != 'GET':
+        await send_error(send, 405, 'Метод не поддерживается')
+        return
+
+    query = parse_qs(scope['query_string'].decode('latin-1'))
+    key = get_token_key(scope, query)
+    if not key or not await authenticate_token(key):
+        await send_error(send, 401, 'Требуется аутентификация')
+        return
+
+    instrument_ids = parse_ids(query.get('ids', [''])[0])
+    if instrument_ids is None:
+        await send_error(
+            send,
+            400,
+            f'Укажите от 1 до {settings.STATUS_POLL_MAX_IDS} ID '
+            f'через запятую',
+        )
+        return
+
+    queue = await hub.subscribe(instrument_ids)
+    disconnected = asyncio.get_running_loop().create_task(
+        wait_disconnect(receive)
+    )
+    try:
+        await send(
+            {
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no'),
+                ],
+            }
+        )
+
+        # Несуществующие инструменты в ответ не попадают и не ожидаются
+        pending = set()
+        for row in await load_statuses(instrument_ids):
+            await send(
+                {
+                    'type': 'http.response.body',
+                    'body': format_event('status', row),
+                    'more_body': True,
+                }
+            )
+            if row['processing_status'] not in TERMINAL_STATUSES:
+                pending.add(row['id'])
+
+        deadline = time.monotonic() + settings.YOLO_EVENTS_MAX_DURATION
+        while pending and time.monotonic() < deadline:
+            next_event = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {next_event, disconnected},
+                timeout=settings.YOLO_EVENTS_HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnected in done:
+                next_event.cancel()
+                return
+            if next_event not in done:
+                next_event.cancel()
+                body = b': keep-alive\n\n'
+            else:
+                event = next_event.result()
+                body = format_event('status', event)
+                if event['processing_status'] in TERMINAL_STATUSES:
+                    pending.discard(event['id'])
+            await send(
+                {'type': 'http.response.body', 'body': body, 'more_body': True}
+            )
+
+        await send(
+            {
+                'type': 'http.response.body',
+                'body': format_event('complete', {'pending': sorted(pending)}),
+            }
+        )
+    finally:
+        hub.unsubscribe(instrument_ids, queue)
+        disconnected.cancel()
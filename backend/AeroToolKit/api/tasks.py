@@ -1,13 +1,203 @@
 from celery import shared_task
+from django.conf import settings
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+import os
+import time
 import uuid
-from instruments.models import Instrument
-from .yolo_utils import run_yolo_inference
+from instruments.models import Detection, Instrument, ProcessingStatus
+from .events import publish_status
+from .idempotency import instrument_lock, instrument_locks
+
+
+YOLO_SECTION_PREFIX = "YOLO анализ:"
+
+
+def mark_processing(instrument_ids, processing_status):
+    """
+    Обновляет статус обработки инструментов одним UPDATE запросом.
+
+    Для статуса running записывается время начала обработки, для
+    остальных - время ее завершения. Смена статуса публикуется
+    подписчикам потока событий (см. api.events).
+
+    Args:
+        instrument_ids (list): ID инструментов
+        processing_status (str): Новый статус из ProcessingStatus
+    """
+    fields = {'processing_status': processing_status}
+    if processing_status == ProcessingStatus.RUNNING:
+        fields['processing_started_at'] = timezone.now()
+    else:
+        fields['processing_finished_at'] = timezone.now()
+    Instrument.objects.filter(id__in=instrument_ids).update(**fields)
+    publish_status(instrument_ids, processing_status)
+
+
+def claim_processing(instrument_ids):
+    """
+    Переводит в статус running инструменты, которые еще не обработаны.
+
+    Статус done служит ключом идемпотентности: повторная доставка задачи
+    (CELERY_TASK_ACKS_LATE) после сохранения результатов не выполняет
+    инференс повторно. Повторная обработка (yolo_reprocess) перед
+    постановкой в очередь сбрасывает статус в queued.
+
+    Args:
+        instrument_ids (list): ID инструментов
+
+    Returns:
+        list: ID существующих и еще не обработанных инструментов
+    """
+    claimed = list(
+        Instrument.objects.filter(id__in=instrument_ids)
+        .exclude(processing_status=ProcessingStatus.DONE)
+        .values_list('id', flat=True)
+    )
+    if claimed:
+        mark_processing(claimed, ProcessingStatus.RUNNING)
+    return claimed
+
+
+def skip_duplicate(instrument_id, reason):
+    """
+    Результат задачи, пропущенной как повторная доставка.
+
+    Args:
+        instrument_id (int): ID инструмента
+        reason (str): Причина пропуска для журнала
+
+    Returns:
+        dict: Результат задачи со статусом 'skipped'
+    """
+    print(
+        f" [BACKEND CELERY] Skipping duplicate delivery for instrument {instrument_id}: {reason}",
+        flush=True,
+    )
+    return {'status': 'skipped', 'instrument_id': instrument_id}
+
+
+def remove_quietly(path):
+    """Удаляет временный файл, игнорируя его отсутствие (и пустой путь)."""
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def apply_yolo_results(instrument, yolo_results, processed_image_bytes, burn):
+    """
+    Переносит результаты YOLO анализа в инструмент без сохранения в БД.
+
+    Добавляет к тексту инструмента список обнаруженных объектов,
+    заполняет detected_count и count_matches и сохраняет координаты
+    детекций (режим overlay) или записывает в хранилище аннотированное
+    изображение в annotated_image (режим burn).
+
+    Args:
+        instrument (Instrument): Обрабатываемый инструмент
+        yolo_results (dict): Результаты run_yolo_inference
+        processed_image_bytes (bytes): Аннотированное изображение или None
+        burn (bool): Сохранять ли аннотированный JPEG в annotated_image
+
+    Returns:
+        list: Имена измененных полей инструмента
+    """
+    # Обновляем текст инструмента с результатами YOLO анализа. При
+    # повторной обработке предыдущий раздел YOLO заменяется новым
+    original_text = instrument.text.split(YOLO_SECTION_PREFIX, 1)[0]
+    original_text = original_text.rstrip()
+    detections = yolo_results.get("detections", [])
+
+    if not detections:
+        yolo_section = "YOLO анализ: инструменты не обнаружены"
+    else:
+        # Форматируем список обнаруженных объектов
+        detected_items = [
+            f"{i+1}. {det['class']} (Уровень уверенности: {det['confidence']:.2f})"
+            for i, det in enumerate(detections)
+        ]
+        yolo_section = (
+            f"YOLO анализ: обнаружено {len(detections)} объектов\n"
+            + "\n".join(detected_items)
+        )
+
+    # Добавляем результаты YOLO к оригинальному тексту
+    if original_text.strip():
+        instrument.text = f"{original_text}\n\n{yolo_section}"
+    else:
+        instrument.text = yolo_section
+
+    instrument.detected_count = len(detections)
+    instrument.update_count_matches()
+    instrument.processing_status = ProcessingStatus.DONE
+    instrument.processing_finished_at = timezone.now()
+    status_fields = [
+        'detected_count',
+        'count_matches',
+        'processing_status',
+        'processing_finished_at',
+    ]
+
+    if burn:
+        # Аннотированное изображение сохраняется отдельно от исходного,
+        # результат предыдущей обработки удаляется
+        if instrument.annotated_image:
+            instrument.annotated_image.delete(save=False)
+        instrument.annotated_image.save(
+            "annotated.jpg", ContentFile(processed_image_bytes), save=False
+        )
+        return ['text', 'annotated_image'] + status_fields
+
+    # Сохраняем координаты детекций для наложения разметки поверх
+    # исходного изображения (в режиме burn рамки уже на изображении)
+    instrument.detections = detections
+    instrument.image_width, instrument.image_height = yolo_results[
+        "image_size"
+    ]
+    return [
+        'text',
+        'detections',
+        'image_width',
+        'image_height',
+    ] + status_fields
+
+
+def save_results(instrument, yolo_results):
+    """
+    Сохраняет инструмент и его детекции одной транзакцией.
+
+    Прежние детекции инструмента (повторная обработка) заменяются
+    новыми, записанными через bulk_create.
+
+    Args:
+        instrument (Instrument): Инструмент после apply_yolo_results
+        yolo_results (dict): Результаты run_yolo_inference
+    """
+    with transaction.atomic():
+        instrument.save()
+        Detection.replace(
+            [instrument.id],
+            [
+                Detection.from_result(instrument, detection)
+                for detection in yolo_results.get('detections', [])
+            ],
+        )
 
 
 @shared_task
 def process_instrument_with_yolo(
-    instrument_id, image_data, expected_objects, expected_confidence
+    instrument_id,
+    image_data,
+    expected_objects,
+    expected_confidence,
+    tile_grid=None,
+    tile_overlap=None,
+    image_name=None,
 ):
     """
     Фоновая Celery задача для обработки инструмента через YOLO модель.
@@ -18,20 +208,35 @@ def process_instrument_with_yolo(
 
     Процесс выполнения:
     1. Получает инструмент из базы данных по ID
-    2. Выполняет YOLO инференс на переданных данных изображения
+    2. Читает изображение из общего хранилища по image_name (или берет
+       переданные байты) и выполняет YOLO инференс
     3. Форматирует результаты детекции в читаемый текст
-    4. Сохраняет аннотированное изображение с bounding boxes
-    5. Обновляет запись инструмента в базе данных
+    4. Сохраняет координаты детекций (режим overlay) или аннотированный
+       JPEG в annotated_image (режим burn, YOLO_RESULT_MODE)
+    5. Обновляет запись инструмента в базе данных и заменяет его
+       детекции (Detection) одной транзакцией
+
+    Задача идемпотентна: на время обработки берется блокировка
+    инструмента в Redis, а инструмент со статусом done не
+    обрабатывается повторно (см. claim_processing).
 
     Args:
         instrument_id (int): ID инструмента в базе данных
         image_data (bytes): Бинарные данные изображения для обработки
+                            (None если передан image_name)
         expected_objects (int): Ожидаемое количество объектов на изображении
         expected_confidence (float): Порог уверенности для детекции (0.0-1.0)
+        tile_grid (int): Количество тайлов по стороне для тайлового
+                         инференса (None - settings.YOLO_TILE_GRID)
+        tile_overlap (float): Доля перекрытия тайлов
+                              (None - settings.YOLO_TILE_OVERLAP)
+        image_name (str): Путь к изображению в хранилище media, из которого
+                          читаются данные, если image_data не передан
 
     Returns:
         dict: Результат выполнения задачи:
-            - status (str): 'success' при успешном выполнении, 'error' при ошибке
+            - status (str): 'success' при успешном выполнении, 'error' при
+              ошибке, 'skipped' при повторной доставке задачи
             - instrument_id (int): ID обработанного инструмента
             - error (str): Сообщение об ошибке (только при status='error')
 
@@ -42,78 +247,518 @@ def process_instrument_with_yolo(
     Example:
         >>> result = process_instrument_with_yolo.delay(
         ...     instrument_id=101,
-        ...     image_data=b'...',
+        ...     image_data=None,
         ...     expected_objects=11,
-        ...     expected_confidence=0.8
+        ...     expected_confidence=0.8,
+        ...     image_name='instruments/originals/2025/01/1a2b3c4d.jpg',
         ... )
         >>> # Задача выполняется асинхронно в Celery worker
     """
-    try:
-        print(
-            f" [BACKEND CELERY] Starting YOLO processing for instrument {instrument_id}",
-            flush=True,
-        )
+    with instrument_lock(instrument_id) as acquired:
+        if not acquired:
+            return skip_duplicate(instrument_id, "already in progress")
+
+        try:
+            print(
+                f" [BACKEND CELERY] Starting YOLO processing for instrument {instrument_id}",
+                flush=True,
+            )
+
+            # Стек инференса (onnxruntime, OpenCV) импортируется только здесь,
+            # внутри Celery воркера, а не при импорте модуля задач
+            from .yolo_utils import run_yolo_inference
+
+            # Повторная доставка задачи для уже обработанного инструмента
+            # не повторяет инференс и запись результатов
+            if not claim_processing([instrument_id]) and (
+                Instrument.objects.filter(id=instrument_id).exists()
+            ):
+                return skip_duplicate(instrument_id, "already processed")
+
+            # Получаем инструмент из базы данных
+            instrument = Instrument.objects.get(id=instrument_id)
+
+            # Изображение передается ссылкой на файл в общем хранилище media
+            if image_data is None:
+                with default_storage.open(image_name, 'rb') as f:
+                    image_data = f.read()
+
+            # В режиме overlay аннотированное изображение не создается:
+            # сохраняются только координаты детекций
+            burn = settings.YOLO_RESULT_MODE == 'burn'
+
+            # Выполняем YOLO обработку изображения
+            yolo_results, processed_image_bytes = run_yolo_inference(
+                image_data,
+                conf_thres=expected_confidence,
+                expected_objects=expected_objects,
+                expected_confidence=expected_confidence,
+                render=burn,
+                tile_grid=tile_grid,
+                tile_overlap=tile_overlap,
+            )
+
+            # Обновляем инструмент результатами YOLO анализа
+            apply_yolo_results(
+                instrument, yolo_results, processed_image_bytes, burn
+            )
+            save_results(instrument, yolo_results)
+            publish_status([instrument_id], ProcessingStatus.DONE)
+
+            print(
+                f" [BACKEND CELERY] YOLO processing completed for instrument {instrument_id}",
+                flush=True,
+            )
+
+            return {'status': 'success', 'instrument_id': instrument_id}
+
+        except Instrument.DoesNotExist:
+            # Обработка случая когда инструмент не найден
+            error_msg = f"Instrument with id {instrument_id} does not exist"
+            print(
+                f" [BACKEND CELERY] Error processing instrument {instrument_id}: {error_msg}",
+                flush=True,
+            )
+            return {'status': 'error', 'error': error_msg}
+
+        except Exception as e:
+            # Обработка всех других ошибок
+            print(
+                f" [BACKEND CELERY] Error processing instrument {instrument_id}: {str(e)}",
+                flush=True,
+            )
+            mark_processing([instrument_id], ProcessingStatus.FAILED)
+            return {'status': 'error', 'error': str(e)}
+
+
+@shared_task
+def process_instrument_batch(
+    items,
+    expected_objects,
+    expected_confidence,
+    tile_grid=None,
+    tile_overlap=None,
+):
+    """
+    Фоновая Celery задача для YOLO обработки нескольких инструментов.
+
+    Обрабатывает все изображения одной загрузки за одну задачу: файлы
+    читаются и декодируются параллельно, инференс выполняется батчами
+    (см. run_yolo_inference_batch), все инструменты обновляются одним
+    запросом bulk_update, а их детекции (Detection) записываются одним
+    bulk_create.
+
+    Ошибки изолированы по изображениям: поврежденный файл или удаленный
+    инструмент не прерывают обработку остальных.
+
+    Args:
+        items (list): Словари с ключами instrument_id и image_name (путь
+                      к изображению в хранилище media)
+        expected_objects (int): Ожидаемое количество объектов на изображении
+        expected_confidence (float): Порог уверенности для детекции (0.0-1.0)
+        tile_grid (int): Количество тайлов по стороне (None - по настройкам)
+        tile_overlap (float): Доля перекрытия тайлов (None - по настройкам)
+
+    Returns:
+        dict: Результат выполнения задачи:
+            - status (str): 'success' если все изображения обработаны,
+              'partial' при ошибках части изображений
+            - processed (list): ID обработанных инструментов
+            - skipped (list): ID инструментов, пропущенных как уже
+              обработанные или обрабатываемые другой доставкой задачи
+            - errors (list): Словари instrument_id и error для ошибок
 
-        # Получаем инструмент из базы данных
-        instrument = Instrument.objects.get(id=instrument_id)
+    Example:
+        >>> result = process_instrument_batch.delay(
+        ...     items=[
+        ...         {'instrument_id': 101, 'image_name': 'instruments/a.jpg'},
+        ...         {'instrument_id': 102, 'image_name': 'instruments/b.jpg'},
+        ...     ],
+        ...     expected_objects=11,
+        ...     expected_confidence=0.8,
+        ... )
+    """
+    print(
+        f" [BACKEND CELERY] Starting YOLO batch processing for {len(items)} instruments",
+        flush=True,
+    )
+
+    from .yolo_utils import run_yolo_inference_batch
+
+    instrument_ids = [item['instrument_id'] for item in items]
+    with instrument_locks(instrument_ids) as locked:
+        # Уже обработанные инструменты и инструменты, которые обрабатывает
+        # другая доставка задачи, пропускаются
+        claimed = set(claim_processing(locked))
+        instruments = Instrument.objects.in_bulk(instrument_ids)
+        errors = []
+        pending = []
+        skipped = []
+        for item in items:
+            if item['instrument_id'] in claimed:
+                pending.append(item)
+            elif item['instrument_id'] in instruments:
+                skipped.append(item['instrument_id'])
+            else:
+                errors.append(
+                    {
+                        'instrument_id': item['instrument_id'],
+                        'error': f"Instrument with id {item['instrument_id']} does not exist",
+                    }
+                )
 
-        # Выполняем YOLO обработку изображения
-        yolo_results, processed_image_bytes = run_yolo_inference(
-            image_data,
+        def loader(image_name):
+            def load():
+                with default_storage.open(image_name, 'rb') as f:
+                    return f.read()
+
+            return load
+
+        burn = settings.YOLO_RESULT_MODE == 'burn'
+        results = run_yolo_inference_batch(
+            [loader(item['image_name']) for item in pending],
             conf_thres=expected_confidence,
             expected_objects=expected_objects,
             expected_confidence=expected_confidence,
+            render=burn,
+            tile_grid=tile_grid,
+            tile_overlap=tile_overlap,
         )
 
-        # Обновляем текст инструмента с результатами YOLO анализа
-        original_text = instrument.text
-        detections = yolo_results.get("detections", [])
-
-        if not detections:
-            yolo_section = "YOLO анализ: инструменты не обнаружены"
-        else:
-            # Форматируем список обнаруженных объектов
-            detected_items = [
-                f"{i+1}. {det['class']} (Уровень уверенности: {det['confidence']:.2f})"
-                for i, det in enumerate(detections)
-            ]
-            yolo_section = (
-                f"YOLO анализ: обнаружено {len(detections)} объектов\n"
-                + "\n".join(detected_items)
-            )
-
-        # Добавляем результаты YOLO к оригинальному тексту
-        if original_text.strip():
-            instrument.text = f"{original_text}\n\n{yolo_section}"
-        else:
-            instrument.text = yolo_section
+        updated = []
+        fields = set()
+        detections = []
+        for item, result in zip(pending, results):
+            instrument_id = item['instrument_id']
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                yolo_results, processed_image_bytes = result
+                instrument = instruments[instrument_id]
+                fields.update(
+                    apply_yolo_results(
+                        instrument, yolo_results, processed_image_bytes, burn
+                    )
+                )
+                detections.extend(
+                    Detection.from_result(instrument, detection)
+                    for detection in yolo_results.get('detections', [])
+                )
+                updated.append(instrument)
+            except Exception as e:
+                print(
+                    f" [BACKEND CELERY] Error processing instrument {instrument_id}: {str(e)}",
+                    flush=True,
+                )
+                errors.append(
+                    {'instrument_id': instrument_id, 'error': str(e)}
+                )
 
-        # Сохраняем обработанное изображение с bounding boxes
-        save_filename = f"instrument_{uuid.uuid4().hex[:8]}.jpg"
-        instrument.image.save(
-            save_filename, ContentFile(processed_image_bytes)
-        )
+        if updated:
+            with transaction.atomic():
+                Instrument.objects.bulk_update(updated, sorted(fields))
+                Detection.replace(
+                    [instrument.id for instrument in updated], detections
+                )
+            publish_status(
+                [instrument.id for instrument in updated],
+                ProcessingStatus.DONE,
+            )
+        if errors:
+            mark_processing(
+                [error['instrument_id'] for error in errors],
+                ProcessingStatus.FAILED,
+            )
 
         print(
-            f" [BACKEND CELERY] YOLO processing completed for instrument {instrument_id}",
+            f" [BACKEND CELERY] YOLO batch completed: {len(updated)} processed, {len(skipped)} skipped, {len(errors)} errors",
             flush=True,
         )
 
-        return {'status': 'success', 'instrument_id': instrument_id}
+        return {
+            'status': 'partial' if errors else 'success',
+            'processed': [instrument.id for instrument in updated],
+            'skipped': skipped,
+            'errors': errors,
+        }
 
-    except Instrument.DoesNotExist:
-        # Обработка случая когда инструмент не найден
-        error_msg = f"Instrument with id {instrument_id} does not exist"
-        print(
-            f" [BACKEND CELERY] Error processing instrument {instrument_id}: {error_msg}",
-            flush=True,
+
+# Этапы конвейера YOLO обработки (settings.YOLO_PIPELINE = 'staged').
+# Каждый этап выполняется в своей очереди, поэтому пулы декодирования,
+# инференса и сохранения масштабируются независимо. Промежуточное
+# декодированное изображение передается между этапами через файл .npy
+# в общем каталоге settings.YOLO_PIPELINE_DIR, а не через брокер.
+
+
+@shared_task
+def decode_instrument_image(
+    instrument_id,
+    image_name,
+    expected_objects,
+    expected_confidence,
+    image_data=None,
+    tile_grid=None,
+    tile_overlap=None,
+    imgsz=640,
+):
+    """
+    Этап 1 конвейера: декодирование изображения инструмента.
+
+    Читает изображение из хранилища (или берет переданные байты),
+    декодирует его в разрешении, близком к входу модели, и сохраняет
+    пиксели во временный файл для этапа инференса.
+
+    Args:
+        instrument_id (int): ID инструмента в базе данных
+        image_name (str): Путь к изображению в хранилище media
+        expected_objects (int): Ожидаемое количество объектов на изображении
+        expected_confidence (float): Порог уверенности для детекции (0.0-1.0)
+        image_data (bytes): Байты изображения (режим inline) или None
+        tile_grid (int): Количество тайлов по стороне (None - по настройкам)
+        tile_overlap (float): Доля перекрытия тайлов (None - по настройкам)
+        imgsz (int): Размер входа модели
+
+    Returns:
+        dict: Состояние конвейера для этапа инференса
+    """
+    import numpy as np
+
+    from .decoding import decode_for_inference
+    from .yolo_utils import resolve_tiling
+
+    # Инструмент уже обработан (повторная доставка цепочки) или удален
+    if not claim_processing([instrument_id]):
+        skip_duplicate(instrument_id, "already processed or deleted")
+        return {'instrument_id': instrument_id, 'skipped': True}
+
+    try:
+        if image_data is None:
+            with default_storage.open(image_name, 'rb') as f:
+                image_data = f.read()
+
+        tile_grid, tile_overlap = resolve_tiling(tile_grid, tile_overlap)
+        decoded = decode_for_inference(
+            image_data, imgsz * tile_grid, decoder=settings.YOLO_DECODER
         )
-        return {'status': 'error', 'error': error_msg}
 
-    except Exception as e:
-        # Обработка всех других ошибок
-        print(
-            f" [BACKEND CELERY] Error processing instrument {instrument_id}: {str(e)}",
-            flush=True,
+        os.makedirs(settings.YOLO_PIPELINE_DIR, exist_ok=True)
+        # ID инструмента в имени нужен reclaim_media, чтобы не удалять
+        # файлы инструментов, обработка которых не завершена
+        array_path = os.path.join(
+            settings.YOLO_PIPELINE_DIR,
+            f'{instrument_id}-{uuid.uuid4().hex}.npy',
         )
-        return {'status': 'error', 'error': str(e)}
+        np.save(array_path, decoded.array)
+    except Exception:
+        # Ошибка этапа прерывает цепочку, статус фиксируется здесь
+        mark_processing([instrument_id], ProcessingStatus.FAILED)
+        raise
+
+    return {
+        'instrument_id': instrument_id,
+        'image_name': image_name,
+        'array_path': array_path,
+        'orig_size': list(decoded.orig_size),
+        'scale': [decoded.scale_x, decoded.scale_y],
+        'expected_objects': expected_objects,
+        'expected_confidence': expected_confidence,
+        'tile_grid': tile_grid,
+        'tile_overlap': tile_overlap,
+        'imgsz': imgsz,
+    }
+
+
+def load_decoded(state):
+    """
+    Загружает декодированное изображение этапа 1 конвейера.
+
+    Промежуточный файл удаляется этапом сохранения после записи
+    результатов. Если файла нет, а инструмент еще не обработан
+    (повторная доставка после ошибки сохранения, файл удален командой
+    reclaim_media), изображение декодируется заново из хранилища.
+
+    Args:
+        state (dict): Состояние конвейера от decode_instrument_image
+
+    Returns:
+        numpy.ndarray: Пиксели изображения или None, если инструмент
+                       уже обработан или удален
+    """
+    import numpy as np
+
+    from .decoding import decode_for_inference
+
+    try:
+        return np.load(state['array_path'])
+    except FileNotFoundError:
+        pass
+
+    instrument = (
+        Instrument.objects.filter(id=state['instrument_id'])
+        .exclude(processing_status=ProcessingStatus.DONE)
+        .only('id', 'image')
+        .first()
+    )
+    if instrument is None:
+        return None
+    print(
+        f" [BACKEND CELERY] Decoding instrument {instrument.id} again: intermediate file is missing",
+        flush=True,
+    )
+    with instrument.image.open('rb') as f:
+        image_data = f.read()
+    decoded = decode_for_inference(
+        image_data,
+        state['imgsz'] * state['tile_grid'],
+        decoder=settings.YOLO_DECODER,
+    )
+    return decoded.array
+
+
+@shared_task
+def infer_instrument_image(state, iou_thres=0.7):
+    """
+    Этап 2 конвейера: предобработка и инференс YOLO.
+
+    Загружает декодированное изображение этапа 1, выполняет предобработку
+    в переиспользуемые буферы, инференс (с микробатчингом между задачами
+    процесса) и NMS. Временный файл остается до этапа сохранения, чтобы
+    повторная доставка инференса не потеряла изображение.
+
+    Args:
+        state (dict): Состояние конвейера от decode_instrument_image
+        iou_thres (float): Порог IoU для NMS
+
+    Returns:
+        dict: Состояние конвейера с результатами детекции
+    """
+    from .yolo_utils import (
+        build_detections,
+        infer_inputs,
+        merge_detections,
+        prepare_inputs,
+    )
+
+    if state.get('skipped'):
+        return state
+
+    instrument_id = state['instrument_id']
+    array_path = state['array_path']
+    with instrument_lock(instrument_id, 'infer') as acquired:
+        if not acquired:
+            skip_duplicate(instrument_id, "already in progress")
+            return dict(state, skipped=True)
+
+        start = time.time()
+        try:
+            image = load_decoded(state)
+            if image is None:
+                skip_duplicate(instrument_id, "already processed or deleted")
+                return dict(state, skipped=True)
+            imgsz = state['imgsz']
+            height, width = image.shape[:2]
+            inputs, transforms = prepare_inputs(
+                image, imgsz, state['tile_grid'], state['tile_overlap']
+            )
+            found = merge_detections(
+                infer_inputs(inputs),
+                transforms,
+                (width, height),
+                imgsz,
+                float(state['expected_confidence']),
+                iou_thres,
+            )
+            detections, _ = build_detections(
+                found, state['scale'], state['orig_size']
+            )
+        except Exception:
+            remove_quietly(array_path)
+            mark_processing([instrument_id], ProcessingStatus.FAILED)
+            raise
+
+    state = dict(state)
+    state['yolo_results'] = {
+        'detections': detections,
+        'processing_time': round(time.time() - start, 2),
+        'status': 'processed' if detections else 'no_detections',
+        'image_size': state['orig_size'],
+    }
+    return state
+
+
+@shared_task
+def persist_instrument_results(state):
+    """
+    Этап 3 конвейера: отрисовка (режим burn) и сохранение результатов.
+
+    Промежуточный файл этапа 1 удаляется после сохранения результатов
+    (или если инструмент уже обработан либо удален). После ошибки он
+    остается для повторной доставки и удаляется командой reclaim_media.
+
+    Args:
+        state (dict): Состояние конвейера от infer_instrument_image
+
+    Returns:
+        dict: Результат выполнения в формате process_instrument_with_yolo
+    """
+    instrument_id = state['instrument_id']
+    if state.get('skipped'):
+        return {'status': 'skipped', 'instrument_id': instrument_id}
+
+    with instrument_lock(instrument_id, 'persist') as acquired:
+        if not acquired:
+            return skip_duplicate(instrument_id, "already in progress")
+
+        try:
+            instrument = Instrument.objects.get(id=instrument_id)
+            if instrument.processing_status == ProcessingStatus.DONE:
+                remove_quietly(state['array_path'])
+                return skip_duplicate(instrument_id, "already processed")
+            yolo_results = state['yolo_results']
+            burn = settings.YOLO_RESULT_MODE == 'burn'
+
+            processed_image_bytes = None
+            if burn:
+                from .renderer import render_annotated
+
+                with instrument.image.open('rb') as f:
+                    image_data = f.read()
+                processed_image_bytes = render_annotated(
+                    image_data,
+                    [
+                        (det['bbox'], det['class'], det['confidence'])
+                        for det in yolo_results['detections']
+                    ],
+                    encoder=settings.YOLO_RENDER_ENCODER,
+                    quality=settings.YOLO_RENDER_JPEG_QUALITY,
+                )
+
+            apply_yolo_results(
+                instrument, yolo_results, processed_image_bytes, burn
+            )
+            save_results(instrument, yolo_results)
+            remove_quietly(state['array_path'])
+            publish_status([instrument_id], ProcessingStatus.DONE)
+
+            print(
+                f" [BACKEND CELERY] YOLO pipeline completed for instrument {instrument_id}",
+                flush=True,
+            )
+            return {'status': 'success', 'instrument_id': instrument_id}
+
+        except Instrument.DoesNotExist:
+            remove_quietly(state['array_path'])
+            error_msg = f"Instrument with id {instrument_id} does not exist"
+            print(
+                f" [BACKEND CELERY] Error processing instrument {instrument_id}: {error_msg}",
+                flush=True,
+            )
+            return {'status': 'error', 'error': error_msg}
+
+        except Exception as e:
+            print(
+                f" [BACKEND CELERY] Error processing instrument {instrument_id}: {str(e)}",
+                flush=True,
+            )
+            mark_processing([instrument_id], ProcessingStatus.FAILED)
+            return {'status': 'error', 'error': str(e)}
@@ -0,0 +1,89 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from .yolo_utils import batched_nms, nms
+
+
+class BatchedNmsTests(SimpleTestCase):
+    """Проверяет, что batched_nms совпадает с nms по каждому классу."""
+
+    def per_class_nms(self, boxes, scores, class_ids, iou_thres):
+        """
+        Эталон: nms() отдельно для каждого класса.
+
+        Returns:
+            list: Индексы сохраненных box'ов по убыванию уверенности
+        """
+        keep = []
+        for class_id in np.unique(class_ids):
+            idxs = np.flatnonzero(class_ids == class_id)
+            keep.extend(
+                idxs[nms(boxes[idxs], scores[idxs], iou_thres)].tolist()
+            )
+        # Тот же порядок, что у batched_nms: по убыванию уверенности,
+        # при равной уверенности - по индексу
+        return sorted(keep, key=lambda i: (-scores[i], i))
+
+    def test_tied_scores_overlapping_boxes(self):
+        rng = np.random.default_rng(0)
+        for _ in range(200):
+            n = 40
+            # Кластеры сильно перекрывающихся box'ов, чтобы решение
+            # о подавлении зависело от порядка box'ов с равной уверенностью
+            centers = rng.uniform(50, 590, size=(5, 2))
+            xy = centers[rng.integers(0, 5, n)] + rng.normal(0, 6, (n, 2))
+            wh = rng.uniform(40, 80, size=(n, 2))
+            boxes = np.concatenate([xy - wh / 2, xy + wh / 2], axis=1)
+            boxes = boxes.astype(np.float32)
+            # Округление, как у выхода fp16 / int8 модели, дает равные
+            # уверенности
+            scores = np.round(rng.uniform(0.5, 0.52, n), 3).astype(
+                np.float32
+            )
+            class_ids = rng.integers(0, 3, n)
+
+            expected = self.per_class_nms(boxes, scores, class_ids, 0.45)
+            actual = batched_nms(boxes, scores, class_ids, 0.45).tolist()
+            self.assertEqual(actual, expected)
+
+    def test_random_boxes_many_classes(self):
+        # Те же наборы, что в yolo_bench nms: 11 классов, 1000 box'ов
+        rng = np.random.default_rng(0)
+        for _ in range(5):
+            n = 1000
+            xy = rng.uniform(0, 600, size=(n, 2))
+            wh = rng.uniform(5, 120, size=(n, 2))
+            boxes = np.concatenate([xy, xy + wh], axis=1).astype(np.float32)
+            scores = (rng.permutation(n) / n).astype(np.float32)
+            class_ids = rng.integers(0, 11, n)
+
+            expected = self.per_class_nms(boxes, scores, class_ids, 0.45)
+            actual = batched_nms(boxes, scores, class_ids, 0.45).tolist()
+            self.assertEqual(actual, expected)
+
+    def test_all_scores_equal(self):
+        boxes = np.array(
+            [
+                [0, 0, 10, 10],
+                [1, 1, 11, 11],
+                [2, 2, 12, 12],
+                [0, 0, 10, 10],
+                [1, 1, 11, 11],
+            ],
+            dtype=np.float32,
+        )
+        scores = np.full(5, 0.9, dtype=np.float32)
+        class_ids = np.array([0, 0, 0, 1, 1])
+
+        # IoU(0, 1) = 0.68, IoU(0, 2) = 0.47: box 1 подавляется, box 2 нет
+        self.assertEqual(nms(boxes[:3], scores[:3], 0.5), [0, 2])
+        self.assertEqual(
+            batched_nms(boxes, scores, class_ids, 0.5).tolist(), [0, 2, 3]
+        )
+
+    def test_empty(self):
+        empty = np.empty((0, 4), dtype=np.float32)
+        self.assertEqual(nms(empty, np.empty(0), 0.45), [])
+        self.assertEqual(
+            batched_nms(empty, np.empty(0), np.empty(0, dtype=int)).size, 0
+        )
@@ -0,0 +1,237 @@
+import hashlib
+import mimetypes
+import os
+import shutil
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import (
+    StopUpload,
+    TemporaryFileUploadHandler,
+)
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Загружаемые файлы слишком велики.'
+    default_code = 'upload_too_large'
+
+
+class StreamingUploadHandler(TemporaryFileUploadHandler):
+    """
+    Обработчик загрузки, записывающий файлы на диск по частям.
+
+    Каждая часть размером UPLOAD_CHUNK_SIZE сразу пишется во временный
+    файл в FILE_UPLOAD_TEMP_DIR, поэтому память запроса не зависит от
+    размера и количества изображений. По мере приема считаются SHA-256
+    и размер файла; при превышении UPLOAD_MAX_FILE_SIZE или
+    UPLOAD_MAX_REQUEST_SIZE прием прерывается: остаток тела запроса
+    вычитывается без записи, чтобы клиент получил ответ 413, а не сброс
+    соединения. Причина сохраняется в request.upload_error (см.
+    check_upload).
+
+    Готовый файл получает атрибут sha256. Каталог временных файлов
+    находится на том же томе, что и MEDIA_ROOT, поэтому сохранение в
+    ImageField - переименование, а не копирование.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.chunk_size = settings.UPLOAD_CHUNK_SIZE
+        self.request_size = 0
+
+    def new_file(self, *args, **kwargs):
+        # Каталог создается при первой загрузке, а не при импорте настроек
+        os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        self.file_size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.file_size += len(raw_data)
+        self.request_size += len(raw_data)
+        if self.file_size > settings.UPLOAD_MAX_FILE_SIZE:
+            self.reject(
+                f'Файл {self.file_name} больше '
+                f'{settings.UPLOAD_MAX_FILE_SIZE // 2**20} МБ.'
+            )
+        if self.request_size > settings.UPLOAD_MAX_REQUEST_SIZE:
+            self.reject(
+                f'Файлы запроса больше '
+                f'{settings.UPLOAD_MAX_REQUEST_SIZE // 2**20} МБ.'
+            )
+        self.sha256.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        uploaded.sha256 = self.sha256.hexdigest()
+        return uploaded
+
+    def reject(self, message):
+        """
+        Прерывает прием запроса.
+
+        Временный файл закрывается и удаляется парсером, уже принятые
+        файлы запроса остаются в request.FILES.
+
+        Args:
+            message (str): Причина, сохраняемая в request.upload_error
+
+        Raises:
+            StopUpload: Всегда
+        """
+        print(f" [BACKEND] Upload rejected: {message}", flush=True)
+        if self.request is not None:
+            self.request.upload_error = message
+        raise StopUpload()
+
+
+def check_upload(request):
+    """
+    Проверяет, что файлы запроса приняты полностью.
+
+    Args:
+        request (Request): HTTP запрос загрузки
+
+    Raises:
+        UploadTooLarge: Ответ 413, если прием был прерван
+                        StreamingUploadHandler
+    """
+    # Обращение к data запускает разбор тела запроса
+    request.data
+    error = getattr(request, 'upload_error', None)
+    if error:
+        raise UploadTooLarge(error)
+
+
+class AssembledUpload(UploadedFile):
+    """
+    Файл, собранный возобновляемой загрузкой, в виде загруженного файла.
+
+    Передается в InstrumentCreateSerializer вместо файла из multipart
+    запроса. Как и TemporaryUploadedFile, сообщает путь на диске, поэтому
+    проверка изображения читает файл напрямую, а сохранение в ImageField
+    переносит его переименованием.
+    """
+
+    def __init__(self, path, name, size):
+        content_type = (
+            mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        )
+        super().__init__(open(path, 'rb'), name, content_type, size)
+        self.path = path
+
+    def temporary_file_path(self):
+        """Return the full path of this file."""
+        return self.path
+
+
+def write_chunk(path, offset, stream, length):
+    """
+    Записывает часть файла возобновляемой загрузки.
+
+    Тело запроса читается и пишется по UPLOAD_CHUNK_SIZE байт. Если
+    соединение оборвалось посреди части, принятые байты сохраняются и
+    учитываются: клиент продолжит со смещения, которое вернет сервер.
+    Все, что лежит в файле после записанной части, отбрасывается.
+
+    Args:
+        path (str): Файл, в который собирается загрузка
+        offset (int): Смещение части в файле
+        stream: Поток тела запроса
+        length (int): Длина части (Content-Length)
+
+    Returns:
+        int: Количество принятых байт
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    received = 0
+    mode = 'r+b' if offset else 'wb'
+    with open(path, mode) as f:
+        f.seek(offset)
+        while received < length:
+            try:
+                data = stream.read(
+                    min(settings.UPLOAD_CHUNK_SIZE, length - received)
+                )
+            except OSError as e:
+                print(
+                    f" [BACKEND] Upload chunk interrupted after {received} bytes: {e}",
+                    flush=True,
+                )
+                break
+            if not data:
+                break
+            f.write(data)
+            received += len(data)
+        f.truncate()
+    return received
+
+
+def chunk_path(session_path):
+    """
+    Путь временного файла для приема одной части.
+
+    Каждый запрос пишет часть в свой файл рядом с файлом сессии, поэтому
+    прием тела запроса не требует блокировки сессии: зависший запрос не
+    мешает клиенту повторить часть новым запросом.
+
+    Args:
+        session_path (str): Файл, в который собирается загрузка
+
+    Returns:
+        str: Уникальный путь для части
+    """
+    return f'{session_path}.{uuid.uuid4().hex}.chunk'
+
+
+def commit_chunk(path, offset, chunk_file_path):
+    """
+    Переносит принятую часть в файл загрузки по смещению.
+
+    Копирование локальное (часть не больше UPLOAD_SESSION_MAX_CHUNK),
+    поэтому выполняется быстро и под блокировкой сессии. Все, что лежит
+    в файле после части, отбрасывается.
+
+    Args:
+        path (str): Файл, в который собирается загрузка
+        offset (int): Смещение части в файле
+        chunk_file_path (str): Файл с принятой частью
+
+    Raises:
+        FileNotFoundError: Файл загрузки удален при ненулевом смещении
+    """
+    mode = 'r+b' if offset else 'wb'
+    with open(path, mode) as f, open(chunk_file_path, 'rb') as chunk:
+        f.seek(offset)
+        shutil.copyfileobj(chunk, f, settings.UPLOAD_CHUNK_SIZE)
+        f.truncate()
+
+
+def remove_chunk(chunk_file_path):
+    """Удаляет временный файл части, если он есть."""
+    try:
+        os.remove(chunk_file_path)
+    except FileNotFoundError:
+        pass
+
+
+def file_sha256(path):
+    """
+    Вычисляет SHA-256 файла, читая его по частям.
+
+    Args:
+        path (str): Путь к файлу
+
+    Returns:
+        str: Контрольная сумма (hex)
+    """
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(settings.UPLOAD_CHUNK_SIZE), b''):
+            sha256.update(data)
+    return sha256.hexdigest()
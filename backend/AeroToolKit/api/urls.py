@@ -8,6 +8,7 @@ from .views import (
     obtain_auth_token_csrf_exempt,
     ToolViewSet,
     InstrumentViewSet,
+    UploadSessionViewSet,
 )
 
 # Инициализация маршрутизатора для автоматической генерации URL patterns
@@ -16,6 +17,7 @@ router = DefaultRouter()
 # Регистрация ViewSet'ов в маршрутизаторе
 router.register(r'tools', ToolViewSet, basename='tool')
 router.register(r'instruments', InstrumentViewSet, basename='instruments')
+router.register(r'uploads', UploadSessionViewSet, basename='uploads')
 
 # Конфигурация схемы OpenAPI для автоматической генерации документации
 schema_view = get_schema_view(
@@ -1,16 +1,67 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth import authenticate
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.authtoken.models import Token
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import Throttled
 from rest_framework.filters import SearchFilter, OrderingFilter
-from instruments.models import Instrument
+from instruments.models import Instrument, UploadSession
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .serializers import InstrumentSerializer, InstrumentCreateSerializer
+from .admission import Overloaded, check_admission
+from .dispatch import choose_priority
+from .pagination import InstrumentCursorPagination
+from .uploads import (
+    AssembledUpload,
+    check_upload,
+    chunk_path,
+    commit_chunk,
+    file_sha256,
+    remove_chunk,
+    write_chunk,
+)
+from .serializers import (
+    InstrumentBatchCreateSerializer,
+    InstrumentCreateSerializer,
+    InstrumentSerializer,
+    InstrumentStatusQuerySerializer,
+    UploadSessionCreateSerializer,
+    UploadSessionSerializer,
+)
+
+
+def admit(batch_size=1, requested=None, batch=False):
+    """
+    Проверяет, успеет ли очередь обработать загрузку за допустимое время.
+
+    Args:
+        batch_size (int): Количество изображений в загрузке
+        requested (str): Класс приоритета из запроса (или None)
+        batch (bool): Загрузка обрабатывается пакетными задачами
+
+    Raises:
+        Throttled: Ответ 429 с заголовком Retry-After, если ожидаемое
+                   время в очереди превышает YOLO_ADMISSION_MAX_WAIT
+    """
+    if requested not in ('interactive', 'bulk'):
+        requested = None
+    try:
+        check_admission(choose_priority(batch_size, requested), batch)
+    except Overloaded as e:
+        print(f" [BACKEND] Upload rejected: {e}", flush=True)
+        raise Throttled(wait=e.retry_after, detail=str(e))
 
 
 class ToolViewSet(viewsets.ViewSet):
@@ -52,6 +103,40 @@ class ToolViewSet(viewsets.ViewSet):
         return Response({"message": "API работает!"})
 
 
+# Тело запроса пакетной загрузки (batch и bulk)
+BATCH_REQUEST_BODY = openapi.Schema(
+    type=openapi.TYPE_OBJECT,
+    required=[
+        'text',
+        'images',
+        'expected_objects',
+        'expected_confidence',
+    ],
+    properties={
+        'text': openapi.Schema(
+            type=openapi.TYPE_STRING,
+            description="Описание для всех записей (обязательно)",
+            example="Фотографии набора инструментов",
+        ),
+        'images': openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(type=openapi.TYPE_FILE),
+            description="Бинарные файлы изображений (обязательно)",
+        ),
+        'expected_objects': openapi.Schema(
+            type=openapi.TYPE_INTEGER,
+            description="Ожидаемое количество объектов (обязательно)",
+            example=11,
+        ),
+        'expected_confidence': openapi.Schema(
+            type=openapi.TYPE_NUMBER,
+            description="Ожидаемая уверенность распознавания (обязательно)",
+            example=0.9,
+        ),
+    },
+)
+
+
 class InstrumentViewSet(viewsets.ModelViewSet):
     """
     ViewSet для CRUD операций с инструментами с обработкой изображений через YOLO.
@@ -78,16 +163,22 @@ class InstrumentViewSet(viewsets.ModelViewSet):
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    pagination_class = InstrumentCursorPagination
 
     # Фильтрация, поиск, сортировка
-    filterset_fields = [
-        'employee',
-        'employee__username',
-        'pub_date',
-        'filename',
-        'expected_objects',
-        'expected_confidence',
-    ]
+    # Диапазон pub_date вместе с count_matches=false - выборка
+    # несовпадений за период по индексу instrument_mismatch_idx
+    filterset_fields = {
+        'employee': ['exact'],
+        'employee__username': ['exact'],
+        'pub_date': ['exact', 'gte', 'lt'],
+        'filename': ['exact'],
+        'expected_objects': ['exact'],
+        'expected_confidence': ['exact'],
+        'detected_count': ['exact'],
+        'count_matches': ['exact'],
+        'processing_status': ['exact'],
+    }
     search_fields = [
         'text',
         'employee__username',
@@ -103,7 +194,8 @@ class InstrumentViewSet(viewsets.ModelViewSet):
         'expected_objects',
         'expected_confidence',
     ]
-    ordering = ['-pub_date']
+    # id делает порядок однозначным для курсорной пагинации
+    ordering = ['-pub_date', '-id']
 
     def get_serializer_class(self):
         """
@@ -111,7 +203,8 @@ class InstrumentViewSet(viewsets.ModelViewSet):
 
         Для создания инструмента используется InstrumentCreateSerializer,
         который включает специальную логику обработки бинарных изображений
-        и запуска асинхронной YOLO обработки. Для остальных операций
+        и запуска асинхронной YOLO обработки, для пакетной загрузки -
+        InstrumentBatchCreateSerializer. Для остальных операций
         используется базовый InstrumentSerializer.
 
         Returns:
@@ -119,6 +212,8 @@ class InstrumentViewSet(viewsets.ModelViewSet):
         """
         if self.action == 'create':
             return InstrumentCreateSerializer
+        if self.action in ('batch', 'bulk'):
+            return InstrumentBatchCreateSerializer
         return InstrumentSerializer
 
     def get_queryset(self):
@@ -176,6 +271,10 @@ class InstrumentViewSet(viewsets.ModelViewSet):
             201: openapi.Response('Успешно создано', InstrumentSerializer),
             400: openapi.Response('Ошибка валидации'),
             401: openapi.Response('Требуется аутентификация'),
+            413: openapi.Response('Файлы превышают допустимый размер'),
+            429: openapi.Response(
+                'Очередь обработки переполнена, см. Retry-After'
+            ),
         },
     )
     def create(self, request, *args, **kwargs):
@@ -203,9 +302,33 @@ class InstrumentViewSet(viewsets.ModelViewSet):
                 - 201: Успешное создание
                 - 400: Ошибка валидации данных
                 - 401: Отсутствует аутентификация
+                - 413: Файлы превышают UPLOAD_MAX_FILE_SIZE или
+                       UPLOAD_MAX_REQUEST_SIZE
+                - 429: Очередь обработки переполнена (заголовок Retry-After)
         """
+        check_upload(request)
+        self.admit(request)
         return super().create(request, *args, **kwargs)
 
+    def admit(self, request, batch_size=1, batch=False):
+        """
+        Проверяет, успеет ли очередь обработать загрузку за допустимое время.
+
+        Проверка выполняется до валидации и сохранения, чтобы при
+        перегрузке не тратить время на изображения, которые не будут
+        обработаны.
+
+        Args:
+            request (Request): HTTP запрос загрузки
+            batch_size (int): Количество изображений в запросе
+            batch (bool): Загрузка обрабатывается пакетными задачами
+
+        Raises:
+            Throttled: Ответ 429 с заголовком Retry-After, если ожидаемое
+                       время в очереди превышает YOLO_ADMISSION_MAX_WAIT
+        """
+        admit(batch_size, request.data.get('priority'), batch)
+
     def perform_create(self, serializer):
         """
         Выполняется после успешной валидации данных.
@@ -238,7 +361,8 @@ class InstrumentViewSet(viewsets.ModelViewSet):
         - Фильтрация по пользователю, дате, ожидаемым параметрам
         - Полнотекстовый поиск по описанию и имени пользователя
         - Сортировка по различным полям
-        - Пагинация результатов
+        - Курсорная пагинация: page_size (до API_MAX_PAGE_SIZE), переход
+          по ссылкам next / previous
 
         Args:
             request (Request): HTTP запрос с параметрами фильтрации
@@ -361,6 +485,528 @@ class InstrumentViewSet(viewsets.ModelViewSet):
         """
         return super().destroy(request, *args, **kwargs)
 
+    @swagger_auto_schema(
+        operation_description=(
+            "Пакетное создание инструментов: по записи на каждое изображение "
+            "и одна группа фоновых задач YOLO обработки для всех изображений"
+        ),
+        operation_summary="Пакетное создание инструментов",
+        request_body=BATCH_REQUEST_BODY,
+        responses={
+            201: openapi.Response(
+                'Успешно создано', InstrumentSerializer(many=True)
+            ),
+            400: openapi.Response('Ошибка валидации'),
+            401: openapi.Response('Требуется аутентификация'),
+            413: openapi.Response('Файлы превышают допустимый размер'),
+            429: openapi.Response(
+                'Очередь обработки переполнена, см. Retry-After'
+            ),
+        },
+    )
+    @action(detail=False, methods=['post'])
+    def batch(self, request, *args, **kwargs):
+        """
+        Создает несколько инструментов одним запросом.
+
+        Вместо N запросов и N задач process_instrument_with_yolo
+        создается группа задач process_instrument_batch по
+        YOLO_BATCH_TASK_MAX_IMAGES изображений, которые декодируют
+        изображения параллельно и выполняют инференс батчами.
+
+        Args:
+            request (Request): HTTP запрос с изображениями (поле images
+                               повторяется для каждого файла)
+            *args: Дополнительные позиционные аргументы
+            **kwargs: Дополнительные именованные аргументы
+
+        Returns:
+            Response: Список созданных инструментов (201), ошибки (400),
+                      превышение размера загрузки (413) или перегрузка
+                      очереди (429)
+        """
+        instruments = self.create_batch(request)
+        return Response(
+            InstrumentSerializer(
+                instruments, many=True, context=self.get_serializer_context()
+            ).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Массовое создание инструментов: записи создаются одним "
+            "bulk_create в одной транзакции, после фиксации YOLO обработка "
+            "ставится в очередь одной группой задач. В ответе только ID "
+            "созданных записей в порядке изображений"
+        ),
+        operation_summary="Массовое создание инструментов",
+        request_body=BATCH_REQUEST_BODY,
+        responses={
+            201: openapi.Response(
+                'Успешно создано',
+                openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'ids': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                        ),
+                    },
+                ),
+            ),
+            400: openapi.Response('Ошибка валидации'),
+            401: openapi.Response('Требуется аутентификация'),
+            413: openapi.Response('Файлы превышают допустимый размер'),
+            429: openapi.Response(
+                'Очередь обработки переполнена, см. Retry-After'
+            ),
+        },
+    )
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, *args, **kwargs):
+        """
+        Создает несколько инструментов одним запросом и возвращает их ID.
+
+        Работает так же, как batch, но не сериализует созданные записи:
+        клиенту пакетной отправки (photo_server) достаточно ID, по которым
+        он опрашивает статусы обработки.
+
+        Args:
+            request (Request): HTTP запрос с изображениями (поле images
+                               повторяется для каждого файла)
+            *args: Дополнительные позиционные аргументы
+            **kwargs: Дополнительные именованные аргументы
+
+        Returns:
+            Response: {'ids': [...]} (201), ошибки (400), превышение
+                      размера загрузки (413) или перегрузка очереди (429)
+        """
+        instruments = self.create_batch(request)
+        return Response(
+            {'ids': [instrument.id for instrument in instruments]},
+            status=status.HTTP_201_CREATED,
+        )
+
+    def create_batch(self, request):
+        """
+        Создает инструменты пакетной загрузки (для batch и bulk).
+
+        Args:
+            request (Request): HTTP запрос с изображениями
+
+        Returns:
+            list: Созданные объекты Instrument
+
+        Raises:
+            UploadTooLarge: Ответ 413, если файлы превышают лимиты
+            Throttled: Ответ 429, если очередь обработки переполнена
+            ValidationError: Ответ 400 при ошибках валидации
+        """
+        check_upload(request)
+        if hasattr(request.data, 'getlist'):
+            images = request.data.getlist('images')
+        else:
+            images = request.data.get('images') or []
+        self.admit(request, batch_size=max(1, len(images)), batch=True)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Статусы YOLO обработки нескольких инструментов одним "
+            "запросом, для опроса клиентами"
+        ),
+        operation_summary="Статусы обработки инструментов",
+        manual_parameters=[
+            openapi.Parameter(
+                'ids',
+                openapi.IN_QUERY,
+                description="ID инструментов через запятую",
+                type=openapi.TYPE_STRING,
+                required=True,
+            ),
+        ],
+        responses={
+            200: openapi.Response('Список ID и статусов обработки'),
+            400: openapi.Response('Некорректный список ID'),
+            401: openapi.Response('Требуется аутентификация'),
+        },
+    )
+    @action(detail=False, methods=['get'], url_path='status')
+    def processing_status(self, request, *args, **kwargs):
+        """
+        Возвращает статусы обработки инструментов по списку ID.
+
+        Выполняется один запрос по первичному ключу, выбирающий только
+        статус и время обработки, без сериализации записей целиком.
+        Несуществующие ID в ответ не попадают.
+
+        Args:
+            request (Request): HTTP запрос с параметром ids
+            *args: Дополнительные позиционные аргументы
+            **kwargs: Дополнительные именованные аргументы
+
+        Returns:
+            Response: Список словарей id, processing_status,
+                      processing_started_at, processing_finished_at
+        """
+        query = InstrumentStatusQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        statuses = (
+            Instrument.objects.filter(id__in=query.validated_data['ids'])
+            .order_by('id')
+            .values(
+                'id',
+                'processing_status',
+                'processing_started_at',
+                'processing_finished_at',
+            )
+        )
+        return Response(list(statuses))
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Экспорт изображения инструмента с нарисованными рамками "
+            "детекции (JPEG)"
+        ),
+        operation_summary="Экспорт аннотированного изображения",
+        responses={
+            200: openapi.Response('JPEG изображение'),
+            404: openapi.Response('Инструмент не найден или не обработан'),
+            401: openapi.Response('Требуется аутентификация'),
+        },
+    )
+    @action(detail=True, methods=['get'])
+    def annotated(self, request, *args, **kwargs):
+        """
+        Создает изображение с "вшитой" разметкой по запросу.
+
+        Рамки хранятся как данные (поле detections) и обычно рисуются
+        клиентом поверх исходного изображения. Этот endpoint создает
+        JPEG с разметкой только при явном экспорте.
+
+        Args:
+            request (Request): HTTP запрос
+            *args: Дополнительные позиционные аргументы
+            **kwargs: Дополнительные именованные аргументы
+
+        Returns:
+            HttpResponse: JPEG изображение для скачивания или ошибка 404
+        """
+        from .renderer import render_instrument
+
+        instrument = self.get_object()
+        if instrument.image_width is None:
+            return Response(
+                {'error': 'Результаты детекции для инструмента отсутствуют'},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        response = HttpResponse(
+            render_instrument(
+                instrument,
+                encoder=settings.YOLO_RENDER_ENCODER,
+                quality=settings.YOLO_RENDER_JPEG_QUALITY,
+            ),
+            content_type='image/jpeg',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="instrument_{instrument.id}_annotated.jpg"'
+        )
+        return response
+
+
+class UploadSessionViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    ViewSet возобновляемой загрузки фотографий по частям.
+
+    Протокол для нестабильных сетей, где загрузка файла целиком одним
+    запросом обрывается и начинается заново:
+
+    1. POST /uploads/ - объявить файл (имя, размер, SHA-256) и параметры
+       создания инструмента, получить id сессии
+    2. PUT /uploads/{id}/chunk/?offset=N - передать часть файла с
+       подтвержденного смещения, в ответе новое смещение
+    3. POST /uploads/{id}/complete/ - проверить контрольную сумму и
+       создать инструмент обычным путем InstrumentCreateSerializer
+
+    После обрыва клиент запрашивает GET /uploads/{id}/ и продолжает с
+    offset из ответа. Сессии видны только создавшему их пользователю.
+    """
+
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """QuerySet: Сессии загрузки текущего пользователя."""
+        return UploadSession.objects.filter(employee=self.request.user)
+
+    def get_serializer_class(self):
+        """Serializer: UploadSessionCreateSerializer для create."""
+        if self.action == 'create':
+            return UploadSessionCreateSerializer
+        return UploadSessionSerializer
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Передача части файла. Тело запроса - байты файла начиная со "
+            f"смещения offset, не более {settings.UPLOAD_SESSION_MAX_CHUNK} "
+            "байт. Смещение должно совпадать с подтвержденным сервером"
+        ),
+        operation_summary="Часть возобновляемой загрузки",
+        manual_parameters=[
+            openapi.Parameter(
+                'offset',
+                openapi.IN_QUERY,
+                description="Смещение части в файле, байты",
+                type=openapi.TYPE_INTEGER,
+                required=True,
+            ),
+        ],
+        responses={
+            200: openapi.Response('Новое подтвержденное смещение'),
+            400: openapi.Response('Некорректное смещение или длина'),
+            409: openapi.Response(
+                'Смещение не совпадает с подтвержденным (offset в ответе) '
+                'или загрузка уже завершается'
+            ),
+            413: openapi.Response('Часть больше UPLOAD_SESSION_MAX_CHUNK'),
+        },
+    )
+    @action(detail=True, methods=['put'])
+    def chunk(self, request, *args, **kwargs):
+        """
+        Принимает часть файла по смещению.
+
+        Тело запроса принимается во временный файл без блокировки
+        сессии, поэтому повтор части после обрыва связи не ждет
+        зависший запрос. Затем под короткой блокировкой строки сессии
+        смещение проверяется повторно и часть переносится в файл
+        загрузки: из параллельных запросов с одной частью записывает
+        первый, остальные получают 409 с актуальным смещением.
+
+        Args:
+            request (Request): PUT запрос с байтами части в теле
+
+        Returns:
+            Response: {'offset': подтвержденное смещение}
+        """
+        try:
+            offset = int(request.query_params.get('offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response(
+                {'error': 'Укажите смещение offset целым числом'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if length <= 0:
+            return Response(
+                {'error': 'Пустая часть файла'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if length > settings.UPLOAD_SESSION_MAX_CHUNK:
+            return Response(
+                {
+                    'error': f'Часть больше '
+                    f'{settings.UPLOAD_SESSION_MAX_CHUNK} байт'
+                },
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+
+        # Смещение проверяется до приема тела запроса, чтобы не читать
+        # заведомо лишнюю часть
+        session = self.get_object()
+        if session.completed_at:
+            return Response(
+                {'error': 'Загрузка уже завершена', 'offset': session.offset},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if offset != session.offset:
+            return Response(
+                {'error': 'Неверное смещение', 'offset': session.offset},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if offset + length > session.size:
+            return Response(
+                {'error': 'Часть выходит за объявленный размер файла'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Тело запроса принимается в отдельный файл без транзакции и
+        # блокировок: зависшее соединение не держит строку сессии
+        part = chunk_path(session.path)
+        try:
+            received = write_chunk(part, 0, request.stream, length)
+            with transaction.atomic():
+                session = get_object_or_404(
+                    self.get_queryset().select_for_update(), pk=kwargs['pk']
+                )
+                if session.completed_at or session.offset != offset:
+                    # Часть уже записал параллельный (повторный) запрос
+                    return Response(
+                        {
+                            'error': 'Неверное смещение',
+                            'offset': session.offset,
+                        },
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                if received:
+                    try:
+                        commit_chunk(session.path, offset, part)
+                        session.offset = offset + received
+                    except FileNotFoundError:
+                        # Принятые части удалены: загрузка начинается
+                        # заново
+                        session.offset = 0
+                    session.save(update_fields=['offset', 'updated_at'])
+        finally:
+            remove_chunk(part)
+
+        if session.offset != offset + length:
+            return Response(
+                {
+                    'error': 'Часть принята не полностью',
+                    'offset': session.offset,
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response({'offset': session.offset})
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Завершение загрузки: собранный файл сверяется с объявленным "
+            "SHA-256 и передается в создание инструмента с YOLO обработкой. "
+            "Повторный вызов возвращает уже созданный инструмент"
+        ),
+        operation_summary="Завершение возобновляемой загрузки",
+        responses={
+            201: openapi.Response('Инструмент создан', InstrumentSerializer),
+            200: openapi.Response(
+                'Инструмент уже был создан', InstrumentSerializer
+            ),
+            400: openapi.Response(
+                'Контрольная сумма не совпадает (загрузка начинается '
+                'заново) или ошибка валидации'
+            ),
+            409: openapi.Response(
+                'Файл принят не полностью (offset в ответе) или '
+                'загрузка уже завершается'
+            ),
+            429: openapi.Response(
+                'Очередь обработки переполнена, см. Retry-After'
+            ),
+        },
+    )
+    @action(detail=True, methods=['post'])
+    def complete(self, request, *args, **kwargs):
+        """
+        Проверяет собранный файл и создает из него инструмент.
+
+        Завершение захватывается условным UPDATE по completed_at, поэтому
+        при повторной отправке запроса (ответ потерялся при обрыве связи)
+        инструмент не создается дважды. Если проверка или создание не
+        удались, захват снимается и завершение можно повторить. Захват,
+        оставшийся от упавшего процесса, считается прерванным через
+        UPLOAD_SESSION_COMPLETE_TIMEOUT секунд.
+
+        Args:
+            request (Request): POST запрос завершения
+
+        Returns:
+            Response: Созданный инструмент (201) или созданный ранее (200)
+        """
+        session = self.get_object()
+        if session.instrument_id:
+            return Response(
+                InstrumentSerializer(
+                    session.instrument, context=self.get_serializer_context()
+                ).data
+            )
+        if session.offset != session.size:
+            return Response(
+                {
+                    'error': 'Файл принят не полностью',
+                    'offset': session.offset,
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+        admit(requested=session.params.get('priority'))
+
+        # Захват старше UPLOAD_SESSION_COMPLETE_TIMEOUT без созданного
+        # инструмента остался от упавшего процесса и перехватывается
+        stale = timezone.now() - timedelta(
+            seconds=settings.UPLOAD_SESSION_COMPLETE_TIMEOUT
+        )
+        claimed = (
+            UploadSession.objects.filter(
+                pk=session.pk, instrument__isnull=True
+            )
+            .filter(Q(completed_at__isnull=True) | Q(completed_at__lt=stale))
+            .update(completed_at=timezone.now())
+        )
+        if not claimed:
+            return Response(
+                {'error': 'Загрузка уже завершается'},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        upload = None
+        try:
+            if file_sha256(session.path) != session.sha256:
+                print(
+                    f" [BACKEND] Upload {session.pk} checksum mismatch, restarting",
+                    flush=True,
+                )
+                os.remove(session.path)
+                UploadSession.objects.filter(pk=session.pk).update(
+                    offset=0, completed_at=None
+                )
+                return Response(
+                    {
+                        'error': 'Контрольная сумма не совпадает, '
+                        'загрузите файл заново',
+                        'offset': 0,
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            upload = AssembledUpload(
+                session.path, session.filename, session.size
+            )
+            serializer = InstrumentCreateSerializer(
+                data={
+                    **session.params,
+                    'image': upload,
+                    'filename': session.filename,
+                },
+                context=self.get_serializer_context(),
+            )
+            serializer.is_valid(raise_exception=True)
+            instrument = serializer.save()
+        except Exception:
+            UploadSession.objects.filter(pk=session.pk).update(
+                completed_at=None
+            )
+            raise
+        finally:
+            if upload is not None:
+                upload.close()
+
+        UploadSession.objects.filter(pk=session.pk).update(
+            instrument=instrument
+        )
+        return Response(
+            InstrumentSerializer(
+                instrument, context=self.get_serializer_context()
+            ).data,
+            status=status.HTTP_201_CREATED,
+        )
+
 
 @swagger_auto_schema(
     method='post',
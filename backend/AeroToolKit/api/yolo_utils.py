@@ -1,24 +1,94 @@
 import cv2
-import io
 import numpy as np
-import onnxruntime as ort
 import os
-from PIL import Image, ImageDraw, ImageFont
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
+from .batching import MicroBatchInferenceEngine
+from .decoding import decode_for_inference
+from .preprocessing import get_preprocessor
+from .renderer import render_annotated
+from .onnx_session import get_session, warmup_session
 
 # Конфигурация YOLO
 YOLO_CLASSES = settings.YOLO_CLASSES
 
-# Путь к модели YOLO
-YOLO_MODEL_PATH = os.path.join(
-    os.path.dirname(__file__), 'yolo_models', 'yolo_model.onnx'
-)
+# Каталог с моделями YOLO
+YOLO_MODELS_DIR = os.path.join(os.path.dirname(__file__), 'yolo_models')
 
-# Инициализация ONNX сессии
-ort_session = ort.InferenceSession(
-    YOLO_MODEL_PATH, providers=["CPUExecutionProvider"]
-)
+# Исходная FP32 модель
+YOLO_BASE_MODEL_PATH = os.path.join(YOLO_MODELS_DIR, 'yolo_model.onnx')
+
+# Варианты модели, которые создает команда yolo_quantize
+YOLO_MODEL_VARIANTS = ('fp32', 'int8_dynamic', 'int8_static', 'fp16')
+
+
+def model_variant_path(variant):
+    """
+    Возвращает путь к файлу варианта модели.
+
+    Args:
+        variant (str): Один из YOLO_MODEL_VARIANTS
+
+    Returns:
+        str: Путь к ONNX файлу варианта (для fp32 - исходная модель)
+    """
+    if variant not in YOLO_MODEL_VARIANTS:
+        raise ValueError(
+            f"Unknown YOLO model variant '{variant}', "
+            f"expected one of {YOLO_MODEL_VARIANTS}"
+        )
+    if variant == 'fp32':
+        return YOLO_BASE_MODEL_PATH
+    return os.path.join(YOLO_MODELS_DIR, f'yolo_model.{variant}.onnx')
+
+
+# Путь к модели YOLO, выбранной для этого развертывания
+YOLO_MODEL_PATH = model_variant_path(settings.YOLO_MODEL_VARIANT)
+
+# ONNX сессия и движок микробатчинга создаются лениво при первом инференсе,
+# чтобы импорт модуля не загружал модель в процессах, которые ее не используют
+_inference_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_inference_engine():
+    """
+    Возвращает движок инференса процесса, создавая его при первом вызове.
+
+    Returns:
+        MicroBatchInferenceEngine: Движок микробатчинга поверх ONNX сессии
+    """
+    global _inference_engine
+    if _inference_engine is None:
+        with _engine_lock:
+            if _inference_engine is None:
+                _inference_engine = MicroBatchInferenceEngine(
+                    get_session(YOLO_MODEL_PATH),
+                    max_batch_size=settings.YOLO_BATCH_MAX_SIZE,
+                    max_wait_ms=settings.YOLO_BATCH_MAX_WAIT_MS,
+                )
+    return _inference_engine
+
+
+def warmup_inference_engine(imgsz=640):
+    """
+    Создает сессию и движок инференса заранее и выполняет прогрев.
+
+    Вызывается при старте процесса Celery воркера, чтобы первая задача
+    не платила за загрузку модели, оптимизацию графа и первый инференс.
+
+    Args:
+        imgsz (int): Размер стороны входного изображения
+
+    Returns:
+        dict: Метрики холодного старта (время создания сессии, попадание
+              в кэш оптимизированной модели, время первого инференса)
+    """
+    metrics = warmup_session(YOLO_MODEL_PATH, imgsz=imgsz)
+    get_inference_engine()
+    return metrics
 
 
 def letterbox(im, new_shape=(640, 640), color=(114, 114, 114)):
@@ -79,6 +149,10 @@ def compute_iou(box, boxes):
     """
     Вычисляет Intersection over Union (IoU) между одним bounding box и массивом bounding box'ов.
 
+    Координаты берутся по последней оси, поэтому вместо одного box'а
+    можно передать массив (M, 1, 4) и получить матрицу IoU (M, N) с теми
+    же поэлементными вычислениями, что и для одного box'а.
+
     Args:
         box (numpy.ndarray): Один bounding box в формате [x1, y1, x2, y2]
         boxes (numpy.ndarray): Массив bounding box'ов в формате (N, 4)
@@ -86,10 +160,10 @@ def compute_iou(box, boxes):
     Returns:
         numpy.ndarray: Массив значений IoU для каждого bounding box'а
     """
-    x1 = np.maximum(box[0], boxes[:, 0])
-    y1 = np.maximum(box[1], boxes[:, 1])
-    x2 = np.minimum(box[2], boxes[:, 2])
-    y2 = np.minimum(box[3], boxes[:, 3])
+    x1 = np.maximum(box[..., 0], boxes[:, 0])
+    y1 = np.maximum(box[..., 1], boxes[:, 1])
+    x2 = np.minimum(box[..., 2], boxes[:, 2])
+    y2 = np.minimum(box[..., 3], boxes[:, 3])
 
     # Вычисляем площадь пересечения
     inter_w = np.maximum(0.0, x2 - x1)
@@ -97,7 +171,7 @@ def compute_iou(box, boxes):
     inter = inter_w * inter_h
 
     # Вычисляем площади bounding box'ов
-    area1 = (box[2] - box[0]) * (box[3] - box[1])
+    area1 = (box[..., 2] - box[..., 0]) * (box[..., 3] - box[..., 1])
     area2 = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
 
     # Вычисляем объединение
@@ -124,8 +198,9 @@ def nms(boxes, scores, iou_thres=0.45):
     if boxes.shape[0] == 0:
         return []
 
-    # Сортируем по убыванию уверенности
-    idxs = scores.argsort()[::-1]
+    # Сортируем по убыванию уверенности. Сортировка устойчивая: при равной
+    # уверенности порядок по индексу тот же, что и в batched_nms
+    idxs = np.argsort(-scores, kind='stable')
     keep = []
 
     while idxs.size:
@@ -143,6 +218,100 @@ def nms(boxes, scores, iou_thres=0.45):
     return keep
 
 
+def box_iou_matrix(boxes, others=None):
+    """
+    Вычисляет матрицу IoU между двумя наборами bounding box'ов за один шаг.
+
+    Args:
+        boxes (numpy.ndarray): Массив bounding box'ов в формате (N, 4) [x1, y1, x2, y2]
+        others (numpy.ndarray): Второй массив (M, 4); по умолчанию boxes
+
+    Returns:
+        numpy.ndarray: Матрица IoU формы (N, M)
+    """
+    if others is None:
+        others = boxes
+
+    # Пересечение считаем через outer-операции по каждой координате:
+    # это быстрее, чем broadcast по массивам формы (N, M, 2)
+    inter = np.minimum.outer(boxes[:, 2], others[:, 2])
+    inter -= np.maximum.outer(boxes[:, 0], others[:, 0])
+    np.maximum(inter, 0.0, out=inter)
+    inter_h = np.minimum.outer(boxes[:, 3], others[:, 3])
+    inter_h -= np.maximum.outer(boxes[:, 1], others[:, 1])
+    np.maximum(inter_h, 0.0, out=inter_h)
+    inter *= inter_h
+
+    area1 = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    area2 = (others[:, 2] - others[:, 0]) * (others[:, 3] - others[:, 1])
+
+    union = np.add.outer(area1, area2)
+    union -= inter
+    union += 1e-6
+    return inter / union
+
+
+# Сколько строк матрицы IoU считать за раз (ограничивает пиковую память)
+NMS_IOU_CHUNK_ROWS = 1024
+
+
+def batched_nms(boxes, scores, class_ids, iou_thres=0.45):
+    """
+    Векторизованный NMS сразу для всех классов.
+
+    Box'ы упорядочиваются по убыванию уверенности один раз, затем для
+    каждого класса матрица подавления строится целиком (по блокам строк)
+    через compute_iou, и остается только цикл по строкам готовой
+    матрицы. Матрицы строятся только внутри класса, поэтому память
+    пропорциональна сумме квадратов размеров классов, а не квадрату
+    общего числа box'ов.
+
+    IoU считается теми же поэлементными операциями и в том же типе
+    данных, что и в nms(), а при равной уверенности порядок устойчивый
+    (по индексу), поэтому результат совпадает с последовательным
+    применением nms() к каждому классу.
+
+    Args:
+        boxes (numpy.ndarray): Массив bounding box'ов в формате (N, 4) [x1, y1, x2, y2]
+        scores (numpy.ndarray): Массив уверенностей (N,)
+        class_ids (numpy.ndarray): Массив идентификаторов классов (N,)
+        iou_thres (float): Порог IoU для подавления дубликатов
+
+    Returns:
+        numpy.ndarray: Индексы сохраненных box'ов по убыванию уверенности
+                       (при равной уверенности - по возрастанию индекса)
+    """
+    n = boxes.shape[0]
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    order = np.argsort(-scores, kind='stable')
+    ranked_classes = class_ids[order]
+    keep = np.zeros(n, dtype=bool)
+
+    for class_id in np.unique(ranked_classes):
+        # Позиции box'ов класса в общем порядке по уверенности
+        positions = np.flatnonzero(ranked_classes == class_id)
+        members = boxes[order[positions]]
+        m = members.shape[0]
+
+        # suppress[i, j] = True если box j подавляется box'ом i
+        suppress = np.empty((m, m), dtype=bool)
+        for start in range(0, m, NMS_IOU_CHUNK_ROWS):
+            stop = min(start + NMS_IOU_CHUNK_ROWS, m)
+            suppress[start:stop] = (
+                compute_iou(members[start:stop, None], members) >= iou_thres
+            )
+
+        alive = np.ones(m, dtype=bool)
+        for i in range(m - 1):
+            if alive[i]:
+                alive[i + 1 :] &= ~suppress[i, i + 1 :]
+        keep[positions[alive]] = True
+
+    return order[keep]
+
+
 def process_yolo_output(
     output, img_shape=640, conf_thres=0.25, iou_thres=0.45
 ):
@@ -213,36 +382,292 @@ def process_yolo_output(
     if max_coord <= 1.0:
         boxes_xyxy = boxes_xyxy * img_shape
 
-    # Выполняем NMS для каждого класса отдельно
-    final = []
-    unique_classes = np.unique(class_ids)
+    # Выполняем NMS сразу для всех классов за один векторизованный проход
+    keep = batched_nms(
+        boxes_xyxy, class_scores, class_ids, iou_thres=iou_thres
+    )
+
+    # Сохраняем прежний порядок: по классам, внутри класса по уверенности
+    keep = keep[np.argsort(class_ids[keep], kind="stable")]
+
+    final = [
+        {
+            "bbox": boxes_xyxy[k].tolist(),
+            "score": float(class_scores[k]),
+            "class_id": int(class_ids[k]),
+        }
+        for k in keep
+    ]
+
+    return final
+
+
+# Отступ от внутренней границы тайла (в пикселях входа модели), в пределах
+# которого детекция считается обрезанной краем тайла
+TILE_EDGE_MARGIN = 4
+
+
+def tile_windows(width, height, grid, overlap):
+    """
+    Разбивает изображение на сетку перекрывающихся окон.
+
+    Размер окна выбирается так, чтобы grid окон с заданным перекрытием
+    покрывали каждую сторону изображения целиком.
+
+    Args:
+        width (int): Ширина изображения
+        height (int): Высота изображения
+        grid (int): Количество тайлов по каждой стороне
+        overlap (float): Доля перекрытия соседних тайлов (0.0 - 0.5)
+
+    Returns:
+        list: Окна в формате (x1, y1, x2, y2)
+    """
+
+    def axis(length):
+        size = int(np.ceil(length / (grid - (grid - 1) * overlap)))
+        size = min(size, length)
+        step = (length - size) / (grid - 1) if grid > 1 else 0
+        return [
+            (int(round(i * step)), int(round(i * step)) + size)
+            for i in range(grid)
+        ]
+
+    return [
+        (x1, y1, x2, y2)
+        for y1, y2 in axis(height)
+        for x1, x2 in axis(width)
+    ]
+
+
+def _tile_detections(
+    output, window, full_size, imgsz, ratio, pad, conf_thres, iou_thres
+):
+    """
+    Переводит детекции тайла в координаты декодированного изображения.
+
+    Изображение целиком обрабатывается как тайл с окном на весь кадр.
+
+    Детекции, касающиеся внутренней границы тайла, отбрасываются:
+    объект целиком попадает в соседний тайл за счет перекрытия,
+    а крупные объекты находит проход по всему изображению.
+
+    Args:
+        output (numpy.ndarray): Выход модели для тайла
+        window (tuple): Окно тайла (x1, y1, x2, y2)
+        full_size (tuple): Размер декодированного изображения (ширина, высота)
+        imgsz (int): Размер входа модели
+        ratio (float): Коэффициент масштабирования тайла во вход модели
+        pad (tuple): Паддинг (ширина, высота) во входе модели
+        conf_thres (float): Порог уверенности
+        iou_thres (float): Порог IoU для NMS внутри тайла
+
+    Returns:
+        list: Кортежи ([x1, y1, x2, y2], score, class_id)
+    """
+    wx1, wy1, wx2, wy2 = window
+    width, height = full_size
+    margin = TILE_EDGE_MARGIN / ratio
+    result = []
+
+    for det in process_yolo_output(
+        output, img_shape=imgsz, conf_thres=conf_thres, iou_thres=iou_thres
+    ):
+        x1, y1, x2, y2 = det["bbox"]
+        x1 = (x1 - pad[0]) / ratio + wx1
+        x2 = (x2 - pad[0]) / ratio + wx1
+        y1 = (y1 - pad[1]) / ratio + wy1
+        y2 = (y2 - pad[1]) / ratio + wy1
+
+        if (
+            (wx1 > 0 and x1 <= wx1 + margin)
+            or (wy1 > 0 and y1 <= wy1 + margin)
+            or (wx2 < width and x2 >= wx2 - margin)
+            or (wy2 < height and y2 >= wy2 - margin)
+        ):
+            continue
+        result.append(([x1, y1, x2, y2], det["score"], det["class_id"]))
+
+    return result
+
+
+def resolve_tiling(tile_grid=None, tile_overlap=None):
+    """
+    Подставляет параметры тайлового инференса по умолчанию.
+
+    Args:
+        tile_grid (int): Количество тайлов по стороне или None
+        tile_overlap (float): Доля перекрытия тайлов или None
+
+    Returns:
+        tuple: (tile_grid, tile_overlap) с учетом settings.YOLO_TILE_GRID
+               и settings.YOLO_TILE_OVERLAP
+    """
+    if tile_grid is None:
+        tile_grid = settings.YOLO_TILE_GRID
+    if tile_overlap is None:
+        tile_overlap = settings.YOLO_TILE_OVERLAP
+    return max(1, int(tile_grid)), float(tile_overlap)
+
+
+def prepare_inputs(image, imgsz, tile_grid=1, tile_overlap=0.2):
+    """
+    Готовит входные тензоры модели для изображения и его тайлов.
 
-    total_before_nms = 0
-    total_after_nms = 0
+    Первое окно - изображение целиком. При tile_grid > 1 к нему добавляется
+    сетка перекрывающихся тайлов (см. tile_windows).
 
-    for c in unique_classes:
-        idxs = np.where(class_ids == c)[0]
-        b = boxes_xyxy[idxs]
-        s = class_scores[idxs]
+    Args:
+        image (numpy.ndarray): Декодированное изображение HWC, RGB, uint8
+        imgsz (int): Размер входа модели
+        tile_grid (int): Количество тайлов по каждой стороне
+        tile_overlap (float): Доля перекрытия соседних тайлов
 
-        class_count_before = len(b)
-        total_before_nms += class_count_before
+    Returns:
+        tuple: (список тензоров (1, 3, imgsz, imgsz), список преобразований
+                (окно, коэффициент масштабирования, паддинг))
+    """
+    height, width = image.shape[:2]
+    windows = [(0, 0, width, height)]
+    if tile_grid > 1:
+        windows += tile_windows(width, height, tile_grid, tile_overlap)
+
+    preprocessor = get_preprocessor(imgsz)
+    inputs, transforms = [], []
+    for window in windows:
+        x1, y1, x2, y2 = window
+        img_input, ratio, pad = preprocessor(image[y1:y2, x1:x2])
+        # Буфер препроцессора переиспользуется, поэтому при нескольких
+        # окнах входы копируются
+        inputs.append(img_input.copy() if len(windows) > 1 else img_input)
+        transforms.append((window, ratio, pad))
+    return inputs, transforms
+
+
+def infer_inputs(inputs):
+    """
+    Выполняет инференс для входов одного изображения.
 
-        keep = nms(b, s, iou_thres=iou_thres)
+    Один вход отправляется в движок микробатчинга и может попасть в общий
+    батч с изображениями других задач процесса. Тайлы одного изображения
+    выполняются батчевым вызовом run_batch.
 
-        class_count_after = len(keep)
-        total_after_nms += class_count_after
+    Args:
+        inputs (list): Тензоры формы (1, 3, imgsz, imgsz)
+
+    Returns:
+        list: Выходы модели для каждого входа
+    """
+    engine = get_inference_engine()
+    if len(inputs) == 1:
+        return [engine.infer(inputs[0])]
+    return engine.run_batch(inputs)
+
+
+def merge_detections(
+    outputs, transforms, full_size, imgsz, conf_thres, iou_thres
+):
+    """
+    Объединяет детекции изображения и его тайлов в глобальных координатах.
+
+    Детекции тайлов переводятся в координаты декодированного изображения
+    и объединяются межтайловым NMS. Стоимость тайлового инференса растет
+    линейно с количеством тайлов, тогда как увеличение imgsz дает
+    квадратичный рост.
+
+    Args:
+        outputs (list): Выходы модели для каждого окна
+        transforms (list): Преобразования окон из prepare_inputs
+        full_size (tuple): Размер декодированного изображения (ширина, высота)
+        imgsz (int): Размер входа модели
+        conf_thres (float): Порог уверенности
+        iou_thres (float): Порог IoU для NMS
 
-        for k in keep:
-            final.append(
-                {
-                    "bbox": b[k].tolist(),
-                    "score": float(s[k]),
-                    "class_id": int(c),
-                }
+    Returns:
+        list: Кортежи ([x1, y1, x2, y2], score, class_id) в координатах
+              декодированного изображения
+    """
+    # Первое окно - изображение целиком, его границы совпадают с границами
+    # изображения, поэтому фильтр обрезанных детекций его не затрагивает
+    found = []
+    for output, (window, ratio, pad) in zip(outputs, transforms):
+        found.extend(
+            _tile_detections(
+                output[0],
+                window,
+                full_size,
+                imgsz,
+                ratio,
+                pad,
+                conf_thres,
+                iou_thres,
             )
+        )
 
-    return final
+    if len(transforms) == 1 or not found:
+        return found
+
+    # Межтайловый NMS по всем детекциям в глобальных координатах
+    boxes = np.array([f[0] for f in found], dtype=np.float32)
+    scores = np.array([f[1] for f in found], dtype=np.float32)
+    class_ids = np.array([f[2] for f in found])
+    keep = batched_nms(boxes, scores, class_ids, iou_thres=iou_thres)
+    keep = keep[np.argsort(class_ids[keep], kind="stable")]
+
+    return [found[k] for k in keep]
+
+
+def build_detections(found, scale, orig_size):
+    """
+    Переводит детекции в координаты исходного изображения.
+
+    Args:
+        found (list): Кортежи ([x1, y1, x2, y2], score, class_id)
+                      в координатах декодированного изображения
+        scale (tuple): Отношение размера декодированного изображения
+                       к исходному (scale_x, scale_y)
+        orig_size (tuple): Размер исходного изображения (ширина, высота)
+
+    Returns:
+        tuple: (детекции {class_id, class, confidence, bbox}, box'ы для отрисовки
+                ([x1, y1, x2, y2], класс, уверенность))
+    """
+    scale_x, scale_y = scale
+    orig_w, orig_h = orig_size
+    detections = []
+    boxes = []
+
+    for (x1, y1, x2, y2), score, class_id in found:
+        # Масштабируем от декодированного изображения к исходному
+        x1 /= scale_x
+        x2 /= scale_x
+        y1 /= scale_y
+        y2 /= scale_y
+
+        # Обрезаем координаты до границ изображения
+        x1 = max(0, min(orig_w, int(round(x1))))
+        x2 = max(0, min(orig_w, int(round(x2))))
+        y1 = max(0, min(orig_h, int(round(y1))))
+        y2 = max(0, min(orig_h, int(round(y2))))
+
+        cls_name = (
+            YOLO_CLASSES[class_id]
+            if class_id < len(YOLO_CLASSES)
+            else str(class_id)
+        )
+        score = float(score)
+
+        detections.append(
+            {
+                "class_id": int(class_id),
+                "class": cls_name,
+                "confidence": score,
+                "bbox": [x1, y1, x2, y2],
+            }
+        )
+        boxes.append(([x1, y1, x2, y2], cls_name, score))
+
+    return detections, boxes
 
 
 def run_yolo_inference(
@@ -252,10 +677,23 @@ def run_yolo_inference(
     iou_thres=0.7,
     expected_objects=None,
     expected_confidence=None,
+    render=True,
+    tile_grid=None,
+    tile_overlap=None,
 ):
     """
     Выполняет инференс YOLO на данных изображения и возвращает результаты с аннотированным изображением.
 
+    Для инференса изображение декодируется сразу в уменьшенном разрешении
+    (масштабирование DCT при декодировании JPEG, см. settings.YOLO_DECODER).
+    Полное разрешение декодируется только если нужно аннотированное
+    изображение (render=True).
+
+    При tile_grid > 1 изображение дополнительно разрезается на сетку
+    перекрывающихся тайлов (см. prepare_inputs и merge_detections), что
+    повышает полноту для мелких инструментов на фотографиях высокого
+    разрешения.
+
     Args:
         image_data (bytes): Байтовые данные изображения
         imgsz (int): Размер изображения для модели
@@ -263,83 +701,57 @@ def run_yolo_inference(
         iou_thres (float): Порог IoU для NMS
         expected_objects (int): Ожидаемое количество объектов (для логирования)
         expected_confidence (float): Ожидаемая уверенность (переопределяет conf_thres)
+        render (bool): Рисовать ли bounding boxes на полноразмерном изображении
+        tile_grid (int): Количество тайлов по каждой стороне
+                         (по умолчанию settings.YOLO_TILE_GRID, 1 - без тайлов)
+        tile_overlap (float): Доля перекрытия соседних тайлов
+                              (по умолчанию settings.YOLO_TILE_OVERLAP)
 
     Returns:
-        tuple: (результаты детекции, байты аннотированного изображения)
+        tuple: (результаты детекции, байты аннотированного изображения
+                или None если render=False)
     """
     # Используем переданную ожидаемую уверенность если предоставлена
     if expected_confidence is not None:
         conf_thres = float(expected_confidence)
 
     start = time.time()
+    tile_grid, tile_overlap = resolve_tiling(tile_grid, tile_overlap)
 
-    # Загружаем изображение
-    image = Image.open(io.BytesIO(image_data)).convert("RGB")
-    orig_w, orig_h = image.size
-    img_np = np.array(image)
-
-    # Предобработка изображения
-    img_pad, ratio, (pad_w, pad_h) = letterbox(
-        img_np, new_shape=(imgsz, imgsz)
+    # Загружаем изображение в разрешении, близком к входу модели
+    # (для тайлов - к суммарному размеру сетки тайлов)
+    decoded = decode_for_inference(
+        image_data, imgsz * tile_grid, decoder=settings.YOLO_DECODER
     )
-    img_input = img_pad[:, :, ::-1].transpose(2, 0, 1)  # RGB->BGR->CHW
-    img_input = np.expand_dims(img_input, axis=0).astype(np.float32) / 255.0
-
-    # Выполняем инференс
-    ort_inputs = {ort_session.get_inputs()[0].name: img_input}
-    outputs = ort_session.run(None, ort_inputs)
+    height, width = decoded.array.shape[:2]
 
-    # Обрабатываем выходные данные
-    detections_raw = process_yolo_output(
-        outputs[0], img_shape=imgsz, conf_thres=conf_thres, iou_thres=iou_thres
+    # Предобработка сразу во входные буферы, инференс и объединение
+    # детекций изображения и тайлов
+    inputs, transforms = prepare_inputs(
+        decoded.array, imgsz, tile_grid, tile_overlap
+    )
+    outputs = infer_inputs(inputs)
+    found = merge_detections(
+        outputs, transforms, (width, height), imgsz, conf_thres, iou_thres
     )
 
-    # Конвертируем bounding boxes в координаты исходного изображения и рисуем их
-    detections = []
-    draw = ImageDraw.Draw(image)
-
-    try:
-        # Пробуем загрузить шрифт большого размера
-        font = ImageFont.truetype(
-            "arial.ttf", 50
-        )  # 50 пикселей - примерно в 5 раз больше
-    except:
-        try:
-            font = ImageFont.truetype("DejaVuSans.ttf", 50)
-        except:
-            # Если системные шрифты недоступны, оставляем default
-            font = ImageFont.load_default()
-
-    for det in detections_raw:
-        x1, y1, x2, y2 = det["bbox"]
-
-        # Убираем паддинг и масштабируем к исходному размеру
-        x1 = (x1 - pad_w) / ratio
-        x2 = (x2 - pad_w) / ratio
-        y1 = (y1 - pad_h) / ratio
-        y2 = (y2 - pad_h) / ratio
-
-        # Обрезаем координаты до границ изображения
-        x1 = max(0, min(orig_w, int(round(x1))))
-        x2 = max(0, min(orig_w, int(round(x2))))
-        y1 = max(0, min(orig_h, int(round(y1))))
-        y2 = max(0, min(orig_h, int(round(y2))))
+    # Конвертируем bounding boxes в координаты исходного изображения
+    detections, boxes = build_detections(
+        found, (decoded.scale_x, decoded.scale_y), decoded.orig_size
+    )
 
-        class_id = det["class_id"]
-        cls_name = (
-            YOLO_CLASSES[class_id]
-            if class_id < len(YOLO_CLASSES)
-            else str(class_id)
+    # Полное разрешение декодируем только для аннотированного изображения
+    processed_image_bytes = None
+    render_time = None
+    if render:
+        render_start = time.time()
+        processed_image_bytes = render_annotated(
+            image_data,
+            boxes,
+            encoder=settings.YOLO_RENDER_ENCODER,
+            quality=settings.YOLO_RENDER_JPEG_QUALITY,
         )
-        score = float(det["score"])
-
-        detections.append({"class": cls_name, "confidence": score})
-
-        # Рисуем bounding box и подпись
-        draw.rectangle([x1, y1, x2, y2], outline="green", width=10)
-        label = f"{cls_name} {score:.2f}"
-        text_pos = (x1, max(0, y1 - 50))
-        draw.text(text_pos, label, fill="green", font=font)
+        render_time = round(time.time() - render_start, 3)
 
     # Вычисляем время обработки
     processing_time = round(time.time() - start, 2)
@@ -347,11 +759,43 @@ def run_yolo_inference(
         "detections": detections,
         "processing_time": processing_time,
         "status": "processed" if detections else "no_detections",
+        "image_size": list(decoded.orig_size),
     }
-
-    # Сохраняем аннотированное изображение
-    buf = io.BytesIO()
-    image.save(buf, format="JPEG")
-    processed_image_bytes = buf.getvalue()
+    if render_time is not None:
+        result_dict["render_time"] = render_time
 
     return result_dict, processed_image_bytes
+
+
+def run_yolo_inference_batch(images, max_workers=None, **kwargs):
+    """
+    Выполняет инференс YOLO для набора изображений.
+
+    Изображения обрабатываются параллельно в пуле потоков: декодирование
+    и предобработка (OpenCV, PIL) отпускают GIL, а вызовы инференса
+    разных потоков объединяются движком микробатчинга в общие батчи.
+
+    Ошибка одного изображения не прерывает обработку остальных.
+
+    Args:
+        images (list): Функции без аргументов, возвращающие байты
+                       изображений (чтение файлов тоже выполняется в пуле)
+        max_workers (int): Количество потоков (по умолчанию - размер
+                           батча движка инференса)
+        **kwargs: Параметры run_yolo_inference
+
+    Returns:
+        list: Для каждого изображения кортеж (результаты детекции, байты
+              аннотированного изображения) или исключение
+    """
+    if max_workers is None:
+        max_workers = get_inference_engine().max_batch_size
+
+    def process(load_image):
+        try:
+            return run_yolo_inference(load_image(), **kwargs)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        return list(pool.map(process, images))
@@ -1,5 +1,23 @@
 from django.contrib import admin
-from .models import Instrument
+from .models import Detection, Instrument, UploadSession
+
+
+class DetectionInline(admin.TabularInline):
+    """
+    Детекции YOLO на странице записи.
+
+    Детекции записывает только задача обработки, поэтому они доступны
+    только для чтения.
+    """
+
+    model = Detection
+    fields = ('class_id', 'confidence', 'bbox')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 class InstrumentAdmin(admin.ModelAdmin):
@@ -24,6 +42,9 @@ class InstrumentAdmin(admin.ModelAdmin):
         'expected_objects',
         'expected_confidence',
         'filename',
+        'detected_count',
+        'count_matches',
+        'processing_status',
     )
 
     search_fields = (
@@ -38,26 +59,94 @@ class InstrumentAdmin(admin.ModelAdmin):
         'expected_objects',
         'expected_confidence',
         'employee',
+        'count_matches',
+        'processing_status',
     )
 
     # Поля, отображаемые в форме редактирования
     fieldsets = (
         ('Основная информация', {'fields': ('text', 'employee', 'pub_date')}),
-        ('Изображение и файл', {'fields': ('image', 'filename')}),
+        (
+            'Изображение и файл',
+            {'fields': ('image', 'annotated_image', 'filename')},
+        ),
         (
             'Параметры распознавания',
             {
-                'fields': ('expected_objects', 'expected_confidence'),
+                'fields': (
+                    'expected_objects',
+                    'expected_confidence',
+                    'detections',
+                    'image_width',
+                    'image_height',
+                    'detected_count',
+                    'count_matches',
+                    'processing_status',
+                    'processing_started_at',
+                    'processing_finished_at',
+                ),
                 'description': 'Настройки связанные с анализом изображения через YOLO',
             },
         ),
     )
 
-    readonly_fields = ('pub_date',)  # Поля только для чтения
+    # Поля только для чтения
+    readonly_fields = (
+        'pub_date',
+        'annotated_image',
+        'detections',
+        'image_width',
+        'image_height',
+        'detected_count',
+        'count_matches',
+        'processing_status',
+        'processing_started_at',
+        'processing_finished_at',
+    )
     empty_value_display = '-пусто-'
+    inlines = (DetectionInline,)
     list_per_page = 20  # Количество записей на странице
     list_max_show_all = 100  # Максимальное количество для показа всех
     show_full_result_count = True  # Показывать общее количество
 
 
 admin.site.register(Instrument, InstrumentAdmin)
+
+
+class UploadSessionAdmin(admin.ModelAdmin):
+    """
+    Административный интерфейс для модели UploadSession.
+
+    Сессии создаются и обновляются только через API загрузки,
+    поэтому все поля доступны только для чтения.
+    """
+
+    list_display = (
+        'id',
+        'filename',
+        'employee',
+        'offset',
+        'size',
+        'instrument',
+        'created_at',
+        'updated_at',
+    )
+    search_fields = ('filename', 'employee__username')
+    list_filter = ('created_at', 'employee')
+    readonly_fields = (
+        'id',
+        'employee',
+        'filename',
+        'size',
+        'sha256',
+        'offset',
+        'params',
+        'instrument',
+        'created_at',
+        'updated_at',
+        'completed_at',
+    )
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(UploadSession, UploadSessionAdmin)
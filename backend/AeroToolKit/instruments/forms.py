@@ -64,7 +64,7 @@ class InstrumentForm(forms.ModelForm):
             'expected_confidence': 'Минимальный уровень уверенности для детекции объектов (от 0.0 до 1.0, по умолчанию 0.90)',
             'filename': 'Оригинальное имя файла изображения при загрузке через API',
             'text': 'Описание инструментов с результатами анализа YOLO и мета-информацией',
-            'image': 'Изображение с bounding boxes и аннотациями детекции объектов',
+            'image': 'Исходная фотография инструментов',
         }
 
         labels = {
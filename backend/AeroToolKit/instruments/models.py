@@ -1,10 +1,64 @@
+import os
+import uuid
+
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 User = get_user_model()
 
+# Каталоги media: исходные фотографии и изображения с "вшитой" разметкой
+# хранятся раздельно, каждый файл записывается один раз
+ORIGINALS_DIR = 'instruments/originals'
+ANNOTATED_DIR = 'instruments/annotated'
+
+
+def date_path():
+    """str: Подкаталог ГГГГ/ММ, чтобы каталоги не разрастались."""
+    return timezone.now().strftime('%Y/%m')
+
+
+def original_upload_to(instance, filename):
+    """
+    Путь для исходной фотографии: originals/ГГГГ/ММ/<uuid>.<расширение>.
+
+    Args:
+        instance (Instrument): Инструмент
+        filename (str): Имя загруженного файла
+
+    Returns:
+        str: Путь относительно MEDIA_ROOT
+    """
+    ext = os.path.splitext(filename)[1].lower() or '.jpg'
+    return f'{ORIGINALS_DIR}/{date_path()}/{uuid.uuid4().hex}{ext}'
+
+
+def annotated_upload_to(instance, filename):
+    """
+    Путь для аннотированного изображения: annotated/ГГГГ/ММ/<id>_<uuid>.jpg.
+
+    Args:
+        instance (Instrument): Инструмент
+        filename (str): Имя файла (не используется)
+
+    Returns:
+        str: Путь относительно MEDIA_ROOT
+    """
+    return (
+        f'{ANNOTATED_DIR}/{date_path()}/{instance.pk}_{uuid.uuid4().hex}.jpg'
+    )
+
+
+class ProcessingStatus(models.TextChoices):
+    """Состояния фоновой YOLO обработки инструмента."""
+
+    QUEUED = 'queued', "В очереди"
+    RUNNING = 'running', "Обрабатывается"
+    DONE = 'done', "Обработано"
+    FAILED = 'failed', "Ошибка обработки"
+
 
 class Instrument(models.Model):
     """
@@ -12,6 +66,19 @@ class Instrument(models.Model):
 
     Содержит информацию о инструментах, включая текстовое описание,
     изображение и метаданные. Поддерживает анализ изображений через YOLO.
+
+    Результаты детекции хранятся в поле detections, а рамки рисуются
+    поверх исходного изображения на клиенте. Изображение с "вшитой"
+    разметкой создается только при экспорте (или в режиме
+    YOLO_RESULT_MODE = 'burn', тогда оно сохраняется в annotated_image,
+    а исходная фотография в image не изменяется).
+
+    Ход фоновой обработки отражается в поле processing_status, которое
+    клиенты опрашивают легким запросом вместо загрузки записей целиком.
+
+    Количество распознанных объектов и его совпадение с ожидаемым
+    хранятся в detected_count и count_matches, чтобы списки и выборки
+    несовпадений не разбирали текст записи.
     """
 
     text = models.TextField(
@@ -33,8 +100,18 @@ class Instrument(models.Model):
 
     image = models.ImageField(
         verbose_name="Изображение инструмента",
-        upload_to='instruments/',
-        help_text="Изображение с аннотациями детекции YOLO",
+        upload_to=original_upload_to,
+        help_text="Исходная фотография инструментов",
+    )
+
+    annotated_image = models.ImageField(
+        verbose_name="Изображение с разметкой",
+        upload_to=annotated_upload_to,
+        blank=True,
+        help_text=(
+            'Изображение с "вшитой" разметкой детекций '
+            "(только в режиме YOLO_RESULT_MODE = 'burn')"
+        ),
     )
 
     expected_objects = models.PositiveIntegerField(
@@ -62,10 +139,118 @@ class Instrument(models.Model):
         help_text="Оригинальное имя файла изображения при загрузке",
     )
 
+    detections = models.JSONField(
+        verbose_name="Результаты детекции",
+        default=list,
+        blank=True,
+        help_text=(
+            "Детекции YOLO: класс, уверенность и bounding box "
+            "[x1, y1, x2, y2] в координатах исходного изображения"
+        ),
+    )
+
+    image_width = models.PositiveIntegerField(
+        verbose_name="Ширина изображения",
+        blank=True,
+        null=True,
+        help_text="Ширина исходного изображения, для наложения разметки",
+    )
+
+    image_height = models.PositiveIntegerField(
+        verbose_name="Высота изображения",
+        blank=True,
+        null=True,
+        help_text="Высота исходного изображения, для наложения разметки",
+    )
+
+    detected_count = models.PositiveIntegerField(
+        verbose_name="Распознанное количество объектов",
+        blank=True,
+        null=True,
+        help_text="Количество объектов, обнаруженных YOLO (пусто до обработки)",
+    )
+
+    count_matches = models.BooleanField(
+        verbose_name="Количество совпадает",
+        blank=True,
+        null=True,
+        help_text=(
+            "Совпадает ли распознанное количество объектов с ожидаемым "
+            "(пусто до обработки)"
+        ),
+    )
+
+    processing_status = models.CharField(
+        verbose_name="Статус обработки",
+        max_length=16,
+        choices=ProcessingStatus.choices,
+        default=ProcessingStatus.QUEUED,
+        db_index=True,
+        help_text="Состояние фоновой YOLO обработки изображения",
+    )
+
+    processing_started_at = models.DateTimeField(
+        verbose_name="Начало обработки",
+        blank=True,
+        null=True,
+        help_text="Время начала YOLO обработки воркером",
+    )
+
+    processing_finished_at = models.DateTimeField(
+        verbose_name="Окончание обработки",
+        blank=True,
+        null=True,
+        help_text="Время завершения YOLO обработки (успешного или с ошибкой)",
+    )
+
     class Meta:
         verbose_name = "Запись"
         verbose_name_plural = "Записи"
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            # Курсорная пагинация списков: общего и сотрудника
+            models.Index(
+                fields=['-pub_date', '-id'], name='instrument_feed_idx'
+            ),
+            models.Index(
+                fields=['employee', '-pub_date', '-id'],
+                name='instrument_employee_feed_idx',
+            ),
+            # Частичный индекс для выборки несовпадений за период
+            models.Index(
+                fields=['-pub_date'],
+                condition=models.Q(count_matches=False),
+                name='instrument_mismatch_idx',
+            ),
+        ]
+
+    @property
+    def display_image(self):
+        """ImageFieldFile: Изображение для показа - с разметкой, если есть."""
+        return self.annotated_image or self.image
+
+    def update_count_matches(self):
+        """Пересчитывает count_matches по detected_count и expected_objects."""
+        if self.detected_count is None:
+            self.count_matches = None
+        else:
+            self.count_matches = self.detected_count == self.expected_objects
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет запись, пересчитывая count_matches.
+
+        Ожидаемое количество объектов можно изменить после обработки,
+        поэтому признак совпадения обновляется при каждом сохранении.
+        """
+        self.update_count_matches()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {
+            'detected_count',
+            'expected_objects',
+        } & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'count_matches'}
+        super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         """
@@ -75,3 +260,189 @@ class Instrument(models.Model):
             str: Первые SLICE_LETTERS символов текста записи
         """
         return self.text[: settings.SLICE_LETTERS]
+
+
+class Detection(models.Model):
+    """
+    Объект, обнаруженный YOLO на фотографии инструмента.
+
+    Хранится в обоих режимах YOLO_RESULT_MODE (в режиме burn поле
+    Instrument.detections не заполняется), поэтому по детекциям можно
+    строить выборки по классу и уверенности. При повторной обработке
+    детекции инструмента заменяются целиком.
+    """
+
+    # Отдельный индекс по instrument не нужен: его покрывает составной
+    # индекс (instrument, class_id)
+    instrument = models.ForeignKey(
+        Instrument,
+        on_delete=models.CASCADE,
+        related_name='boxes',
+        db_index=False,
+        verbose_name="Запись",
+        help_text="Запись, на фотографии которой обнаружен объект",
+    )
+
+    class_id = models.PositiveSmallIntegerField(
+        verbose_name="Класс",
+        help_text="Индекс класса в YOLO_CLASSES",
+    )
+
+    confidence = models.FloatField(
+        verbose_name="Уверенность",
+        help_text="Уверенность детекции (от 0 до 1)",
+    )
+
+    bbox = models.JSONField(
+        verbose_name="Bounding box",
+        help_text="[x1, y1, x2, y2] в координатах исходного изображения",
+    )
+
+    class Meta:
+        verbose_name = "Детекция"
+        verbose_name_plural = "Детекции"
+        indexes = [
+            models.Index(
+                fields=['instrument', 'class_id'],
+                name='detection_instrument_class_idx',
+            ),
+        ]
+
+    @classmethod
+    def from_result(cls, instrument, detection):
+        """
+        Создает (без сохранения) детекцию по результату YOLO.
+
+        Args:
+            instrument (Instrument): Обработанный инструмент
+            detection (dict): Детекция {class_id, class, confidence, bbox}.
+                              В результатах, сохраненных до появления
+                              class_id, индекс определяется по имени класса
+
+        Returns:
+            Detection: Несохраненная детекция
+        """
+        class_id = detection.get('class_id')
+        if class_id is None:
+            name = detection['class']
+            if name in settings.YOLO_CLASSES:
+                class_id = settings.YOLO_CLASSES.index(name)
+            else:
+                class_id = int(name)
+        return cls(
+            instrument=instrument,
+            class_id=class_id,
+            confidence=detection['confidence'],
+            bbox=detection['bbox'],
+        )
+
+    @classmethod
+    def replace(cls, instrument_ids, detections):
+        """
+        Заменяет детекции инструментов новыми.
+
+        Прежние детекции удаляются одним запросом, новые записываются
+        через bulk_create. Вызывается в одной транзакции с сохранением
+        инструментов.
+
+        Args:
+            instrument_ids (list): ID обработанных инструментов
+            detections (list): Новые несохраненные детекции
+        """
+        cls.objects.filter(instrument_id__in=instrument_ids).delete()
+        cls.objects.bulk_create(detections, batch_size=1000)
+
+    def __str__(self) -> str:
+        """str: Класс и уверенность детекции."""
+        return f'{self.class_id} ({self.confidence:.2f})'
+
+
+class UploadSession(models.Model):
+    """
+    Сессия возобновляемой загрузки фотографии по частям.
+
+    Клиент объявляет размер и SHA-256 файла, затем передает части по
+    смещениям. Принятые байты пишутся в файл path, а подтвержденное
+    смещение хранится в offset: после обрыва связи загрузка
+    продолжается с него, а не с начала. При завершении собранный файл
+    сверяется с контрольной суммой и передается в обычный путь создания
+    инструмента; параметры создания хранятся в params.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    employee = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name="Сотрудник",
+        help_text="Сотрудник, начавший загрузку",
+    )
+
+    filename = models.CharField(
+        verbose_name="Имя файла",
+        max_length=255,
+        help_text="Исходное имя загружаемого файла",
+    )
+
+    size = models.PositiveBigIntegerField(
+        verbose_name="Размер файла",
+        help_text="Объявленный размер файла, байты",
+    )
+
+    sha256 = models.CharField(
+        verbose_name="SHA-256",
+        max_length=64,
+        help_text="Объявленная контрольная сумма файла (hex)",
+    )
+
+    offset = models.PositiveBigIntegerField(
+        verbose_name="Принято байт",
+        default=0,
+        help_text="Подтвержденное смещение: столько байт файла уже принято",
+    )
+
+    params = models.JSONField(
+        verbose_name="Параметры создания",
+        default=dict,
+        blank=True,
+        help_text="Поля InstrumentCreateSerializer для создания инструмента",
+    )
+
+    instrument = models.ForeignKey(
+        Instrument,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        blank=True,
+        null=True,
+        verbose_name="Инструмент",
+        help_text="Инструмент, созданный из загруженного файла",
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name="Начало загрузки"
+    )
+
+    updated_at = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name="Последняя часть"
+    )
+
+    completed_at = models.DateTimeField(
+        verbose_name="Завершение",
+        blank=True,
+        null=True,
+        help_text="Время запроса завершения загрузки",
+    )
+
+    class Meta:
+        verbose_name = "Загрузка"
+        verbose_name_plural = "Загрузки"
+        ordering = ('-created_at',)
+
+    @property
+    def path(self):
+        """str: Путь к файлу, в который собираются части."""
+        return os.path.join(settings.UPLOAD_SESSION_DIR, f'{self.pk}.part')
+
+    def __str__(self) -> str:
+        return f'{self.filename} ({self.offset}/{self.size})'
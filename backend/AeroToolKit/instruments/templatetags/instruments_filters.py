@@ -1,38 +1,21 @@
-import re
 from django import template
 
 register = template.Library()
 
 
-@register.filter(name='extract_detected_count_filter')
-def extract_detected_count(text):
+@register.filter(name='subtract')
+def subtract(value, arg):
     """
-    Извлекает количество распознанных объектов из текста YOLO анализа.
+    Вычитает arg из value.
 
-    Ищет в тексте паттерн "YOLO анализ: обнаружено X объектов"
-    и возвращает количество X.
+    Используется для расчета ширины и высоты рамки детекции
+    по координатам [x1, y1, x2, y2].
 
     Args:
-        text (str): Текст записи с результатами YOLO анализа
+        value (int): Уменьшаемое
+        arg (int): Вычитаемое
 
     Returns:
-        int: Количество распознанных объектов или 0 если не найдено
+        int: Разность value - arg
     """
-    if not text:
-        return 0
-
-    # Ищем паттерн "обнаружено X объектов"
-    pattern = r'обнаружено\s+(\d+)\s+объект'
-    match = re.search(pattern, text)
-
-    if match:
-        return int(match.group(1))
-
-    # Альтернативный поиск если первый не сработал
-    pattern_alt = r'YOLO анализ: обнаружено (\d+) объектов'
-    match_alt = re.search(pattern_alt, text)
-
-    if match_alt:
-        return int(match_alt.group(1))
-
-    return 0
+    return value - arg
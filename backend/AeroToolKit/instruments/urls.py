@@ -21,6 +21,12 @@ urlpatterns = [
         views.instrument_detail,
         name='instrument_detail',
     ),
+    # Экспорт изображения с нарисованной разметкой детекции
+    path(
+        'instruments/<int:instrument_id>/export/',
+        views.instrument_export,
+        name='instrument_export',
+    ),
     # Страница создания нового инструмента
     path('create/', views.instrument_create, name='instrument_create'),
     # Страница редактирования существующего инструмента
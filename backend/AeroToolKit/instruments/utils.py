@@ -1,21 +1,102 @@
+import base64
+import binascii
+from datetime import datetime
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.db.models import Q
+
+
+class CursorPage:
+    """
+    Страница списка инструментов с курсорной пагинацией.
+
+    Содержит записи страницы и курсоры соседних страниц. Курсор -
+    (pub_date, id) крайней записи страницы, закодированные в строку для
+    параметров after / before.
+
+    Attributes:
+        object_list (list): Инструменты страницы
+        cursor (str): Курсор, по которому открыта страница (или '')
+        has_next (bool): Есть ли следующая (более старая) страница
+        has_previous (bool): Есть ли предыдущая (более новая) страница
+    """
+
+    def __init__(self, object_list, cursor, has_next, has_previous):
+        self.object_list = object_list
+        self.cursor = cursor
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        """bool: Нужна ли навигация по страницам."""
+        return self.has_next or self.has_previous
+
+    @property
+    def next_cursor(self):
+        """str: Курсор следующей страницы (после последней записи)."""
+        return encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        """str: Курсор предыдущей страницы (перед первой записью)."""
+        return encode_cursor(self.object_list[0])
+
+
+def encode_cursor(instrument):
+    """
+    Кодирует позицию инструмента в списке в строку курсора.
+
+    Args:
+        instrument (Instrument): Крайняя запись страницы
+
+    Returns:
+        str: Курсор для параметра after / before
+    """
+    position = f'{instrument.pub_date.isoformat()}|{instrument.pk}'
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Декодирует строку курсора.
+
+    Args:
+        cursor (str): Курсор из параметра after / before
+
+    Returns:
+        tuple: (pub_date, id) или None, если курсор неверный
+    """
+    try:
+        position = base64.urlsafe_b64decode(cursor.encode()).decode()
+        pub_date, pk = position.split('|')
+        return datetime.fromisoformat(pub_date), int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
 
 
 def make_page(request, instruments):
     """
-    Создает пагинированную страницу для списка инструментов.
+    Создает страницу списка инструментов по курсору.
 
-    Функция-утилита для обработки пагинации queryset инструментов.
-    Использует настройки из settings.NUMBER_OF_INSTRUMENTS для определения
-    количества элементов на странице.
+    Записи упорядочены по (-pub_date, -id). Страница выбирается
+    условием относительно позиции курсора, а не OFFSET, и без
+    COUNT(*): время ответа не зависит от глубины страницы и размера
+    таблицы, запрос обслуживается составными индексами Instrument.
+    Размер страницы - settings.NUMBER_OF_INSTRUMENTS.
 
     Args:
-        request: HTTP запрос от пользователя, содержащий параметр 'page' для пагинации
+        request: HTTP запрос от пользователя. Параметр 'after' открывает
+                 страницу после курсора, 'before' - перед ним
         instruments (QuerySet): Набор данных инструментов для пагинации
 
     Returns:
-        Page: Объект страницы пагинатора с инструментами для текущей страницы
+        CursorPage: Страница с инструментами и курсорами соседних страниц
 
     Example:
         >>> page_obj = make_page(request, Instrument.objects.all())
@@ -23,10 +104,42 @@ def make_page(request, instruments):
         ...     print(instrument.text)
 
     Notes:
-        - Если параметр 'page' не указан в запросе, возвращается первая страница
-        - Если указан невалидный номер страницы, возвращается первая страница
-        - Если указана страница за пределами диапазона, возвращается последняя страница
+        - Без курсора возвращается первая (самая новая) страница
+        - При неверном курсоре или пустой странице по курсору
+          возвращается первая страница
     """
-    paginator = Paginator(instruments, settings.NUMBER_OF_INSTRUMENTS)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    size = settings.NUMBER_OF_INSTRUMENTS
+    after = decode_cursor(request.GET.get('after', ''))
+    before = decode_cursor(request.GET.get('before', ''))
+
+    if after:
+        pub_date, pk = after
+        objects = list(
+            instruments.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            ).order_by('-pub_date', '-id')[: size + 1]
+        )
+        if objects:
+            return CursorPage(
+                objects[:size],
+                'a' + request.GET['after'],
+                len(objects) > size,
+                True,
+            )
+    elif before:
+        pub_date, pk = before
+        objects = list(
+            instruments.filter(
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+            ).order_by('pub_date', 'id')[: size + 1]
+        )
+        if objects:
+            return CursorPage(
+                objects[:size][::-1],
+                'b' + request.GET['before'],
+                True,
+                len(objects) > size,
+            )
+
+    objects = list(instruments.order_by('-pub_date', '-id')[: size + 1])
+    return CursorPage(objects[:size], '', len(objects) > size, False)
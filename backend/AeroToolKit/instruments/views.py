@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, render, redirect
 from .models import Instrument, User
 from .forms import InstrumentForm
@@ -138,7 +140,7 @@ def instrument_detail(request, instrument_id):
 
     Отображает полную информацию об инструменте включая:
     - Текст описания с результатами YOLO анализа
-    - Изображение с аннотациями
+    - Исходное изображение с разметкой детекций (SVG поверх изображения)
     - Мета-информацию (автор, дата создания, ожидаемое количество объектов)
 
     Args:
@@ -166,6 +168,44 @@ def instrument_detail(request, instrument_id):
     )
 
 
+def instrument_export(request, instrument_id):
+    """
+    Экспорт изображения инструмента с нарисованными рамками детекции.
+
+    Разметка хранится как данные и на детальной странице рисуется поверх
+    исходного изображения. JPEG с "вшитой" разметкой создается только
+    по этому явному запросу.
+
+    Args:
+        request: HTTP запрос от пользователя
+        instrument_id (int): ID инструмента для экспорта
+
+    Returns:
+        HttpResponse: JPEG изображение для скачивания
+
+    Raises:
+        Http404: Если инструмент не существует или еще не обработан
+    """
+    from api.renderer import render_instrument
+
+    instrument = get_object_or_404(Instrument, pk=instrument_id)
+    if instrument.image_width is None:
+        raise Http404('Результаты детекции для инструмента отсутствуют')
+
+    response = HttpResponse(
+        render_instrument(
+            instrument,
+            encoder=settings.YOLO_RENDER_ENCODER,
+            quality=settings.YOLO_RENDER_JPEG_QUALITY,
+        ),
+        content_type='image/jpeg',
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="instrument_{instrument.id}_annotated.jpg"'
+    )
+    return response
+
+
 @login_required
 def instrument_delete(request, instrument_id):
     """
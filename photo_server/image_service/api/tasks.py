@@ -1,26 +1,140 @@
+import hashlib
 import os
+import random
 import requests
 from celery import shared_task
+from celery.exceptions import Retry
 from django.utils import timezone
 from django.conf import settings
 import time
 
+from .transform import prepare_for_upload, release_original
 
-@shared_task
-def send_single_image(temp_file_path, token, user_data):
+
+def retry_delay(response):
+    """
+    Вычисляет задержку повтора по ответу 429 бэкенда.
+
+    Берется заголовок Retry-After (секунды) с небольшим случайным
+    разбросом, чтобы отложенные задачи не вернулись одновременно.
+
+    Args:
+        response (requests.Response): Ответ API со статусом 429
+
+    Returns:
+        float: Задержка в секундах
+    """
+    try:
+        delay = max(1, int(response.headers.get('Retry-After', '')))
+    except ValueError:
+        delay = settings.AEROTOOLKIT_DEFAULT_RETRY_AFTER
+    return delay + random.uniform(0, delay * 0.1)
+
+
+def file_sha256(path):
+    """
+    Вычисляет SHA-256 файла, читая его по частям.
+
+    Args:
+        path (str): Путь к файлу
+
+    Returns:
+        str: Контрольная сумма (hex)
+    """
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for data in iter(
+            lambda: f.read(settings.AEROTOOLKIT_UPLOAD_CHUNK_SIZE), b''
+        ):
+            sha256.update(data)
+    return sha256.hexdigest()
+
+
+def upload_offset(upload_url, headers):
+    """
+    Запрашивает у бэкенда подтвержденное смещение загрузки.
+
+    Args:
+        upload_url (str): URL сессии загрузки (.../uploads/<id>/)
+        headers (dict): Заголовки с токеном
+
+    Returns:
+        int: Сколько байт уже принято или None, если сессии нет
+             (истекла или удалена)
+    """
+    response = requests.get(upload_url, headers=headers, timeout=30)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()['offset']
+
+
+def send_chunks(temp_file_path, upload_url, offset, headers):
+    """
+    Передает файл частями, начиная с подтвержденного смещения.
+
+    На ответ 409 (смещение разошлось, например часть уже была принята
+    до обрыва связи) отправка продолжается со смещения из ответа.
+
+    Args:
+        temp_file_path (str): Путь к файлу
+        upload_url (str): URL сессии загрузки
+        offset (int): Подтвержденное смещение
+        headers (dict): Заголовки с токеном
+
+    Returns:
+        int: Итоговое подтвержденное смещение
+
+    Raises:
+        requests.exceptions.RequestException: При обрыве связи или
+            неожиданном ответе бэкенда
+    """
+    size = os.path.getsize(temp_file_path)
+    chunk_headers = {**headers, 'Content-Type': 'application/octet-stream'}
+    with open(temp_file_path, 'rb') as f:
+        while offset < size:
+            f.seek(offset)
+            chunk = f.read(settings.AEROTOOLKIT_UPLOAD_CHUNK_SIZE)
+            response = requests.put(
+                f'{upload_url}chunk/',
+                params={'offset': offset},
+                data=chunk,
+                headers=chunk_headers,
+                timeout=60,
+            )
+            if response.status_code == 409:
+                offset = response.json()['offset']
+                continue
+            response.raise_for_status()
+            offset = response.json()['offset']
+    return offset
+
+
+@shared_task(bind=True, max_retries=None)
+def send_single_image(self, temp_file_path, token, user_data, upload_id=None):
     """
     Фоновая Celery задача для отправки одного изображения в основной бэкенд.
 
-    Выполняет асинхронную отправку изображения в AeroToolKit API с полной
-    информацией о сотруднике и параметрах обработки. Задача включает
-    детальное логирование и обработку ошибок.
+    Изображение передается через API возобновляемой загрузки AeroToolKit:
+    сессия загрузки, части файла по AEROTOOLKIT_UPLOAD_CHUNK_SIZE байт и
+    завершение, после которого бэкенд проверяет SHA-256 и создает
+    инструмент. При обрыве связи задача повторяется через
+    AEROTOOLKIT_RESUME_DELAY секунд с тем же upload_id и продолжает
+    отправку с последнего подтвержденного бэкендом смещения, а не с
+    начала файла.
 
     Process Flow:
-    1. Чтение временного файла изображения с диска
-    2. Подготовка метаданных и текстового описания
-    3. Отправка POST запроса в основной бэкенд
-    4. Очистка временных файлов
-    5. Детальное логирование времени выполнения
+    1. Подготовка уменьшенной копии (при PRESEND_TRANSFORM)
+    2. Создание сессии загрузки (или запрос смещения при повторе)
+    3. Отправка оставшихся частей файла
+    4. Завершение загрузки и создание инструмента
+    5. Очистка временных файлов (исходный файл архивируется при
+       PRESEND_KEEP_ORIGINALS)
+    6. Детальное логирование времени выполнения
+
+    Если бэкенд перегружен (ответ 429), задача откладывается на время
+    из заголовка Retry-After, временный файл сохраняется до повтора.
+    Количество повторов ограничено AEROTOOLKIT_MAX_RETRIES.
 
     Args:
         temp_file_path (str): Путь к временному файлу изображения на диске
@@ -29,6 +143,8 @@ def send_single_image(temp_file_path, token, user_data):
             - name (str): Имя сотрудника
             - expected_objects (int): Ожидаемое количество объектов
             - expected_confidence (float): Порог уверенности распознавания
+            - priority (str): Класс приоритета обработки (опционально)
+        upload_id (str): ID сессии загрузки (передается при повторе)
 
     Returns:
         dict: Результат выполнения задачи:
@@ -65,51 +181,73 @@ def send_single_image(temp_file_path, token, user_data):
     )
     print(f"[{time.time()}] [Celery]   user_data: {user_data}", flush=True)
 
-    try:
-        # Читаем сохраненный файл
-        read_start = time.time()
-        print(f"[{time.time()}] [Celery] Читаем файл {filename}", flush=True)
-        with open(temp_file_path, 'rb') as f:
-            image_data = f.read()
-        read_time = time.time() - read_start
-        print(
-            f"[{time.time()}] [Celery] Файл прочитан за {read_time:.3f}сек, размер: {len(image_data)} bytes",
-            flush=True,
-        )
+    headers = {'Authorization': f'Token {token}'}
 
-        # Подготавливаем данные для отправки
-        text = (
-            f"Фотография автоматически загружена через систему фотофиксации.\n"
-            f"Сотрудник: {user_data.get('name', 'Unknown')}\n"
-            f"Время отправки: {timezone.now().strftime('%d.%m.%Y %H:%M:%S')}\n"
-            f"Файл: {filename}\n"
-            f"Ожидаемое количество: {user_data.get('expected_objects', 11)}\n"
-            f"Уверенность: {user_data.get('expected_confidence', 0.9)}"
-        )
+    try:
+        # Уменьшенная копия (PRESEND_TRANSFORM) создается один раз и
+        # переиспользуется при повторах задачи
+        send_path = prepare_for_upload(temp_file_path)
+        send_name = filename
+        if send_path != temp_file_path:
+            send_name = os.path.splitext(filename)[0] + '.jpg'
 
-        files = {'image': (filename, image_data, 'image/jpeg')}
-        data = {
-            'text': text,
-            'expected_objects': user_data.get('expected_objects', 11),
-            'expected_confidence': user_data.get('expected_confidence', 0.9),
-            'filename': filename,
-        }
+        # При повторе продолжаем существующую сессию загрузки
+        offset = None
+        if upload_id:
+            upload_url = f'{settings.AEROTOOLKIT_UPLOADS_API_URL}{upload_id}/'
+            offset = upload_offset(upload_url, headers)
+            print(
+                f"[{time.time()}] [Celery] Продолжаем загрузку {filename} с {offset} байт",
+                flush=True,
+            )
 
-        headers = {'Authorization': f'Token {token}'}
+        if offset is None:
+            # Подготавливаем данные для отправки
+            text = (
+                f"Фотография автоматически загружена через систему фотофиксации.\n"
+                f"Сотрудник: {user_data.get('name', 'Unknown')}\n"
+                f"Время отправки: {timezone.now().strftime('%d.%m.%Y %H:%M:%S')}\n"
+                f"Файл: {filename}\n"
+                f"Ожидаемое количество: {user_data.get('expected_objects', 11)}\n"
+                f"Уверенность: {user_data.get('expected_confidence', 0.9)}"
+            )
+            data = {
+                'filename': send_name,
+                'size': os.path.getsize(send_path),
+                'sha256': file_sha256(send_path),
+                'text': text,
+                'expected_objects': user_data.get('expected_objects', 11),
+                'expected_confidence': user_data.get(
+                    'expected_confidence', 0.9
+                ),
+            }
+            if user_data.get('priority'):
+                data['priority'] = user_data['priority']
 
-        print(
-            f"[{time.time()}] [Celery] Отправляем запрос к {settings.AEROTOOLKIT_API_URL}",
-            flush=True,
-        )
+            print(
+                f"[{time.time()}] [Celery] Создаем загрузку в {settings.AEROTOOLKIT_UPLOADS_API_URL}",
+                flush=True,
+            )
+            response = requests.post(
+                settings.AEROTOOLKIT_UPLOADS_API_URL,
+                json=data,
+                headers=headers,
+                timeout=30,
+            )
+            if response.status_code != 201:
+                raise ValueError(
+                    f'Загрузка не создана: {response.status_code} '
+                    f'{response.text[:200]}'
+                )
+            upload_id = response.json()['id']
+            upload_url = f'{settings.AEROTOOLKIT_UPLOADS_API_URL}{upload_id}/'
+            offset = 0
 
-        # Отправка на API
+        # Отправка частей файла
         send_start = time.time()
+        send_chunks(send_path, upload_url, offset, headers)
         response = requests.post(
-            settings.AEROTOOLKIT_API_URL,
-            files=files,
-            data=data,
-            headers=headers,
-            timeout=60,
+            f'{upload_url}complete/', headers=headers, timeout=60
         )
         send_time = time.time() - send_start
 
@@ -118,10 +256,37 @@ def send_single_image(temp_file_path, token, user_data):
             flush=True,
         )
 
-        # Очищаем временный файл
+        # Бэкенд перегружен: повторяем позже, файл не удаляем
+        if (
+            response.status_code == 429
+            and self.request.retries < settings.AEROTOOLKIT_MAX_RETRIES
+        ):
+            countdown = retry_delay(response)
+            print(
+                f"[{time.time()}] [Celery] Бэкенд перегружен, повтор {filename} через {countdown:.0f}сек",
+                flush=True,
+            )
+            raise self.retry(
+                countdown=countdown, kwargs={'upload_id': upload_id}
+            )
+
+        # Собранный файл не совпал с контрольной суммой: бэкенд сбросил
+        # загрузку, и повтор отправит файл заново
+        if (
+            response.status_code == 400
+            and response.json().get('offset') == 0
+            and self.request.retries < settings.AEROTOOLKIT_MAX_RETRIES
+        ):
+            raise self.retry(
+                countdown=settings.AEROTOOLKIT_RESUME_DELAY,
+                kwargs={'upload_id': upload_id},
+            )
+
+        # Очищаем временный файл (исходный сохраняется в архиве при
+        # PRESEND_KEEP_ORIGINALS)
         cleanup_start = time.time()
         try:
-            os.remove(temp_file_path)
+            release_original(temp_file_path)
             print(
                 f"[{time.time()}] [Celery] Временный файл удален за {time.time()-cleanup_start:.3f}сек",
                 flush=True,
@@ -146,25 +311,166 @@ def send_single_image(temp_file_path, token, user_data):
             'status_code': response.status_code,
         }
 
+    except Retry:
+        raise
+
+    except (requests.ConnectionError, requests.Timeout) as e:
+        # Обрыв связи: повторяем, продолжая с подтвержденного смещения
+        if self.request.retries < settings.AEROTOOLKIT_MAX_RETRIES:
+            print(
+                f"[{time.time()}] [Celery] Обрыв связи при отправке {filename}: {e}, повтор через {settings.AEROTOOLKIT_RESUME_DELAY}сек",
+                flush=True,
+            )
+            raise self.retry(
+                countdown=settings.AEROTOOLKIT_RESUME_DELAY,
+                kwargs={'upload_id': upload_id},
+            )
+        error = e
+
     except Exception as e:
-        error_time = time.time() - task_start
+        error = e
+
+    error_time = time.time() - task_start
+    print(
+        f"[{time.time()}] [Celery]  ОШИБКА в send_single_image: {error}, время: {error_time:.3f}сек",
+        flush=True,
+    )
+
+    # Очищаем временный файл в случае ошибки
+    try:
+        release_original(temp_file_path)
         print(
-            f"[{time.time()}] [Celery]  ОШИБКА в send_single_image: {e}, время: {error_time:.3f}сек",
+            f"[{time.time()}] [Celery] Временный файл удален после ошибки",
             flush=True,
         )
+    except OSError:
+        pass
+
+    return {
+        'status': 'failed',
+        'filename': filename,
+        'error': str(error),
+    }
 
-        # Очищаем временный файл в случае ошибки
+
+@shared_task(bind=True, max_retries=None)
+def send_image_batch(self, temp_file_paths, token, user_data):
+    """
+    Фоновая Celery задача для пакетной отправки изображений в основной бэкенд.
+
+    Отправляет все изображения одним multipart запросом на endpoint
+    массовой загрузки AeroToolKit (bulk), где записи создаются одной
+    транзакцией, а обработка ставится в очередь одной группой задач YOLO
+    с батчевым инференсом, вместо N запросов send_single_image.
+    Ответ 429 обрабатывается так же, как в send_single_image.
+
+    Args:
+        temp_file_paths (list): Пути к временным файлам изображений на диске
+        token (str): Аутентификационный токен для доступа к API бэкенда
+        user_data (dict): Данные пользователя и параметры обработки
+                          (как в send_single_image)
+
+    Returns:
+        dict: Результат выполнения задачи:
+            - status (str): 'success' при успешной отправке, 'failed' при ошибке
+            - filenames (list): Имена отправленных файлов
+            - status_code (int): HTTP статус код ответа от API (только при success)
+            - error (str): Сообщение об ошибке (только при failed)
+
+    Example:
+        >>> result = send_image_batch.delay(
+        ...     temp_file_paths=['/app/media/temp_uploads/a.jpg',
+        ...                      '/app/media/temp_uploads/b.jpg'],
+        ...     token='9944b09199c6**********6dd0e4bbdfc6ee4b',
+        ...     user_data={'name': 'Иван Петров', 'expected_objects': 11,
+        ...                'expected_confidence': 0.8}
+        ... )
+    """
+    task_start = time.time()
+    filenames = [os.path.basename(path) for path in temp_file_paths]
+    print(
+        f"[{time.time()}] [Celery]  send_image_batch ЗАПУЩЕН: {len(filenames)} файлов",
+        flush=True,
+    )
+
+    try:
+        files = []
+        for path, filename in zip(temp_file_paths, filenames):
+            send_path = prepare_for_upload(path)
+            if send_path != path:
+                filename = os.path.splitext(filename)[0] + '.jpg'
+            with open(send_path, 'rb') as f:
+                files.append(('images', (filename, f.read(), 'image/jpeg')))
+
+        text = (
+            f"Фотография автоматически загружена через систему фотофиксации.\n"
+            f"Сотрудник: {user_data.get('name', 'Unknown')}\n"
+            f"Время отправки: {timezone.now().strftime('%d.%m.%Y %H:%M:%S')}\n"
+            f"Пакет: {len(filenames)} файлов\n"
+            f"Ожидаемое количество: {user_data.get('expected_objects', 11)}\n"
+            f"Уверенность: {user_data.get('expected_confidence', 0.9)}"
+        )
+        data = {
+            'text': text,
+            'expected_objects': user_data.get('expected_objects', 11),
+            'expected_confidence': user_data.get('expected_confidence', 0.9),
+        }
+        if user_data.get('priority'):
+            data['priority'] = user_data['priority']
+        headers = {'Authorization': f'Token {token}'}
+
+        send_start = time.time()
+        response = requests.post(
+            settings.AEROTOOLKIT_BATCH_API_URL,
+            files=files,
+            data=data,
+            headers=headers,
+            timeout=60 + 10 * len(files),
+        )
+        print(
+            f"[{time.time()}] [Celery] Ответ на пакет получен за {time.time() - send_start:.3f}сек, статус: {response.status_code}",
+            flush=True,
+        )
+        if (
+            response.status_code == 429
+            and self.request.retries < settings.AEROTOOLKIT_MAX_RETRIES
+        ):
+            countdown = retry_delay(response)
+            print(
+                f"[{time.time()}] [Celery] Бэкенд перегружен, повтор пакета через {countdown:.0f}сек",
+                flush=True,
+            )
+            raise self.retry(countdown=countdown)
+        result = {
+            'status': (
+                'success' if response.status_code in [200, 201] else 'failed'
+            ),
+            'filenames': filenames,
+            'status_code': response.status_code,
+        }
+
+    except Retry:
+        raise
+
+    except Exception as e:
+        print(
+            f"[{time.time()}] [Celery]  ОШИБКА в send_image_batch: {e}, время: {time.time() - task_start:.3f}сек",
+            flush=True,
+        )
+        result = {'status': 'failed', 'filenames': filenames, 'error': str(e)}
+
+    # Очищаем временные файлы
+    for path in temp_file_paths:
         try:
-            os.remove(temp_file_path)
+            release_original(path)
+        except OSError as e:
             print(
-                f"[{time.time()}] [Celery] Временный файл удален после ошибки",
+                f"[{time.time()}] [Celery] Ошибка удаления файла: {e}",
                 flush=True,
             )
-        except OSError:
-            pass
 
-        return {
-            'status': 'failed',
-            'filename': filename,
-            'error': str(e),
-        }
+    print(
+        f"[{time.time()}] [Celery]  Пакет ОТПРАВЛЕН: {len(filenames)} файлов, общее время: {time.time() - task_start:.3f}сек",
+        flush=True,
+    )
+    return result
@@ -0,0 +1,128 @@
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+# Суффикс подготовленной к отправке копии временного файла
+PREPARED_SUFFIX = '.send.jpg'
+
+# Метаданные исходного файла, которые не попадают в подготовленную копию
+STRIPPED_METADATA = ('exif', 'xmp', 'icc_profile', 'photoshop', 'comment')
+
+# Тег EXIF orientation
+ORIENTATION_TAG = 0x0112
+
+
+def prepare_for_upload(temp_file_path):
+    """
+    Готовит фотографию к отправке в бэкенд.
+
+    При PRESEND_TRANSFORM фотография поворачивается по EXIF orientation,
+    уменьшается так, чтобы длинная сторона не превышала
+    PRESEND_MAX_EDGE, и перекодируется в JPEG с качеством
+    PRESEND_JPEG_QUALITY без метаданных. JPEG декодируется сразу в
+    уменьшенном масштабе (Image.draft), поэтому полное разрешение камеры
+    в память не разворачивается.
+
+    Копия пишется рядом с исходным файлом и переиспользуется при повторе
+    задачи, чтобы возобновляемая загрузка продолжала отправку тех же
+    байт. Исходный файл отправляется вместо копии, только если она не
+    меньше его и подготовка ничего не изменила: фотография не повернута,
+    не уменьшена и не содержала метаданных.
+
+    Args:
+        temp_file_path (str): Путь к временному файлу фотографии
+
+    Returns:
+        str: Путь к файлу для отправки (исходный или подготовленный)
+    """
+    if not settings.PRESEND_TRANSFORM:
+        return temp_file_path
+
+    prepared_path = temp_file_path + PREPARED_SUFFIX
+    if os.path.exists(prepared_path):
+        return prepared_path
+
+    start = time.time()
+    max_edge = settings.PRESEND_MAX_EDGE
+    try:
+        with Image.open(temp_file_path) as image:
+            has_metadata = any(key in image.info for key in STRIPPED_METADATA)
+            rotated = image.getexif().get(ORIENTATION_TAG, 1) != 1
+            original_size = image.size
+            image.draft('RGB', (max_edge, max_edge))
+            prepared = ImageOps.exif_transpose(image)
+            prepared.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            resized = max(prepared.size) < max(original_size)
+            if prepared.mode not in ('RGB', 'L'):
+                prepared = prepared.convert('RGB')
+            # Запись во временное имя: прерванная запись не будет
+            # принята за готовую копию при повторе
+            partial_path = prepared_path + '.tmp'
+            prepared.save(
+                partial_path,
+                'JPEG',
+                quality=settings.PRESEND_JPEG_QUALITY,
+                optimize=True,
+            )
+            size = prepared.size
+    except (OSError, ValueError) as e:
+        try:
+            os.remove(prepared_path + '.tmp')
+        except FileNotFoundError:
+            pass
+        print(
+            f"[{time.time()}] [Celery] Не удалось подготовить {temp_file_path}: {e}, отправляем исходный файл",
+            flush=True,
+        )
+        return temp_file_path
+
+    original_bytes = os.path.getsize(temp_file_path)
+    prepared_bytes = os.path.getsize(partial_path)
+    altered = has_metadata or rotated or resized
+    if prepared_bytes >= original_bytes and not altered:
+        os.remove(partial_path)
+        return temp_file_path
+    os.replace(partial_path, prepared_path)
+
+    print(
+        f"[{time.time()}] [Celery] Фото подготовлено за {time.time() - start:.3f}сек: {size[0]}x{size[1]}, {original_bytes} -> {prepared_bytes} bytes",
+        flush=True,
+    )
+    return prepared_path
+
+
+def release_original(temp_file_path):
+    """
+    Убирает временные файлы фотографии после отправки.
+
+    Подготовленная копия удаляется. Исходный файл при
+    PRESEND_TRANSFORM и PRESEND_KEEP_ORIGINALS переносится в
+    ORIGINALS_ARCHIVE_DIR/ГГГГ/ММ/ для аудита (в бэкенд ушла только
+    уменьшенная копия), иначе удаляется.
+
+    Args:
+        temp_file_path (str): Путь к временному файлу фотографии
+
+    Raises:
+        OSError: При ошибке удаления или переноса исходного файла
+    """
+    try:
+        os.remove(temp_file_path + PREPARED_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+    if settings.PRESEND_TRANSFORM and settings.PRESEND_KEEP_ORIGINALS:
+        archive_dir = os.path.join(
+            settings.ORIGINALS_ARCHIVE_DIR, timezone.now().strftime('%Y/%m')
+        )
+        os.makedirs(archive_dir, exist_ok=True)
+        shutil.move(
+            temp_file_path,
+            os.path.join(archive_dir, os.path.basename(temp_file_path)),
+        )
+    else:
+        os.remove(temp_file_path)
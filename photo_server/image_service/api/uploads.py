@@ -0,0 +1,73 @@
+import hashlib
+import os
+import time
+
+from django.conf import settings
+from django.core.files.uploadhandler import (
+    StopUpload,
+    TemporaryFileUploadHandler,
+)
+
+
+class StreamingUploadHandler(TemporaryFileUploadHandler):
+    """
+    Обработчик загрузки, записывающий файлы на диск по частям.
+
+    Каждая часть размером UPLOAD_CHUNK_SIZE сразу пишется во временный
+    файл в FILE_UPLOAD_TEMP_DIR, поэтому память запроса не зависит от
+    размера и количества фотографий. По мере приема считаются SHA-256
+    и размер файла; при превышении UPLOAD_MAX_FILE_SIZE или
+    UPLOAD_MAX_REQUEST_SIZE прием прерывается, остаток тела запроса
+    вычитывается без записи, а причина сохраняется в
+    request.upload_error для показа пользователю.
+
+    Готовый файл получает атрибут sha256.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.chunk_size = settings.UPLOAD_CHUNK_SIZE
+        self.request_size = 0
+
+    def new_file(self, *args, **kwargs):
+        # Каталог создается при первой загрузке, а не при импорте настроек
+        os.makedirs(settings.FILE_UPLOAD_TEMP_DIR, exist_ok=True)
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        self.file_size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.file_size += len(raw_data)
+        self.request_size += len(raw_data)
+        if self.file_size > settings.UPLOAD_MAX_FILE_SIZE:
+            self.reject(
+                f'Файл {self.file_name} больше '
+                f'{settings.UPLOAD_MAX_FILE_SIZE // 2**20} МБ'
+            )
+        if self.request_size > settings.UPLOAD_MAX_REQUEST_SIZE:
+            self.reject(
+                f'Общий размер файлов больше '
+                f'{settings.UPLOAD_MAX_REQUEST_SIZE // 2**20} МБ'
+            )
+        self.sha256.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        uploaded.sha256 = self.sha256.hexdigest()
+        return uploaded
+
+    def reject(self, message):
+        """
+        Прерывает прием запроса.
+
+        Args:
+            message (str): Причина, сохраняемая в request.upload_error
+
+        Raises:
+            StopUpload: Всегда
+        """
+        print(f"[{time.time()}] Загрузка отклонена: {message}", flush=True)
+        if self.request is not None:
+            self.request.upload_error = message
+        raise StopUpload()
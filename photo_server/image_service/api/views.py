@@ -4,8 +4,9 @@ import requests
 from django.shortcuts import render, redirect
 from django.utils import timezone
 from django.conf import settings
+from django.core.files.move import file_move_safe
 import time
-from .tasks import send_single_image
+from .tasks import send_image_batch, send_single_image
 
 
 def index(request):
@@ -76,6 +77,7 @@ def check_step(request, context):
 
     Detection Logic:
     - username/password: шаг авторизации
+    - request.upload_error: файлы превысили допустимый размер
     - images/api_token: шаг загрузки изображений
     - другие случаи: неизвестный шаг с логированием
     """
@@ -89,6 +91,13 @@ def check_step(request, context):
         )
         context = handle_auth_step(request, context)
 
+    # Прием файлов прерван StreamingUploadHandler (превышен размер)
+    elif getattr(request, 'upload_error', None):
+        context['step'] = 'upload'
+        context['token'] = request.POST.get('api_token', '')
+        context['username'] = request.session.get('sender_name', '')
+        context['error'] = f'Ошибка: {request.upload_error}'
+
     # Шаг загрузки изображений
     elif 'images' in request.FILES and 'api_token' in request.POST:
         print(
@@ -240,15 +249,15 @@ def handle_image_upload(request, context):
                 flush=True,
             )
 
-            with open(temp_file_path, 'wb+') as destination:
-                for chunk in image_file.chunks():
-                    destination.write(chunk)
+            # Файл уже принят на диск StreamingUploadHandler и
+            # переносится переименованием
+            file_move_safe(image_file.temporary_file_path(), temp_file_path)
 
             temp_file_paths.append(temp_file_path)
 
             file_time = time.time() - file_start
             print(
-                f"[{time.time()}] Файл {i+1} сохранен за {file_time:.3f}сек",
+                f"[{time.time()}] Файл {i+1} сохранен за {file_time:.3f}сек (sha256 {image_file.sha256})",
                 flush=True,
             )
 
@@ -263,6 +272,13 @@ def handle_image_upload(request, context):
             'name': name,
             'expected_objects': expected_objects,
             'expected_confidence': expected_confidence,
+            # Крупные загрузки помечаются как bulk, чтобы бэкенд
+            # обрабатывал их в фоновой очереди
+            'priority': (
+                'bulk'
+                if len(temp_file_paths) > settings.INTERACTIVE_MAX_FILES
+                else 'interactive'
+            ),
         }
 
         print(
@@ -320,29 +336,48 @@ def handle_image_upload(request, context):
             flush=True,
         )
 
-        for i, file_path in enumerate(temp_file_paths):
-            task_single_start = time.time()
-            print(
-                f"[{time.time()}]   Отправляем задачу для файла {i+1}: {os.path.basename(file_path)}",
-                flush=True,
-            )
-
-            try:
-                # Отправляем каждую задачу отдельно
-                task = send_single_image.delay(file_path, token, user_data)
-                task_ids.append(task.id)
-                task_single_time = time.time() - task_single_start
-                print(
-                    f"[{time.time()}]    Задача {i+1} отправлена за {task_single_time:.3f}сек, ID: {task.id}",
-                    flush=True,
-                )
-            except Exception as e:
-                task_single_time = time.time() - task_single_start
+        if settings.SEND_IMAGES_AS_BATCH and len(temp_file_paths) > 1:
+            # Несколько фотографий отправляются пакетами: один запрос
+            # и одна задача YOLO обработки на пакет
+            batch_size = settings.AEROTOOLKIT_BATCH_MAX_IMAGES
+            for start in range(0, len(temp_file_paths), batch_size):
+                batch = temp_file_paths[start : start + batch_size]
+                try:
+                    task = send_image_batch.delay(batch, token, user_data)
+                    task_ids.append(task.id)
+                    print(
+                        f"[{time.time()}]    Пакет из {len(batch)} файлов отправлен, ID: {task.id}",
+                        flush=True,
+                    )
+                except Exception as e:
+                    print(
+                        f"[{time.time()}]    Ошибка отправки пакета: {e}",
+                        flush=True,
+                    )
+        else:
+            for i, file_path in enumerate(temp_file_paths):
+                task_single_start = time.time()
                 print(
-                    f"[{time.time()}]    Ошибка отправки задачи {i+1}: {e}, время: {task_single_time:.3f}сек",
+                    f"[{time.time()}]   Отправляем задачу для файла {i+1}: {os.path.basename(file_path)}",
                     flush=True,
                 )
 
+                try:
+                    # Отправляем каждую задачу отдельно
+                    task = send_single_image.delay(file_path, token, user_data)
+                    task_ids.append(task.id)
+                    task_single_time = time.time() - task_single_start
+                    print(
+                        f"[{time.time()}]    Задача {i+1} отправлена за {task_single_time:.3f}сек, ID: {task.id}",
+                        flush=True,
+                    )
+                except Exception as e:
+                    task_single_time = time.time() - task_single_start
+                    print(
+                        f"[{time.time()}]    Ошибка отправки задачи {i+1}: {e}, время: {task_single_time:.3f}сек",
+                        flush=True,
+                    )
+
         tasks_total_time = time.time() - tasks_start
         print(
             f"[{time.time()}] 6.  ВСЕ {len(task_ids)} задач отправлены за {tasks_total_time:.3f}сек",
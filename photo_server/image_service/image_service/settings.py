@@ -151,6 +151,54 @@ REST_FRAMEWORK = {
 AEROTOOLKIT_API_URL = os.getenv(
     'AEROTOOLKIT_API_URL', 'https://httpbin.org/post'
 )
+# API массовой загрузки AeroToolKit: несколько фотографий одним запросом,
+# в ответе только ID созданных записей
+AEROTOOLKIT_BATCH_API_URL = os.getenv(
+    'AEROTOOLKIT_BATCH_API_URL',
+    AEROTOOLKIT_API_URL.rstrip('/') + '/bulk/',
+)
+# Отправлять несколько фотографий одной загрузки пакетом
+SEND_IMAGES_AS_BATCH = (
+    os.getenv('SEND_IMAGES_AS_BATCH', 'True').lower() == 'true'
+)
+# Максимальное количество фотографий в одном пакете (не больше
+# YOLO_BATCH_UPLOAD_MAX_IMAGES бэкенда)
+AEROTOOLKIT_BATCH_MAX_IMAGES = int(
+    os.getenv('AEROTOOLKIT_BATCH_MAX_IMAGES', 16)
+)
+# Загрузки с большим количеством фотографий обрабатываются бэкендом
+# с приоритетом bulk и не задерживают одиночные проверки
+INTERACTIVE_MAX_FILES = int(os.getenv('INTERACTIVE_MAX_FILES', 4))
+# Повторы отправки при ответе 429 (бэкенд перегружен): задержка берется
+# из Retry-After, при его отсутствии - AEROTOOLKIT_DEFAULT_RETRY_AFTER сек
+AEROTOOLKIT_MAX_RETRIES = int(os.getenv('AEROTOOLKIT_MAX_RETRIES', 10))
+AEROTOOLKIT_DEFAULT_RETRY_AFTER = int(
+    os.getenv('AEROTOOLKIT_DEFAULT_RETRY_AFTER', 30)
+)
+# API возобновляемой загрузки AeroToolKit: одиночные фотографии
+# передаются частями по AEROTOOLKIT_UPLOAD_CHUNK_SIZE байт, и после
+# обрыва связи отправка продолжается с подтвержденного смещения через
+# AEROTOOLKIT_RESUME_DELAY секунд (не более AEROTOOLKIT_MAX_RETRIES раз)
+AEROTOOLKIT_UPLOADS_API_URL = os.getenv(
+    'AEROTOOLKIT_UPLOADS_API_URL',
+    AEROTOOLKIT_API_URL.rstrip('/').rsplit('/', 1)[0] + '/uploads/',
+)
+AEROTOOLKIT_UPLOAD_CHUNK_SIZE = int(
+    os.getenv('AEROTOOLKIT_UPLOAD_CHUNK_SIZE', 1024 * 1024)
+)
+AEROTOOLKIT_RESUME_DELAY = int(os.getenv('AEROTOOLKIT_RESUME_DELAY', 5))
+# Подготовка фотографий перед отправкой в бэкенд: поворот по EXIF,
+# уменьшение до PRESEND_MAX_EDGE px по длинной стороне, JPEG с качеством
+# PRESEND_JPEG_QUALITY без метаданных. Модель видит вход 640 px, поэтому
+# полный кадр камеры только нагружает сеть и декодирование в бэкенде
+PRESEND_TRANSFORM = os.getenv('PRESEND_TRANSFORM', 'False').lower() == 'true'
+PRESEND_MAX_EDGE = int(os.getenv('PRESEND_MAX_EDGE', 2048))
+PRESEND_JPEG_QUALITY = int(os.getenv('PRESEND_JPEG_QUALITY', 90))
+# Исходные фотографии сохраняются на станции для аудита
+# (в ORIGINALS_ARCHIVE_DIR/ГГГГ/ММ/), если отправляется уменьшенная копия
+PRESEND_KEEP_ORIGINALS = (
+    os.getenv('PRESEND_KEEP_ORIGINALS', 'True').lower() == 'true'
+)
 # адрес api получения токена с AEROTOOLKIT
 AEROTOOLKIT_AUTH_URL = os.getenv('AEROTOOLKIT_AUTH_URL', '123invalid_token456')
 # Application definition
@@ -182,10 +230,32 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Europe/Moscow'
 CELERY_ENABLE_UTC = False
 
-# чтобы джанга не лагала при загрузке файлов
-DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
+# Файлы загрузок пишутся на диск по частям (api.uploads), в памяти
+# запроса держится только текущая часть и обычные поля формы
+FILE_UPLOAD_HANDLERS = ['api.uploads.StreamingUploadHandler']
+DATA_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB, только поля без файлов
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB
+
+# Размер части, записываемой на диск за раз, байты
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 256 * 1024))
+
+# Максимальный размер одного файла и всех файлов запроса, байты
+UPLOAD_MAX_FILE_SIZE = int(
+    os.getenv('UPLOAD_MAX_FILE_SIZE', 50 * 1024 * 1024)
+)
+UPLOAD_MAX_REQUEST_SIZE = int(
+    os.getenv('UPLOAD_MAX_REQUEST_SIZE', 512 * 1024 * 1024)
+)
 
 # Создаем временную папку для загрузок
 TEMP_UPLOAD_DIR = os.path.join(MEDIA_ROOT, 'temp_uploads')
 os.makedirs(TEMP_UPLOAD_DIR, exist_ok=True)
+
+# Прием файлов идет в соседний каталог на том же томе: готовый файл
+# переносится в TEMP_UPLOAD_DIR переименованием, без копирования
+FILE_UPLOAD_TEMP_DIR = os.path.join(MEDIA_ROOT, 'upload_tmp')
+
+# Архив исходных фотографий (см. PRESEND_KEEP_ORIGINALS)
+ORIGINALS_ARCHIVE_DIR = os.getenv(
+    'ORIGINALS_ARCHIVE_DIR', os.path.join(MEDIA_ROOT, 'originals')
+)